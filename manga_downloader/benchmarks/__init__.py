@@ -0,0 +1 @@
+# Benchmarks (không dùng khi chạy ứng dụng)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark http_session - Time-to-first-byte của request đầu tiên khi có/không mở sẵn kết nối
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.http_session
+"""
+
+import http.server
+import threading
+import time
+
+from core.http_session import SessionManager
+
+def benchmark(handshake_delay=0.05, rounds=5):
+    """So sánh time-to-first-byte của request đầu tiên khi có/không mở sẵn kết nối
+
+    Server giả lập chậm handshake_delay giây cho mỗi kết nối mới (thay cho DNS + TCP + TLS)
+    """
+    class StandInHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            time.sleep(handshake_delay)
+            super().setup()
+
+        def do_GET(self):
+            body = b'x' * 1024
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/page/1.jpg"
+
+    results = {'cold': [], 'prewarmed': []}
+    for _ in range(rounds):
+        for mode in results:
+            manager = SessionManager(per_host_connections=4)
+            if mode == 'prewarmed':
+                manager.prewarm(url, connections=2).join()
+                # Khoảng thời gian từ lúc lên lịch tới khi worker gửi request đầu tiên
+                time.sleep(handshake_delay * 2)
+            start = time.perf_counter()
+            response = manager.get(url, stream=True)
+            results[mode].append(time.perf_counter() - start)
+            response.close()
+            manager.close()
+
+    server.shutdown()
+    for mode, samples in results.items():
+        print(f"{mode:>10}: TTFB trung bình {sum(samples) / len(samples) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    benchmark()
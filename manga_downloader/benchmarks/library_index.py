@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark library_index - Quét thư mục download và tra URL trong LibraryIndex
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.library_index
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from core.library_index import LibraryIndex
+from core.manifest import build_manifest, write_manifest
+from core.url_canon import UrlCanonicalizer
+
+def benchmark(count=5000, pages=3):
+    """Quét lần đầu / quét lại (không có gì đổi) một thư mục download count gallery, và tra theo URL"""
+    canon = UrlCanonicalizer()
+    with tempfile.TemporaryDirectory() as folder:
+        for n in range(count):
+            gallery = Path(folder) / f"Gallery {n}"
+            gallery.mkdir()
+            for idx in range(1, pages + 1):
+                (gallery / f"{idx}.jpg").write_bytes(b'\xff\xd8\xff' + bytes(64))
+            if n % 10:  # 1/10 là thư mục cũ không có manifest
+                write_manifest(gallery, build_manifest(f"https://host{n % 40}.example/g/{n}/", f"Gallery {n}",
+                                                       None, 'original', {i: {'file': f"{i}.jpg"} for i in range(1, pages + 1)}))
+        print(f"Benchmark library index: {count:,} gallery ({pages} page/gallery)")
+
+        index = LibraryIndex(folder, canon.fingerprint)
+        first = index.scan()
+        print(f"  Quét lần đầu:   {first['seconds'] * 1000:7.0f} ms ({first['read']:,} gallery đọc)")
+        again = index.scan()
+        print(f"  Quét lại:       {again['seconds'] * 1000:7.0f} ms ({again['read']:,} gallery đọc)")
+
+        urls = [f"http://www.host{n % 40}.example/g/{n}" for n in range(count)]
+        started = time.perf_counter()
+        found = index.find_urls([canon.fingerprint(url) for url in urls])
+        elapsed = time.perf_counter() - started
+        print(f"  Tra {count:,} URL: {elapsed * 1000:7.0f} ms ({len(found):,} gallery đã có, không cần tải)")
+
+if __name__ == "__main__":
+    benchmark()
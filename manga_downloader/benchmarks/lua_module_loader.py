@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark lua_module_loader - Tìm module cho URL: từng URL (cách cũ) và classify_urls
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.lua_module_loader
+"""
+
+import contextlib
+import io
+import time
+from urllib.parse import urlparse
+
+from core.lua_module_loader import LuaModuleLoader
+
+def benchmark(count=1_000_000, block=1000):
+    """So sánh tìm module cho từng URL (cách cũ: duyệt mọi domain của mọi module) với classify_urls"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = LuaModuleLoader()
+    domains = list(loader._routes)
+    if not domains:
+        print("Không có module nào để benchmark")
+        return
+    hosts = [domains[n % len(domains)] for n in range(0, len(domains), 3)] + ["unknown.example", "cdn.other.example"]
+    urls = [f"https://{'www.' if n % 5 == 0 else ''}{hosts[n % len(hosts)]}/g/{n}/" for n in range(count)]
+    print(f"Benchmark phân loại URL: {count:,} URL, {len(hosts)} host, {len(loader.modules)} module")
+
+    def old_find(url):
+        domain = urlparse(url).netloc.lower().replace('www.', '')
+        for module_data in loader.modules.values():
+            for module_domain in module_data['info'].get('domains', []):
+                if domain == module_domain.lower().replace('www.', ''):
+                    return module_data
+        for module_data in loader.modules.values():
+            for module_domain in module_data['info'].get('domains', []):
+                module_domain = module_domain.lower().replace('www.', '')
+                if domain.endswith('.' + module_domain) or domain == module_domain:
+                    return module_data
+        return None
+
+    sample = urls[:min(count, 20000)]
+    started = time.perf_counter()
+    for url in sample:
+        old_find(url)
+    old_time = (time.perf_counter() - started) / len(sample)
+    print(f"  Từng URL (cách cũ, không tính print): {old_time * 1e6:8.1f} µs/URL -> ~{old_time * count:.0f} s")
+
+    started = time.perf_counter()
+    unsupported = {}
+    for i in range(0, count, block):
+        _, missing = loader.classify_urls(urls[i:i + block])
+        for host, n in missing.items():
+            unsupported[host] = unsupported.get(host, 0) + n
+    new_time = time.perf_counter() - started
+    print(f"  classify_urls (khối {block}):       {new_time / count * 1e6:8.2f} µs/URL -> {new_time:.2f} s, "
+          f"không hỗ trợ: {sum(unsupported.values()):,} URL / {len(unsupported)} host")
+
+if __name__ == "__main__":
+    benchmark()
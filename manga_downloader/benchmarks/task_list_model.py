@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark task_list_model - TaskListModel: thêm task, đọc cửa sổ dòng, sort và lọc
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.task_list_model
+"""
+
+import random
+import time
+
+from core.download_manager import DownloadTask
+from core.task_store import TaskStore
+from gui.task_list_model import TaskListModel
+
+def benchmark(counts=(10000, 100000), window=60):
+    """Đo thời gian thêm task, đọc một cửa sổ dòng (mỗi lần cuộn), sort theo cột và lọc qua index"""
+    statuses = ("Queued", "Downloading", "Completed", "Error")
+    print(f"Benchmark TaskListModel (cửa sổ {window} dòng)")
+    for count in counts:
+        store = TaskStore(lambda url: url.split('/')[2])
+        tasks = []
+        for n in range(count):
+            task = DownloadTask(f"https://host{n % 40}.example/g/{n}", f"Gallery {random.randrange(10 ** 6):06d}")
+            store.add(task)
+            task.status = random.choice(statuses)
+            task.module_name = f"module{n % 7}"
+            task.total_pages = random.randrange(1, 300)
+            task.progress = random.randrange(101)
+            if task.status == "Error":
+                task.error = random.choice(("HTTP 404", "Timeout", "Lỗi kết nối"))
+            tasks.append(task)
+
+        model = TaskListModel(store)
+        started = time.perf_counter()
+        for i in range(0, count, 1000):
+            model.add(tasks[i:i + 1000])
+        add_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        scrolls = 1000
+        for _ in range(scrolls):
+            top = random.randrange(max(count - window, 1))
+            model.tasks_in_range(top, top + window)
+        scroll_time = (time.perf_counter() - started) / scrolls
+        print(f"  {count:>7,} task: thêm {add_time * 1000:7.1f} ms, đọc cửa sổ {scroll_time * 1e6:6.1f} µs")
+
+        cases = (
+            ("sort tiêu đề (index)", lambda: model.set_sort("Manga Title")),
+            ("sort progress", lambda: model.set_sort("Progress", True)),
+            ("lọc status", lambda: (model.set_sort(None), model.set_query(status="Error"))),
+            ("lọc host + status", lambda: model.set_query(status="Downloading", host="host7.example")),
+            ("lọc module + chuỗi", lambda: model.set_query(module="module3", text="gallery 12")),
+            ("lọc chuỗi tiêu đề", lambda: model.set_query(text="0042")),
+            ("lọc lỗi", lambda: model.set_query(error="timeout")),
+            ("lọc chuỗi (predicate, không index)",
+             lambda: (model.set_query(), model.set_filter(lambda task: "0042" in (task.title or task.url).lower()))),
+        )
+        for label, apply in cases:
+            started = time.perf_counter()
+            apply()
+            visible = len(model)
+            elapsed = time.perf_counter() - started
+            print(f"    {label:<36} {elapsed * 1000:6.1f} ms ({visible:,} dòng)")
+        model.set_filter(None)
+
+if __name__ == "__main__":
+    benchmark()
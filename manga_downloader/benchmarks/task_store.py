@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark task_store - Đếm status: duyệt mọi task (cách cũ) và bộ đếm của TaskStore
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.task_store
+"""
+
+import random
+import time
+
+from core.download_manager import DownloadTask
+from core.task_store import TaskStore
+
+def benchmark(counts=(10000, 100000), ticks=20):
+    """So sánh đếm status bằng cách duyệt mọi task (cách cũ) với đọc bộ đếm của TaskStore"""
+    statuses = ("Queued", "Downloading", "Completed", "Error", "Retrying")
+    print(f"Benchmark TaskStore ({ticks} tick status bar)")
+    for count in counts:
+        store = TaskStore(lambda url: url.split('/')[2])
+        tasks = [DownloadTask(f"https://host{n % 50}.example/g/{n}") for n in range(count)]
+        for task in tasks:
+            store.add(task)
+            task.status = random.choice(statuses)
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            status_count = {}
+            for task in tasks:
+                status_count[task.status] = status_count.get(task.status, 0) + 1
+            [task for task in tasks if task.status in ("Retrying", "Host Down")]
+        scan_time = (time.perf_counter() - started) / ticks
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            store.get_stats()
+            store.tasks_with_status("Retrying", "Host Down")
+        store_time = (time.perf_counter() - started) / ticks
+
+        started = time.perf_counter()
+        for task in tasks[:10000]:
+            task.status = "Completed"
+        transition_time = (time.perf_counter() - started) / 10000
+
+        print(f"  {count:>7,} task: duyệt {scan_time * 1000:7.2f} ms/tick, bộ đếm {store_time * 1000:6.3f} ms/tick, "
+              f"đổi status {transition_time * 1e6:.2f} µs")
+
+if __name__ == "__main__":
+    benchmark()
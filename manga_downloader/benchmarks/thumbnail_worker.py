@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark thumbnail_worker - Decode ảnh bìa trên Tk thread (cách cũ) và qua ThumbnailWorker
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.thumbnail_worker
+"""
+
+import io
+import time
+
+from PIL import Image
+
+from gui.thumbnail_worker import ThumbnailWorker
+
+def benchmark(count=200, size=(60, 60), frame_limit=20):
+    """So sánh decode ảnh bìa trên Tk thread (cách cũ) với worker pool
+
+    Đo thời gian "Tk thread" bị chiếm: cách cũ = decode + resize toàn bộ ảnh; worker = chỉ lấy kết quả
+    (không tính PhotoImage vì không cần màn hình, bước này như nhau ở cả hai cách)
+    """
+    source = Image.effect_noise((800, 1200), 60).convert('RGB')
+    buffer = io.BytesIO()
+    source.save(buffer, 'JPEG', quality=85)
+    data = buffer.getvalue()
+    print(f"Benchmark thumbnail: {count} ảnh bìa 800x1200 JPEG -> {size[0]}x{size[1]}")
+
+    started = time.perf_counter()
+    for _ in range(count):
+        image = Image.open(io.BytesIO(data))
+        image.draft('RGB', size)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+    old_time = time.perf_counter() - started
+    print(f"  Tk thread decode: {old_time * 1000:7.1f} ms Tk thread bị chiếm (đứng liền một mạch)")
+
+    worker = ThumbnailWorker(workers=2)
+    started = time.perf_counter()
+    for key in range(count):
+        worker.request(key, data, size)
+    ui_time, frames, received = 0.0, 0, 0
+    while received < count:
+        time.sleep(0.01)
+        frame_started = time.perf_counter()
+        received += len(worker.take(frame_limit))
+        ui_time += time.perf_counter() - frame_started
+        frames += 1
+    total = time.perf_counter() - started
+    print(f"  Worker pool:      {ui_time * 1000:7.1f} ms Tk thread, xong sau {total * 1000:.0f} ms "
+          f"({frames} frame, tối đa {frame_limit} ảnh/frame)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark transcoder - Convert ảnh trong thread tải và qua process pool của Transcoder
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.transcoder
+"""
+
+import io
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from core.transcoder import Transcoder, transcode
+
+def benchmark(pages=48, fetch_delay=0.02, network_threads=8, size=(1200, 1700)):
+    """So sánh gallery nhiều định dạng (PNG/GIF/WebP/JPG): convert trong thread tải và qua process pool
+
+    fetch_delay mô phỏng thời gian chờ mạng của mỗi page; thread tải càng bị GIL chặn
+    lâu thì tổng thời gian càng dài
+    """
+    # Ảnh mẫu: nhiễu để PNG/WebP không nén quá nhỏ
+    random.seed(1)
+    base = Image.effect_noise(size, 64).convert('RGB')
+    samples = []
+    for fmt in ('PNG', 'WEBP', 'GIF', 'JPEG'):
+        buf = io.BytesIO()
+        img = base.convert('P') if fmt == 'GIF' else base
+        img.save(buf, fmt)
+        samples.append((fmt, buf.getvalue()))
+    workload = [samples[i % len(samples)] for i in range(pages)]
+
+    def run(mode):
+        out_dir = tempfile.mkdtemp()
+        transcoder = Transcoder() if mode == 'pool' else None
+        futures = []
+
+        def fetch(index):
+            time.sleep(fetch_delay)  # Chờ mạng
+            fmt, data = workload[index]
+            path = os.path.join(out_dir, f"{index + 1}.jpg")
+
+            def write(data):
+                with open(path, 'wb') as f:
+                    f.write(data)
+                return len(data)
+
+            if fmt == 'JPEG':
+                write(data)
+            elif transcoder is not None:
+                futures.append(transcoder.submit(data, write))
+            else:
+                write(transcode(data))
+
+        if transcoder is not None:
+            transcoder._get_pool().submit(int).result()  # Khởi động pool trước khi đo
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=network_threads) as executor:
+            list(executor.map(fetch, range(pages)))
+        fetch_done = time.perf_counter() - started
+        for future in futures:
+            future.result()
+        total = time.perf_counter() - started
+        if transcoder is not None:
+            transcoder.shutdown()
+        return fetch_done, total
+
+    print(f"Benchmark: {pages} pages ({size[0]}x{size[1]}, PNG/WebP/GIF/JPG), "
+          f"{network_threads} thread tải, {os.cpu_count()} core")
+    for mode in ('inline', 'pool'):
+        fetch_done, total = run(mode)
+        print(f"  {mode:6s}: thread tải xong sau {fetch_done:.2f}s, tổng {total:.2f}s")
+
+if __name__ == "__main__":
+    benchmark()
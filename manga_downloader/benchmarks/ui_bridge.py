@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark ui_bridge - Cập nhật UI: poll từng dòng (cách cũ) và dirty set của UiUpdateBridge
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.ui_bridge
+"""
+
+import random
+import time
+
+from gui.ui_bridge import UiUpdateBridge
+
+def benchmark(row_counts=(10000, 100000), active=200, events_per_task=20, frames=20):
+    """So sánh cách cũ (poll mỗi 0.5s, get_children() cho từng dòng active, after_idle từng dòng)
+    với dirty set (mark_dirty từ thread tải, một batch mỗi frame, tra dòng qua dict)
+
+    Không cần Tk: root giả chỉ gom callback, "vẽ lại" một dòng = ghi giá trị vào dict
+    """
+    class FakeRoot:
+        def __init__(self):
+            self.callbacks = []
+
+        def after(self, ms, func, *args):
+            self.callbacks.append((func, args))
+            return len(self.callbacks)
+
+        def after_idle(self, func, *args):
+            return self.after(0, func, *args)
+
+        def after_cancel(self, after_id):
+            pass
+
+        def run_pending(self):
+            callbacks, self.callbacks = self.callbacks, []
+            for func, args in callbacks:
+                func(*args)
+
+    print(f"Benchmark UI update: {active} task đang tải, mỗi task {events_per_task} sự kiện tiến độ/frame")
+    for rows in row_counts:
+        tasks = list(range(rows))
+        items = {task: f"I{task:06d}" for task in tasks}  # task -> item id
+        children = tuple(items.values())  # Treeview.get_children() trả về tuple mọi dòng
+        rendered = {}
+        active_tasks = random.sample(tasks, active)
+        active_set = set(active_tasks)  # Kiểm tra status của task: O(1)
+
+        # Cách cũ: mỗi tick duyệt mọi task, kiểm tra `item_id in get_children()` cho từng dòng active,
+        # rồi thêm after_idle cho mỗi sự kiện tiến độ
+        root = FakeRoot()
+        started = time.perf_counter()
+        updates = 0
+        for _ in range(frames):
+            for task in active_tasks:
+                for _ in range(events_per_task):
+                    root.after_idle(rendered.__setitem__, items[task], task)
+            for task in tasks:
+                if task in active_set:
+                    if items[task] in children:
+                        root.after_idle(rendered.__setitem__, items[task], task)
+            updates += len(root.callbacks)
+            root.run_pending()
+        old_time = time.perf_counter() - started
+
+        # Dirty set: sự kiện chỉ thêm vào set, mỗi frame vẽ lại mỗi task dirty một lần
+        root = FakeRoot()
+        bridge = UiUpdateBridge(root, lambda batch: [rendered.__setitem__(items[t], t) for t in batch if t in items],
+                                max_per_frame=rows)
+        bridge.start()
+        started = time.perf_counter()
+        for _ in range(frames):
+            for task in active_tasks:
+                for _ in range(events_per_task):
+                    bridge.mark_dirty(task)
+            root.run_pending()
+        new_time = time.perf_counter() - started
+        stats = bridge.get_stats()
+
+        print(f"  {rows:>7,} dòng: cũ {frames / old_time:8.1f} tick/s ({updates:,} lần vẽ), "
+              f"dirty set {frames / new_time:10.1f} frame/s ({stats['applied']:,} lần vẽ, "
+              f"gộp {stats['coalesced']:,} sự kiện)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark url_index - RAM và tốc độ tra của UrlIndex (SQLite + Bloom filter) so với set() URL
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.url_index
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.url_canon import UrlCanonicalizer
+from core.url_index import INDEX_NAME, UrlIndex
+
+def benchmark(count=10_000_000, probes=200_000):
+    """Đo RAM và tốc độ tra của index so với set() các URL trong RAM (cách cũ)"""
+    canon = UrlCanonicalizer()
+    urls = (f"https://host{n % 40}.example/g/{n}/" for n in range(count))
+    print(f"Benchmark URL index: {count:,} gallery đã tải, tra {probes:,} URL mới/cũ")
+
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        index = UrlIndex(os.path.join(folder, INDEX_NAME), capacity=count)
+        batch = []
+        for url in urls:
+            batch.append(canon.fingerprint(url))
+            if len(batch) >= 100000:
+                index.add(batch)
+                batch = []
+        index.add(batch)
+        index.flush()
+        build_time = time.perf_counter() - started
+        disk = os.path.getsize(index.path)
+        print(f"  Dựng index: {build_time:6.1f} s, SQLite {disk / 1024 / 1024:.0f} MB, "
+              f"Bloom filter {index.get_stats()['bloom_bytes'] / 1024 / 1024:.1f} MB RAM")
+
+        sample = [f"https://host{n % 40}.example/g/{n}/" for n in range(0, min(count, 1_000_000))]
+        strings = set(sample)
+        per_url = (sys.getsizeof(strings) + sum(sys.getsizeof(url) for url in sample)) / len(sample)
+        print(f"  set() URL trong RAM (cách cũ): ~{per_url:.0f} byte/URL -> "
+              f"~{per_url * count / 1024 / 1024:.0f} MB cho {count:,} URL")
+
+        fresh = [canon.fingerprint(f"https://www.host{n % 40}.example/g/{count + n}/?utm_source=x")
+                 for n in range(probes)]
+        known = [canon.fingerprint(f"http://host{n % 40}.example/g/{n}")
+                 for n in random.sample(range(count), probes)]
+        for label, fps in (("URL mới", fresh), ("URL đã tải (dạng khác)", known)):
+            started = time.perf_counter()
+            found = 0
+            for i in range(0, len(fps), 1000):
+                found += len(index.contains_many(fps[i:i + 1000]))
+            elapsed = time.perf_counter() - started
+            print(f"  Tra {label:<24} {elapsed / len(fps) * 1e6:5.2f} µs/URL, trùng {found:,}")
+
+        started = time.perf_counter()
+        index.close()
+        reopened = UrlIndex(os.path.join(folder, INDEX_NAME), capacity=count)
+        print(f"  Mở lại (đọc Bloom filter đã lưu): {(time.perf_counter() - started) * 1000:.0f} ms, "
+              f"{len(reopened):,} mục")
+        reopened.close()
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark url_list - Đọc danh sách URL: cách cũ (2 lượt, từng dòng) và iter_url_blocks (mmap/stream)
+
+Chạy trong thư mục manga_downloader: python -m benchmarks.url_list
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import time
+
+from core.url_list import iter_url_blocks
+
+def benchmark(lines=10_000_000, compressed_lines=1_000_000):
+    """So sánh cách cũ (đếm dòng + đọc từng dòng, 2 lượt) với iter_url_blocks trên file lines dòng"""
+    def write_list(f, count):
+        chunk = []
+        for n in range(count):
+            if n % 50 == 0:
+                chunk.append("# comment\n\n")
+            chunk.append(f"https://host{n % 40}.example/g/{n}/{n * 7919 % 100000:x}/\n")
+            if len(chunk) >= 100000:
+                f.write(''.join(chunk).encode())
+                chunk = []
+        f.write(''.join(chunk).encode())
+
+    def old_read(path):
+        total_lines = 0
+        with open(path, 'r', encoding='utf-8', errors='ignore', buffering=8192*16) as f:
+            for _ in f:
+                total_lines += 1
+        urls = []
+        with open(path, 'r', encoding='utf-8', errors='ignore', buffering=8192*16) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('http://') or line.startswith('https://'):
+                    urls.append(line)
+        return len(urls)
+
+    def new_read(path):
+        return sum(len(urls) for urls in iter_url_blocks(path))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "urls.txt")
+        with open(path, 'wb') as f:
+            write_list(f, lines)
+        size = os.path.getsize(path)
+        print(f"Benchmark đọc danh sách URL: {lines:,} URL, {size / 1024 / 1024:.0f} MB")
+        for label, read in (("Cũ (2 lượt, từng dòng)", old_read), ("mmap 1 lượt", new_read)):
+            started = time.perf_counter()
+            count = read(path)
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<24} {elapsed:6.2f} s  {count / elapsed / 1e6:5.2f} triệu URL/s")
+
+        for name, opener in (("gzip", gzip.open), ("bz2", bz2.open), ("xz", lzma.open)):
+            packed = os.path.join(folder, f"urls.txt.{name}")
+            with opener(packed, 'wb') as f:
+                write_list(f, compressed_lines)
+            started = time.perf_counter()
+            count = new_read(packed)
+            elapsed = time.perf_counter() - started
+            print(f"  {name:<24} {elapsed:6.2f} s  {count / elapsed / 1e6:5.2f} triệu URL/s ({count:,} URL)")
+
+if __name__ == "__main__":
+    benchmark()
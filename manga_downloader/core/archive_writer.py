@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archive Writer - Ghi page thẳng vào file CBZ (ZIP stored) ngay khi tải xong, an toàn khi crash và tiếp tục được
+"""
+
+import json
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+class CbzWriter:
+    """Ghi CBZ theo kiểu streaming
+
+    - Page được ghi vào <tên>.cbz.part theo thứ tự tới (không cần đúng thứ tự page);
+      central directory được sắp theo tên entry khi finalize nên reader vẫn đọc đúng thứ tự
+    - Mỗi entry ghi xong được ghi thêm một dòng vào <tên>.cbz.journal (offset, CRC, kích thước).
+      Nếu chương trình crash, lần sau mở lại sẽ cắt phần ghi dở và khôi phục các entry trong journal
+    - finalize(): ghi central directory, fsync rồi đổi tên .part thành .cbz (atomic)
+    - Ảnh đã nén sẵn (JPG/PNG/WebP) nên dùng ZIP_STORED, không nén lại
+    - fsync_entries=True: fsync archive và journal sau mỗi entry (finalize luôn fsync)
+    """
+    def __init__(self, archive_path, fsync_entries=False):
+        self.archive_path = Path(archive_path)
+        self.part_path = self.archive_path.with_name(self.archive_path.name + '.part')
+        self.journal_path = self.archive_path.with_name(self.archive_path.name + '.journal')
+        self.fsync_entries = fsync_entries
+        self._lock = threading.Lock()
+        self._file = None
+        self._zip = None
+        self._journal = None
+        self._meta = {}  # {tên entry: metadata đi kèm (ghi trong journal)}
+        self.resumed = 0  # Số entry khôi phục từ lần chạy trước
+        self._open()
+
+    def _open(self):
+        entries = self._read_journal()
+        end = 0
+        if entries and self.part_path.exists():
+            end = max(e['end'] for e in entries)
+            if self.part_path.stat().st_size < end:
+                # Journal ghi nhận nhiều hơn dữ liệu thực có: bỏ, ghi lại từ đầu
+                entries, end = [], 0
+        else:
+            entries = []
+
+        self._file = open(self.part_path, 'r+b' if entries else 'wb')
+        # Cắt phần entry đang ghi dở lúc crash
+        self._file.seek(end)
+        self._file.truncate()
+        self._zip = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_STORED)
+        for entry in entries:
+            info = zipfile.ZipInfo(entry['name'], tuple(entry['date_time']))
+            info.compress_type = zipfile.ZIP_STORED
+            info.CRC = entry['crc']
+            info.compress_size = info.file_size = entry['size']
+            info.header_offset = entry['offset']
+            info.flag_bits = entry['flag_bits']
+            info.external_attr = entry['external_attr']
+            self._zip.filelist.append(info)
+            self._zip.NameToInfo[info.filename] = info
+            self._meta[info.filename] = entry.get('meta')
+        self.resumed = len(entries)
+
+        # Ghi lại journal chỉ gồm các entry hợp lệ
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # Dòng cuối ghi dở
+        except OSError:
+            pass
+        return entries
+
+    def entries(self):
+        """{tên entry: metadata} các entry đã có trong archive (gồm cả entry khôi phục từ journal)"""
+        with self._lock:
+            return dict(self._meta)
+
+    def has(self, name):
+        with self._lock:
+            return name in self._zip.NameToInfo
+
+    def write(self, name, data, meta=None):
+        """Ghi một entry (bỏ qua nếu đã có), trả về số byte
+
+        meta được lưu cùng entry trong journal để khôi phục khi tiếp tục tải
+        """
+        with self._lock:
+            if self._file is None or self._file.closed:
+                raise ValueError(f"Archive {self.part_path.name} đã đóng")
+            if name in self._zip.NameToInfo:
+                return self._zip.NameToInfo[name].file_size
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+            self._file.flush()
+            entry = {
+                'name': name,
+                'date_time': list(info.date_time),
+                'crc': info.CRC,
+                'size': info.file_size,
+                'offset': info.header_offset,
+                'end': self._file.tell(),
+                'flag_bits': info.flag_bits,
+                'external_attr': info.external_attr,
+                'meta': meta,
+            }
+            self._meta[name] = meta
+            self._journal.write(json.dumps(entry) + '\n')
+            self._journal.flush()
+            if self.fsync_entries:
+                os.fsync(self._file.fileno())
+                os.fsync(self._journal.fileno())
+            return len(data)
+
+    def finalize(self):
+        """Ghi central directory và đổi tên thành file .cbz"""
+        with self._lock:
+            # Central directory theo thứ tự tên entry (page tới không theo thứ tự)
+            self._zip.filelist.sort(key=lambda info: info.filename)
+            self._zip.close()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._journal.close()
+            os.replace(self.part_path, self.archive_path)
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+        return self.archive_path
+
+    def close(self):
+        """Đóng file nhưng giữ .part/.journal để tiếp tục lần sau (pause, retry)"""
+        with self._lock:
+            if self._file is None or self._file.closed:
+                return
+            # Không ghi central directory: journal là nguồn sự thật khi mở lại
+            self._zip._didModify = False
+            self._file.flush()
+            self._file.close()
+            self._journal.close()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Blob Store - Kho page theo nội dung (content-addressed): page trùng giữa các gallery chỉ lưu một lần
+"""
+
+import errno
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+BLOB_DIR_NAME = ".blobs"
+INDEX_NAME = "index.sqlite"
+
+# Cách file trong gallery trỏ tới blob: auto = reflink, không được thì hardlink, không được nữa thì copy
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+# ioctl FICLONE của Linux (Btrfs, XFS, bcachefs...): file mới dùng chung extent với blob, copy-on-write
+_FICLONE = 0x40049409
+
+def content_hash(data):
+    """Hash nội dung page (blake2b 160-bit: nhanh, có sẵn trong hashlib)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+class BlobStore:
+    """Kho blob đặt trong <thư mục download>/.blobs (cùng filesystem để hardlink được)
+
+    - objects/ab/abcdef...<đuôi>: mỗi nội dung một file
+    - index.sqlite: bảng blobs (hash, size, refcount) và refs (đường dẫn file gallery -> hash)
+    - File trong gallery là reflink/hardlink tới blob; gc() xóa blob không còn file nào trỏ tới
+    """
+    def __init__(self, root, link_mode='auto'):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.link_mode = link_mode if link_mode in LINK_MODES else 'auto'
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / INDEX_NAME), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY, ext TEXT, size INTEGER, refcount INTEGER, created REAL)""")
+        self._db.execute("CREATE TABLE IF NOT EXISTS refs (path TEXT PRIMARY KEY, hash TEXT)")
+        self._db.commit()
+        self._no_reflink = self.link_mode in ('hardlink', 'copy')
+        self._no_hardlink = self.link_mode == 'copy'
+
+        # Thống kê của lần chạy này
+        self.stored = 0  # Page ghi vào gallery qua kho
+        self.deduped = 0  # Page đã có sẵn trong kho (không ghi thêm byte nào)
+        self.bytes_written = 0
+        self.bytes_saved = 0
+        self.links = {'reflink': 0, 'hardlink': 0, 'copy': 0}
+
+    def blob_path(self, digest, ext):
+        return self.objects / digest[:2] / f"{digest}{ext}"
+
+    def store(self, data, dest_path, write_file=None):
+        """Ghi data vào dest_path qua kho blob, trả về (số byte, True nếu nội dung đã có sẵn)
+
+        write_file(path, data): hàm ghi blob mới (mặc định ghi thẳng)
+        """
+        digest = content_hash(data)
+        dest_path = Path(dest_path)
+        ext = dest_path.suffix.lower()
+        blob = self.blob_path(digest, ext)
+
+        with self._lock:
+            row = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        existed = row is not None and blob.exists()
+        if not existed:
+            # Ghi blob ra file tạm ngoài lock, đổi tên thành blob (thread khác có thể vừa ghi cùng nội dung)
+            tmp = blob.with_name(f"{blob.name}.{threading.get_ident()}.tmp")
+            if write_file is not None:
+                write_file(str(tmp), data)
+            else:
+                blob.parent.mkdir(exist_ok=True)
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+            os.replace(tmp, blob)
+
+        # File gallery: tạo link ở tên tạm rồi đổi tên (page tải lại ghi đè file cũ)
+        tmp_dest = dest_path.with_name(f".{dest_path.name}.tmp")
+        self._link(blob, tmp_dest)
+        os.replace(tmp_dest, dest_path)
+
+        with self._lock:
+            self._add_ref(str(dest_path), digest, ext, len(data))
+            self.stored += 1
+            if existed:
+                self.deduped += 1
+                self.bytes_saved += len(data)
+            else:
+                self.bytes_written += len(data)
+        return len(data), existed
+
+    def _link(self, blob, dest):
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
+        if not self._no_reflink:
+            try:
+                _reflink(blob, dest)
+                self.links['reflink'] += 1
+                return
+            except (OSError, ImportError):
+                # Filesystem không hỗ trợ reflink (ext4, NTFS...): không thử lại cho các page sau
+                self._no_reflink = True
+                try:
+                    os.remove(dest)
+                except OSError:
+                    pass
+        if not self._no_hardlink:
+            try:
+                os.link(blob, dest)
+                self.links['hardlink'] += 1
+                return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    raise
+                self._no_hardlink = True
+        with open(blob, 'rb') as src, open(dest, 'wb') as dst:
+            dst.write(src.read())
+        self.links['copy'] += 1
+
+    def _add_ref(self, path, digest, ext, size):
+        """Cập nhật index (gọi khi đang giữ lock)"""
+        old = self._db.execute("SELECT hash FROM refs WHERE path = ?", (path,)).fetchone()
+        if old and old[0] == digest:
+            return
+        if old:
+            self._db.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", (old[0],))
+        self._db.execute("INSERT OR REPLACE INTO refs (path, hash) VALUES (?, ?)", (path, digest))
+        self._db.execute(
+            "INSERT INTO blobs (hash, ext, size, refcount, created) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1",
+            (digest, ext, size, time.time()))
+        self._db.commit()
+
+    def release(self, path):
+        """Bỏ tham chiếu của file gallery (khi file/gallery bị xóa)"""
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM refs WHERE path = ?", (str(path),)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM refs WHERE path = ?", (str(path),))
+                self._db.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", (row[0],))
+                self._db.commit()
+
+    def gc(self):
+        """Bỏ tham chiếu tới file không còn tồn tại rồi xóa blob có refcount 0
+
+        Trả về (số blob đã xóa, số byte giải phóng)
+        """
+        with self._lock:
+            refs = self._db.execute("SELECT path FROM refs").fetchall()
+        for (path,) in refs:
+            if not os.path.exists(path):
+                self.release(path)
+
+        removed, freed = 0, 0
+        with self._lock:
+            rows = self._db.execute("SELECT hash, ext, size FROM blobs WHERE refcount <= 0").fetchall()
+            for digest, ext, size in rows:
+                try:
+                    os.remove(self.blob_path(digest, ext))
+                except FileNotFoundError:
+                    pass
+                self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                removed += 1
+                freed += size
+            self._db.commit()
+        return removed, freed
+
+    def summary(self):
+        """Tổng kết toàn kho: số blob, số file trỏ tới, byte thực lưu và byte nếu không dedup"""
+        with self._lock:
+            blobs, stored, logical = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * refcount), 0) FROM blobs"
+            ).fetchone()
+            refs = self._db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {
+            'blobs': blobs,
+            'refs': refs,
+            'stored_bytes': stored,
+            'logical_bytes': logical,
+            'saved_bytes': logical - stored,
+        }
+
+    def get_stats(self):
+        """Thống kê của lần chạy này"""
+        return {
+            'stored': self.stored,
+            'deduped': self.deduped,
+            'bytes_written': self.bytes_written,
+            'bytes_saved': self.bytes_saved,
+            'links': dict(self.links),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+if __name__ == "__main__":
+    # python -m core.blob_store <thư mục download> [--gc]
+    import sys
+    if len(sys.argv) < 2:
+        print("Cách dùng: python -m core.blob_store <thư mục download> [--gc]")
+        sys.exit(1)
+    store = BlobStore(Path(sys.argv[1]) / BLOB_DIR_NAME)
+    if '--gc' in sys.argv:
+        removed, freed = store.gc()
+        print(f"✓ Đã xóa {removed} blob không còn dùng, giải phóng {freed / 1024 / 1024:.1f} MB")
+    info = store.summary()
+    print(f"Kho blob: {info['blobs']} blob, {info['refs']} file trỏ tới, "
+          f"{info['stored_bytes'] / 1024 / 1024:.1f} MB thực lưu, "
+          f"tiết kiệm {info['saved_bytes'] / 1024 / 1024:.1f} MB")
+    store.close()
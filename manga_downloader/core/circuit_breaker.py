@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Circuit Breaker - Ngắt tạm host đang chết để worker không phải chờ timeout liên tục
+"""
+
+import threading
+import time
+import requests
+
+# Trạng thái breaker
+CLOSED = "closed"        # Bình thường, request đi qua
+OPEN = "open"            # Host đang lỗi, request bị từ chối ngay
+HALF_OPEN = "half_open"  # Cho một request thử (probe) để kiểm tra host đã sống lại chưa
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Request bị từ chối vì breaker của host đang mở"""
+    def __init__(self, host, retry_in):
+        super().__init__(f"Host {host} đang tạm ngắt, thử lại sau {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in  # Số giây tới lần probe tiếp theo
+
+class CircuitBreaker:
+    """Breaker cho một host
+
+    Mở sau failure_threshold lỗi liên tiếp; hết reset_timeout thì cho một request probe (half-open).
+    Probe thành công thì đóng lại, thất bại thì mở tiếp với thời gian chờ gấp đôi (tối đa max_reset_timeout)
+    """
+    def __init__(self, host, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=600.0):
+        self.host = host
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.base_reset_timeout = float(reset_timeout)
+        self.max_reset_timeout = float(max_reset_timeout)
+        self.reset_timeout = self.base_reset_timeout
+        self.state = CLOSED
+        self.failures = 0  # Số lỗi liên tiếp
+        self.opened_at = None
+        self.opened_count = 0  # Số lần breaker đã mở
+        self.rejected = 0  # Số request bị từ chối khi đang mở
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """Số giây tới khi cho phép probe"""
+        with self._lock:
+            return self._retry_in(time.monotonic())
+
+    def _retry_in(self, now):
+        if self.state == CLOSED:
+            return 0.0
+        if self.state == HALF_OPEN:
+            # Đang có probe: chờ thêm một chút để biết kết quả
+            return min(self.base_reset_timeout, 5.0)
+        return max(self.opened_at + self.reset_timeout - now, 0.0)
+
+    def is_open(self):
+        """Breaker đang chặn request (probe đang chạy cũng tính là chặn)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                return self._retry_in(time.monotonic()) > 0
+            return self._probe_in_flight
+
+    def allow_request(self):
+        """Request có được đi qua không (chuyển sang half-open khi tới giờ probe)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and self._retry_in(now) <= 0:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                print(f"⚡ Thử lại host {self.host} (half-open)")
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Raise CircuitOpenError nếu request không được đi qua"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.host, self.retry_in())
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✓ Host {self.host} đã hoạt động lại")
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def cancel_probe(self):
+        """Request lỗi không liên quan tới host (URL sai...): trả lại lượt probe"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Probe thất bại: mở lại, chờ lâu hơn
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.opened_count += 1
+        self._probe_in_flight = False
+        print(f"⚠ Tạm ngắt host {self.host} sau {self.failures} lỗi liên tiếp, thử lại sau {self.reset_timeout:.0f}s")
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': round(self._retry_in(time.monotonic()), 1),
+                'opened_count': self.opened_count,
+                'rejected': self.rejected,
+            }
+
+class CircuitBreakerRegistry:
+    """Breaker theo host"""
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}  # {host: CircuitBreaker}
+        self._lock = threading.Lock()
+
+    def breaker_for(self, host):
+        host = (host or "").lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def open_hosts(self):
+        """Danh sách host đang bị ngắt"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [b.host for b in breakers if b.state != CLOSED]
+
+    def get_states(self):
+        """Trạng thái breaker theo host: {host: {...}}"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.host: b.as_dict() for b in breakers}
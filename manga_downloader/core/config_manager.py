@@ -40,12 +40,68 @@ class ConfigManager:
         if not self.config.has_section('Directories'):
             self.config.add_section('Directories')
         self.config.set('Directories', 'DownloadDirectory', str(self.download_dir))
+        # folder = mỗi gallery một thư mục ảnh; cbz = mỗi gallery một file .cbz
+        self.config.set('Directories', 'StorageMode', 'folder')
+        # Kho blob theo nội dung trong <DownloadDirectory>/.blobs: page trùng chỉ lưu một lần
+        # BlobLinkMode: auto (reflink -> hardlink -> copy), reflink, hardlink, copy
+        self.config.set('Directories', 'BlobStore', '0')
+        self.config.set('Directories', 'BlobLinkMode', 'auto')
         
         if not self.config.has_section('Queuing & Error Handling'):
             self.config.add_section('Queuing & Error Handling')
         self.config.set('Queuing & Error Handling', 'DownloadsMax', '10')
         self.config.set('Queuing & Error Handling', 'PageDelay', '0')
         self.config.set('Queuing & Error Handling', 'RetryFailed', '3')
+        self.config.set('Queuing & Error Handling', 'RetryDelay', '2')
+        
+        if not self.config.has_section('Network'):
+            self.config.add_section('Network')
+        self.config.set('Network', 'DnsCacheTTL', '300')
+        self.config.set('Network', 'CircuitFailureThreshold', '5')
+        self.config.set('Network', 'CircuitResetTimeout', '30')
+        self.config.set('Network', 'TimeoutFactor', '3')
+        self.config.set('Network', 'MinThroughputKB', '4')
+        self.config.set('Network', 'HedgeDelay', '2')
+        
+        if not self.config.has_section('Processing'):
+            self.config.add_section('Processing')
+        self.config.set('Processing', 'TranscodeWorkers', '0')
+        self.config.set('Processing', 'TranscodeQueue', '0')
+        # original = giữ nguyên byte tải về; jpeg/png/webp = chuyển sang định dạng đó
+        self.config.set('Processing', 'OutputFormat', 'jpeg')
+        
+        # Tổng RAM cho pipeline (buffer tải, convert, chờ ghi, ảnh bìa, thumbnail); 2 GB RAM -> ~512
+        if not self.config.has_section('Memory'):
+            self.config.add_section('Memory')
+        self.config.set('Memory', 'BudgetMB', '512')
+        
+        # Ghi đĩa ở thread riêng: WriteBufferMB = RAM tối đa cho ảnh chờ ghi
+        # Fsync: none (OS tự flush), gallery (fsync một lượt khi gallery xong), page (fsync từng ảnh)
+        if not self.config.has_section('Disk'):
+            self.config.add_section('Disk')
+        self.config.set('Disk', 'WriteBufferMB', '64')
+        self.config.set('Disk', 'Fsync', 'none')
+        self.config.set('Disk', 'WriteThreads', '2')
+        
+        # Bỏ URL trùng gallery: index gallery đã tải trong <DownloadDirectory>/.url_index.sqlite
+        # ExpectedUrls = số URL Bloom filter được tính cho (~1.2 byte RAM/URL với BloomErrorRate 0.01)
+        if not self.config.has_section('Dedup'):
+            self.config.add_section('Dedup')
+        self.config.set('Dedup', 'UrlIndex', '1')
+        self.config.set('Dedup', 'BloomFilter', '1')
+        self.config.set('Dedup', 'ExpectedUrls', '1000000')
+        self.config.set('Dedup', 'BloomErrorRate', '0.01')
+        # Thư viện: index gallery đã có trong DownloadDirectory (manifest + quét thư mục), gallery đã có thì không tải lại
+        self.config.set('Dedup', 'LibraryIndex', '1')
+        
+        # Luật chuẩn hóa URL theo module, mỗi dòng "regex trên path -> thay thế", ví dụ:
+        # HentaiFox = ^/(?:g|gallery)/(\d+)(?:/.*)?$ -> /gallery/\1
+        if not self.config.has_section('URL Rules'):
+            self.config.add_section('URL Rules')
+        
+        # Ghi đè định dạng đầu ra theo module, ví dụ: HentaiFox = original
+        if not self.config.has_section('Module Output'):
+            self.config.add_section('Module Output')
         
         self.save_config()
         
@@ -58,6 +114,12 @@ class ConfigManager:
         """Lấy giá trị cấu hình"""
         return self.config.get(section, key, fallback=fallback)
         
+    def get_section(self, section):
+        """Lấy tất cả giá trị của một section dạng dict ({} nếu không có)"""
+        if not self.config.has_section(section):
+            return {}
+        return dict(self.config.items(section))
+        
     def set(self, section, key, value):
         """Đặt giá trị cấu hình"""
         if not self.config.has_section(section):
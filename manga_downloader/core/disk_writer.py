@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disk Writer - Ghi file ở thread riêng (write-behind), giới hạn RAM chờ ghi và chọn mức fsync
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Mức bền dữ liệu: none = để OS tự flush, gallery = fsync một lượt khi gallery xong, page = fsync từng file
+FSYNC_MODES = ('none', 'gallery', 'page')
+
+class DiskWriter:
+    """Stage ghi đĩa tách khỏi thread tải
+
+    Thread tải gọi submit() với số byte của job rồi chuyển sang page tiếp theo; job (ghi file,
+    ghi vào archive...) chạy trên thread ghi. Tổng byte đang chờ ghi không vượt budget_bytes:
+    khi đầy, submit() chờ (backpressure) thay vì giữ thêm ảnh trong RAM.
+    """
+    def __init__(self, budget_bytes=64 * 1024 * 1024, fsync='none', workers=2):
+        self.budget_bytes = max(int(budget_bytes), 1)
+        self.fsync = fsync if fsync in FSYNC_MODES else 'none'
+        self.workers = max(int(workers), 1)
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._known_dirs = set()  # Thư mục đã tạo (không mkdir/stat lại cho từng file)
+        self._dirty = {}  # {nhóm (gallery): [file chưa fsync]} cho fsync='gallery'
+        self._dirty_lock = threading.Lock()
+        self.pending_bytes = 0
+        self.pending_jobs = 0
+        self.bytes_written = 0
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.write_time = 0.0  # Thời gian thật sự ghi (không tính chờ hàng đợi)
+        self.fsyncs = 0
+        self.blocked_time = 0.0  # Tổng thời gian thread tải phải chờ vì hết budget
+
+    def _start(self):
+        # Thread ghi được tạo khi có job đầu tiên
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"disk-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, nbytes, job):
+        """Đưa job vào hàng đợi ghi, trả về Future (kết quả là giá trị job trả về)
+
+        nbytes là số byte job giữ trong RAM cho tới khi ghi xong
+        """
+        future = Future()
+        started = time.monotonic()
+        with self._cond:
+            self._start()
+            # Job lớn hơn cả budget vẫn được nhận khi hàng đợi trống
+            while self.pending_bytes and self.pending_bytes + nbytes > self.budget_bytes:
+                self._cond.wait()
+            self.blocked_time += time.monotonic() - started
+            self.pending_bytes += nbytes
+            self.pending_jobs += 1
+            self._jobs.append((nbytes, job, future))
+            self._cond.notify_all()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                nbytes, job, future = self._jobs.popleft()
+            started = time.monotonic()
+            ok = False
+            try:
+                result = job()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                ok = True
+                future.set_result(result)
+            finally:
+                with self._cond:
+                    # Thống kê throughput chỉ tính job ghi thành công
+                    if ok:
+                        self.write_time += time.monotonic() - started
+                        self.bytes_written += nbytes
+                        self.jobs_done += 1
+                    else:
+                        self.jobs_failed += 1
+                    self.pending_bytes -= nbytes
+                    self.pending_jobs -= 1
+                    self._cond.notify_all()
+
+    def drain(self, timeout=None):
+        """Chờ hàng đợi ghi trống, trả về False nếu hết timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending_jobs:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def ensure_dir(self, path, recheck=False):
+        """mkdir một lần cho mỗi thư mục
+
+        recheck=True (khi bắt đầu một gallery): mkdir lại dù đã tạo trước đó, thư mục có thể
+        đã bị người dùng xóa trong lúc chạy
+        """
+        path = str(path)
+        if recheck or path not in self._known_dirs:
+            os.makedirs(path, exist_ok=True)
+            self._known_dirs.add(path)
+
+    def write_file(self, path, data, group=None):
+        """Ghi file (gọi từ job trên thread ghi), fsync theo chế độ; trả về số byte"""
+        directory = os.path.dirname(path)
+        self.ensure_dir(directory)
+        try:
+            f = open(path, 'wb')
+        except FileNotFoundError:
+            # Thư mục đã bị xóa sau khi tạo: tạo lại rồi thử một lần nữa
+            self.ensure_dir(directory, recheck=True)
+            f = open(path, 'wb')
+        with f:
+            f.write(data)
+            if self.fsync == 'page':
+                f.flush()
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+        if self.fsync == 'gallery' and group is not None:
+            with self._dirty_lock:
+                self._dirty.setdefault(str(group), []).append(str(path))
+        return len(data)
+
+    def track(self, path, group):
+        """Ghi nhận file do code khác ghi (đổi tên, link...) để fsync cùng gallery"""
+        if self.fsync == 'gallery':
+            with self._dirty_lock:
+                self._dirty.setdefault(str(group), []).append(str(path))
+
+    def sync(self, group):
+        """fsync='gallery': fsync một lượt các file của gallery và thư mục chứa chúng"""
+        with self._dirty_lock:
+            paths = self._dirty.pop(str(group), [])
+        if self.fsync != 'gallery' or not paths:
+            return
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue  # File đã bị thay thế (page tải lại)
+            try:
+                os.fsync(fd)
+                self.fsyncs += 1
+            finally:
+                os.close(fd)
+        self._fsync_dirs({os.path.dirname(p) for p in paths})
+
+    def _fsync_dirs(self, dirs):
+        # Tên file mới chỉ bền khi entry trong thư mục được fsync (Windows không hỗ trợ, bỏ qua)
+        for directory in dirs:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+    def get_stats(self):
+        throughput = self.bytes_written / self.write_time if self.write_time > 0 else 0
+        return {
+            'fsync': self.fsync,
+            'workers': self.workers,
+            'queue_depth': self.pending_jobs,
+            'pending_bytes': self.pending_bytes,
+            'budget_bytes': self.budget_bytes,
+            'jobs_done': self.jobs_done,
+            'jobs_failed': self.jobs_failed,
+            'bytes_written': self.bytes_written,
+            'throughput_mb_s': round(throughput / 1024 / 1024, 2),
+            'fsyncs': self.fsyncs,
+            'blocked_time': round(self.blocked_time, 2),
+        }
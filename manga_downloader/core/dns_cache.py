@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DNS Cache - Lưu kết quả phân giải DNS có TTL để kết nối mới không phải chờ DNS
+"""
+
+import socket
+import threading
+import time
+
+class DNSCache:
+    """Cache getaddrinfo theo (host, port) với TTL"""
+    def __init__(self, ttl=300):
+        self.ttl = float(ttl)
+        self._entries = {}  # {(host, port): (expires_at, [sockaddr])}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, port):
+        """Trả về danh sách địa chỉ IP cho host (dùng cache nếu còn hạn)"""
+        key = (host.lower(), port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host, port=None):
+        """Xóa cache của host (khi kết nối tới địa chỉ đã cache thất bại)"""
+        host = host.lower()
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == host and (port is None or k[1] == port)]:
+                del self._entries[key]
+
+    def is_ip_address(self, host):
+        """Host đã là địa chỉ IP (không cần phân giải)"""
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                socket.inet_pton(family, host.strip('[]'))
+                return True
+            except (OSError, ValueError):
+                continue
+        return False
+
+    def get_stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -4,22 +4,60 @@
 Download Manager - Quản lý việc tải manga
 """
 
+import itertools
 import os
 import threading
 import queue
 import time
+import random
+from concurrent.futures import Future
 from pathlib import Path
 from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from core.blob_store import BLOB_DIR_NAME, BlobStore
+from core.circuit_breaker import CircuitOpenError
+from core.disk_writer import DiskWriter
+from core.memory_budget import MemoryBudget
+from core.host_stats import HostLatencyTracker
+from core.http_session import SessionManager
+from core.library_index import LibraryIndex
+from core.image_probe import (PROBE_LIMIT, PageUrlLearner, is_image_url, probe_dimensions,
+                               replace_extension, sniff_format)
+from core.manifest import build_manifest
+from core.mirrors import MirrorRegistry
+from core.output_policy import OutputPolicy
+from core.storage import DEFAULT_STORAGE_MODE, open_storage
+from core.task_store import TaskStore, Tracked
+from core.transcoder import Transcoder
+from core.url_canon import UrlCanonicalizer
+from core.url_index import INDEX_NAME, UrlIndex
+from core.retry_scheduler import RetryScheduler, parse_retry_after
+
+# RAM giữ trước cho buffer tải một page (tăng thêm từng bước này khi ảnh lớn hơn)
+FETCH_RESERVE = 1024 * 1024
+
+# ID tăng dần cho task (model của UI lưu ID thay vì object)
+_task_ids = itertools.count(1)
 
 class DownloadTask:
+    # Thuộc tính TaskStore theo dõi để cập nhật bộ đếm và index
+    title = Tracked()
+    error = Tracked()
+    status = Tracked()
+    module_name = Tracked()
+    current_page = Tracked()
+    total_pages = Tracked()
+    file_size = Tracked()
+    
     def __init__(self, url, title="", status="Queued"):
+        self.id = next(_task_ids)
         self.url = url
         self.title = title
         self.status = status
+        self.module_name = None  # Module Lua xử lý URL (biết sau khi tìm module)
+        self.fingerprint = None  # Fingerprint của URL chuẩn hóa (nhận ra gallery trùng)
         self.progress = 0
         self.chapters = 0
         self.pages = 0
@@ -29,12 +67,32 @@ class DownloadTask:
         self.total_pages = 0
         self.retry_count = 0
         self.max_retries = 3
+        self.next_retry_at = None  # Thời điểm (time.time()) sẽ tải lại
+        self.last_error = None  # Lỗi gần nhất dẫn tới retry
+        self.pending_pages = None  # [(idx, page_item)] các page lỗi cần tải lại
+        self.saved_pages = {}  # {idx: {'file', 'format', ...}} các page đã lưu (ghi vào manifest)
         self.lock = threading.Lock()  # Thread-safe updates
         self.cover_image_url = None  # URL của ảnh bìa
         self.cover_image_data = None  # Dữ liệu ảnh đã download (bytes)
+        self.location = None  # Thư mục/file .cbz của gallery trên đĩa (biết khi xong hoặc đã có trong thư viện)
+        self.force = False  # Người dùng chọn tải dù trùng gallery đã tải (bỏ qua kiểm tra trùng)
+        self.pages_known = False  # Số page lấy được từ trang gallery (không phải giá trị mặc định 1)
+
+class PageFetchError(Exception):
+    """Không tải được một page (sẽ được đưa vào danh sách tải lại)"""
+    def __init__(self, message, retry_after=None, host_down=False):
+        super().__init__(message)
+        self.retry_after = retry_after  # Số giây server yêu cầu chờ (Retry-After)
+        self.host_down = host_down  # Host ảnh đang bị tạm ngắt (circuit breaker mở)
+
+class DeferredPage:
+    """Page chưa có URL ảnh - chỉ resolve khi tới lượt tải (giống BeforeDownloadPage() của module Lua)"""
+    def __init__(self, page_url, soup=None):
+        self.page_url = page_url
+        self.soup = soup  # HTML đã tải sẵn (nếu có) để không phải request lại
         
 class DownloadManager:
-    def __init__(self, config_manager, progress_callback=None):
+    def __init__(self, config_manager, progress_callback=None, module_loader=None):
         self.config = config_manager
         self.download_queue = queue.Queue()
         self.active_downloads = {}
@@ -44,43 +102,308 @@ class DownloadManager:
         self.progress_callback = progress_callback  # Callback để update UI
         self.all_tasks = {}  # Lưu tất cả tasks để dễ truy cập
         
-        # Tạo session với connection pooling để tăng tốc độ
-        self.session = requests.Session()
+        # Số lần tải lại khi lỗi (RetryFailed) - retry được hẹn giờ, worker không phải sleep
+        self.max_retries = max(int(self.config.get('Queuing & Error Handling', 'RetryFailed', '3')), 0)
+        self.retry_scheduler = RetryScheduler(
+            self._on_retry_due,
+            base_delay=float(self.config.get('Queuing & Error Handling', 'RetryDelay', '2'))
+        )
+        
+        # Session/connection pool riêng cho từng host, cookie riêng cho từng module
+        # Host lỗi liên tiếp sẽ bị tạm ngắt (circuit breaker), task của host đó được tạm gác lại
+        self.http = SessionManager(
+            per_host_connections=self.max_concurrent,
+            dns_ttl=float(self.config.get('Network', 'DnsCacheTTL', '300')),
+            failure_threshold=int(self.config.get('Network', 'CircuitFailureThreshold', '5')),
+            reset_timeout=float(self.config.get('Network', 'CircuitResetTimeout', '30')),
+            # Timeout = p99 độ trễ của host × hệ số; luồng tải chậm hơn MinThroughputKB KB/s bị ngắt
+            latency=HostLatencyTracker(
+                factor=float(self.config.get('Network', 'TimeoutFactor', '3')),
+                min_throughput=float(self.config.get('Network', 'MinThroughputKB', '4')) * 1024
+            )
+        )
+        
+        # Mirror server ảnh theo module: gửi request dự phòng khi mirror đầu chậm hơn p95
+        self.mirrors = MirrorRegistry()
+        self.hedge_delay = float(self.config.get('Network', 'HedgeDelay', '2'))
+        
+        # Đuôi file/server ảnh thật học được từ các page trước của gallery
+        self.url_learner = PageUrlLearner()
         
-        # Cấu hình retry strategy
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.3,
-            status_forcelist=[429, 500, 502, 503, 504],
+        # Định dạng lưu ảnh (original/jpeg/png/webp), toàn cục hoặc theo module
+        self.output_policy = OutputPolicy.from_config(self.config)
+        
+        # Convert ảnh sang định dạng đầu ra trong process pool (0 = theo số core)
+        self.transcoder = Transcoder(
+            workers=int(self.config.get('Processing', 'TranscodeWorkers', '0')),
+            max_pending=int(self.config.get('Processing', 'TranscodeQueue', '0'))
         )
         
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=self.max_concurrent,
-            pool_maxsize=self.max_concurrent * 2
+        # Budget RAM chung cho buffer tải, convert, chờ ghi, ảnh bìa và thumbnail UI
+        self.memory = MemoryBudget(float(self.config.get('Memory', 'BudgetMB', '512')) * 1024 * 1024)
+        
+        # Ghi đĩa ở thread riêng: RAM chờ ghi tối đa WriteBufferMB, fsync none/gallery/page
+        self.disk_writer = DiskWriter(
+            budget_bytes=float(self.config.get('Disk', 'WriteBufferMB', '64')) * 1024 * 1024,
+            fsync=self.config.get('Disk', 'Fsync', 'none').strip().lower(),
+            workers=int(self.config.get('Disk', 'WriteThreads', '2'))
         )
         
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # Kho blob theo nội dung (tùy chọn): page trùng giữa các gallery chỉ lưu một lần
+        self._blob_store = None
+        self._blob_lock = threading.Lock()
+        
+        # Bộ đếm task theo status/host/module và tổng page/byte (cập nhật khi task đổi trạng thái)
+        self.tasks = TaskStore(self.http.host_of)
+        
+        # Module loader dùng chung (tạo khi cần nếu không được truyền vào)
+        self._module_loader = module_loader
+        self._loader_lock = threading.Lock()
         
-        # Headers mặc định
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # URL chuẩn hóa (luật chung + luật theo module) -> fingerprint 64-bit: URL trùng bị bỏ khi import
+        # và khi đưa vào hàng đợi; gallery đã tải được ghi vào index trên đĩa ([Dedup] UrlIndex)
+        self.canonicalizer = UrlCanonicalizer.from_config(self.config)
+        if module_loader is not None:
+            self.canonicalizer.set_domains(module_loader.domain_map())
+        self._fingerprints = {}  # {fingerprint: task} task của phiên này
+        self._url_index = None
+        self._url_index_lock = threading.Lock()
+        self.duplicates_skipped = 0
+        self._active_hosts = {}  # {host: số worker đang tải từ host (trang gallery/server ảnh)} -> kích thước pool
+        self._active_lock = threading.Lock()
         
-    def add_download(self, url, title=""):
+        # Thư viện: gallery đã có trong thư mục download (quét lần đầu ở thread nền, gallery tải xong được
+        # ghi ngay); URL/tiêu đề trùng gallery đã có được đánh dấu Completed, không tải lại
+        self._library = None
+        self._library_lock = threading.Lock()
+        self.library_hits = 0
+        self._get_library()
+        
+    def add_download(self, url, title="", fingerprint=None):
         """Thêm URL vào danh sách tasks (KHÔNG tự động thêm vào queue - chỉ khi bấm Start)"""
         task = DownloadTask(url, title)
+        task.max_retries = self.max_retries
+        task.fingerprint = fingerprint if fingerprint is not None else self.url_fingerprint(url)
+        self._fingerprints.setdefault(task.fingerprint, task)
         self.all_tasks[url] = task  # Lưu task để dễ truy cập
+        self.tasks.add(task)
         # KHÔNG tự động thêm vào queue - chỉ khi bấm Start mới thêm
         return task
+    
+    def add_downloads(self, urls):
+        """Thêm nhiều URL đã qua phân loại module và kiểm tra trùng
+        
+        URL của host không có module nào hỗ trợ bị bỏ ngay (không chiếm dòng, thread hay lượt lấy info);
+        URL trùng gallery với task đang có hoặc gallery đã tải cũng bị bỏ; gallery còn nằm trong
+        thư viện thì task được thêm ở trạng thái Completed (không tải, không request mạng nào).
+        Trả về (danh sách task mới, số URL trùng, {host không được hỗ trợ: số URL})
+        """
+        loader = self._get_module_loader()
+        unsupported = {}
+        if loader.modules:
+            modules, unsupported = loader.classify_urls(urls)
+            routed = [(url, module) for url, module in zip(urls, modules) if module is not None]
+        else:
+            # Không load được module nào: không lọc (task sẽ báo lỗi khi tải như trước)
+            routed = [(url, None) for url in urls]
+        
+        fingerprints = [self.url_fingerprint(url) for url, _ in routed]
+        downloaded, in_library = self._find_downloaded(fingerprints)
+        tasks, skipped = [], 0
+        for (url, module), fingerprint in zip(routed, fingerprints):
+            if fingerprint in self._fingerprints or (fingerprint in downloaded and fingerprint not in in_library):
+                skipped += 1
+                continue
+            task = self.add_download(url, fingerprint=fingerprint)
+            task.module_name = self._module_name(module)
+            entry = in_library.get(fingerprint)
+            if entry is not None:
+                self._mark_done(task, entry)
+            tasks.append(task)
+        self.duplicates_skipped += skipped
+        return tasks, skipped, unsupported
+    
+    def url_fingerprint(self, url):
+        """Fingerprint của URL đã chuẩn hóa (luật theo module cần bảng domain của module loader)"""
+        if not self.canonicalizer.domains:
+            self._get_module_loader()
+        return self.canonicalizer.fingerprint(url)
+    
+    def duplicate_reason(self, url):
+        """'queued' nếu đã có task cùng gallery, 'downloaded' nếu gallery đã tải trước đây, None nếu không trùng"""
+        fingerprint = self.url_fingerprint(url)
+        if fingerprint in self._fingerprints:
+            return 'queued'
+        downloaded, in_library = self._find_downloaded([fingerprint])
+        if downloaded or in_library:
+            return 'downloaded'
+        return None
+    
+    def _find_downloaded(self, fingerprints):
+        """(fingerprint có trong index gallery đã tải, {fingerprint: gallery trong thư viện})
+        
+        Fingerprint trong index chỉ bị bỏ khi thư viện xác nhận gallery đã ghi của nó không còn ở
+        vị trí đó trên đĩa (người dùng đã xóa): gallery được tải lại như URL mới. Gallery thư viện
+        không biết (tải trước khi có thư viện, nằm ngoài thư mục download...) vẫn được tin là đã tải
+        """
+        index = self._get_url_index()
+        downloaded = index.contains_many(fingerprints) if index is not None else set()
+        library = self._get_library()
+        in_library = library.find_urls(fingerprints) if library is not None else {}
+        if downloaded and library is not None:
+            stale = library.deleted_among(fp for fp in downloaded if fp not in in_library)
+            if stale:
+                index.remove(stale)
+                print(f"↻ {len(stale)} gallery đã tải không còn trên đĩa, bỏ khỏi index")
+                downloaded.difference_update(stale)
+        return downloaded, in_library
+    
+    def allow_duplicate(self, task):
+        """Tải task dù trùng gallery đã tải/đã có trong thư viện (người dùng chọn "tải lại")"""
+        with task.lock:
+            task.force = True
+        index = self._get_url_index()
+        if index is not None:
+            # Ghi lại vào index khi tải xong
+            index.remove([task.fingerprint])
+        self._fingerprints[task.fingerprint] = task
+        if task.status == "Duplicate":
+            self._update_task_progress(task, status="Queued")
+    
+    def _get_module_loader(self):
+        with self._loader_lock:
+            if self._module_loader is None:
+                from core.lua_module_loader import LuaModuleLoader
+                self._module_loader = LuaModuleLoader()
+                self.canonicalizer.set_domains(self._module_loader.domain_map())
+            return self._module_loader
+    
+    def _get_url_index(self):
+        """Index gallery đã tải trong <thư mục download>/.url_index.sqlite (None nếu [Dedup] UrlIndex tắt)"""
+        if self.config.get('Dedup', 'UrlIndex', '1').strip().lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        download_dir = self.config.get('Directories', 'DownloadDirectory', str(Path.home() / 'Downloads' / 'Manga'))
+        path = Path(download_dir) / INDEX_NAME
+        with self._url_index_lock:
+            if self._url_index is None or self._url_index.path != path:
+                if self._url_index is not None:
+                    self._url_index.flush()
+                self._url_index = UrlIndex(
+                    path,
+                    capacity=int(self.config.get('Dedup', 'ExpectedUrls', '1000000')),
+                    error_rate=float(self.config.get('Dedup', 'BloomErrorRate', '0.01')),
+                    bloom=self.config.get('Dedup', 'BloomFilter', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+                )
+            return self._url_index
+    
+    def _get_library(self):
+        """Thư viện của <thư mục download> (None nếu [Dedup] LibraryIndex tắt)
+        
+        Mở lần đầu (hoặc khi đổi thư mục download): quét thư mục ở thread nền, trong lúc quét
+        tra cứu dùng kết quả đã lưu từ lần chạy trước
+        """
+        if self.config.get('Dedup', 'LibraryIndex', '1').strip().lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        download_dir = Path(self.config.get('Directories', 'DownloadDirectory', str(Path.home() / 'Downloads' / 'Manga')))
+        with self._library_lock:
+            if self._library is None or self._library.root != download_dir:
+                self._library = LibraryIndex(download_dir, self.url_fingerprint)
+                threading.Thread(target=self._scan_library, args=(self._library,), daemon=True).start()
+            return self._library
+    
+    def _scan_library(self, library):
+        library.scanning = True
+        try:
+            result = library.scan()
+            print(f"✓ Thư viện {library.root}: {result['entries']} gallery "
+                  f"(đọc {result['read']}, bỏ {result['removed']}) trong {result['seconds'] * 1000:.0f} ms")
+        except Exception as e:
+            print(f"⚠ Lỗi khi quét thư viện: {e}")
+        finally:
+            library.scanning = False
+    
+    def get_library_stats(self):
+        """Thống kê thư viện (None nếu không bật)"""
+        with self._library_lock:
+            library = self._library
+        if library is None:
+            return None
+        stats = library.get_stats()
+        stats['hits'] = self.library_hits
+        return stats
+    
+    def _mark_done(self, task, entry):
+        """Gallery đã có trong thư viện: task thành Completed với số page/dung lượng trên đĩa, không tải"""
+        with task.lock:
+            if entry['title'] and not task.title:
+                task.title = entry['title']
+            pages = entry['page_count'] or task.total_pages
+            task.pages = task.pages or pages
+            task.total_pages = pages
+            task.current_page = pages
+            task.file_size = entry['bytes'] or 0
+            task.location = entry['location']
+        self.library_hits += 1
+        self._update_task_progress(task, status="Completed", progress=100)
+    
+    def get_url_index_stats(self):
+        """Thống kê index gallery đã tải (None nếu chưa mở/không bật)"""
+        with self._url_index_lock:
+            index = self._url_index
+        stats = index.get_stats() if index is not None else {}
+        stats['duplicates_skipped'] = self.duplicates_skipped
+        return stats
+    
+    def _drop_duplicates(self, tasks):
+        """Kiểm tra lại lúc đưa vào hàng đợi: gallery có trong thư viện -> Completed; gallery đã tải
+        (có thể vừa xong ở task khác) hoặc đã có task khác cùng gallery chưa lỗi -> Duplicate; không tải
+        """
+        downloaded, in_library = self._find_downloaded([task.fingerprint for task in tasks if not task.force])
+        keep = []
+        for task in tasks:
+            if task.force:
+                keep.append(task)
+                continue
+            entry = in_library.get(task.fingerprint)
+            if entry is not None:
+                print(f"♻ Đã có trong thư viện: {entry['location']}")
+                self._mark_done(task, entry)
+                continue
+            owner = self._fingerprints.get(task.fingerprint)
+            if owner is not None and owner is not task and owner.status in ("Error", "Removed"):
+                # Task trước của gallery này lỗi/bị xóa: task này thay chỗ
+                self._fingerprints[task.fingerprint] = owner = task
+            if task.fingerprint in downloaded or (owner is not None and owner is not task):
+                print(f"♻ Bỏ qua gallery trùng: {task.url}")
+                self.duplicates_skipped += 1
+                self._update_task_progress(task, status="Duplicate")
+                continue
+            keep.append(task)
+        return keep
+        
+    def queue_task(self, task):
+        """Đưa một task vào hàng đợi tải"""
+        self.queue_tasks([task])
+        
+    def queue_tasks(self, tasks):
+        """Đưa nhiều task vào hàng đợi và mở sẵn kết nối tới các host sắp tải (bỏ gallery trùng)"""
+        tasks = self._drop_duplicates(tasks)
+        hosts = {}  # {host: [URL mẫu, số task]}
+        for task in tasks:
+            self.download_queue.put(task)
+            entry = hosts.setdefault(self.http.host_of(task.url), [task.url, 0])
+            entry[1] += 1
         
+        for sample_url, count in hosts.values():
+            self.http.prewarm(sample_url, connections=min(count, self.max_concurrent))
+            
     def start_downloads(self):
         """Bắt đầu các thread download"""
         if self.running:
             return
             
         self.running = True
+        self.retry_scheduler.start()
         for i in range(self.max_concurrent):
             thread = threading.Thread(target=self._download_worker, daemon=True)
             thread.start()
@@ -89,6 +412,15 @@ class DownloadManager:
     def stop_downloads(self):
         """Dừng các thread download"""
         self.running = False
+        self.retry_scheduler.stop()
+        self.transcoder.shutdown(wait=False)
+        # Ghi nốt ảnh đã tải còn trong hàng đợi ghi
+        if not self.disk_writer.drain(timeout=10):
+            print(f"⚠ Còn {self.disk_writer.pending_jobs} file chưa ghi xong")
+        # Lưu Bloom filter của index gallery đã tải (lần sau không phải dựng lại)
+        with self._url_index_lock:
+            if self._url_index is not None:
+                self._url_index.flush()
         
     def _download_worker(self):
         """Worker thread để xử lý download"""
@@ -96,12 +428,150 @@ class DownloadManager:
             try:
                 task = self.download_queue.get(timeout=1)
                 if task:
-                    self._process_download(task)
+                    host = self.http.host_of(task.url)
+                    self._enter_host(host)
+                    try:
+                        self._process_download(task)
+                    finally:
+                        self._leave_host(host)
             except queue.Empty:
                 continue
             except Exception as e:
                 print(f"Lỗi trong download worker: {e}")
                 
+    def _enter_host(self, host):
+        """Worker bắt đầu tải từ host: pool của host theo số worker đang dùng nó"""
+        if not host:
+            return
+        with self._active_lock:
+            count = self._active_hosts[host] = self._active_hosts.get(host, 0) + 1
+            self.http.set_host_concurrency(host, count)
+    
+    def _leave_host(self, host):
+        if not host:
+            return
+        with self._active_lock:
+            count = self._active_hosts.get(host, 0) - 1
+            if count > 0:
+                self._active_hosts[host] = count
+            else:
+                self._active_hosts.pop(host, None)
+            self.http.set_host_concurrency(host, max(count, 1))
+    
+    def _module_name(self, module):
+        """Tên module (dùng làm phạm vi cookie)"""
+        if not module:
+            return None
+        return module.get('info', {}).get('name')
+    
+    def _http_get(self, url, module=None, **kwargs):
+        """GET qua session của host, cookie jar theo module"""
+        return self.http.get(url, cookie_scope=self._module_name(module), **kwargs)
+    
+    def get_connection_stats(self):
+        """Thống kê connection/keep-alive theo host"""
+        return self.http.get_pool_stats()
+    
+    def get_latency_stats(self):
+        """Độ trễ và timeout hiện tại theo host"""
+        stats = self.http.get_latency_stats()
+        for host, entry in stats.items():
+            entry['timeout_image'] = self.http.latency.timeout_for(host, 'image')
+        return stats
+    
+    def get_mirror_stats(self):
+        """Điểm các mirror ảnh và số request dự phòng"""
+        return self.mirrors.get_stats()
+    
+    def get_circuit_states(self):
+        """Trạng thái circuit breaker theo host"""
+        return self.http.get_circuit_states()
+    
+    def get_task_stats(self):
+        """Số task theo status/host/module, tổng page và byte đã tải (không duyệt task)"""
+        return self.tasks.get_stats()
+    
+    def get_memory_stats(self):
+        """RAM đang dùng theo stage, đỉnh, số lần phải chờ/bỏ việc vì hết budget"""
+        return self.memory.get_stats()
+    
+    def get_disk_stats(self):
+        """Throughput ghi đĩa, độ sâu hàng đợi ghi, số lần fsync"""
+        return self.disk_writer.get_stats()
+    
+    def get_dedup_stats(self):
+        """Thống kê kho blob của lần chạy này (None nếu không bật BlobStore)"""
+        with self._blob_lock:
+            store = self._blob_store
+        return store.get_stats() if store is not None else None
+    
+    def _get_blob_store(self, download_dir):
+        """Kho blob trong <thư mục download>/.blobs nếu [Directories] BlobStore bật"""
+        if self.config.get('Directories', 'BlobStore', '0').strip().lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        root = Path(download_dir) / BLOB_DIR_NAME
+        with self._blob_lock:
+            if self._blob_store is None or self._blob_store.root != root:
+                # Đổi thư mục download: kho mới nằm cùng filesystem với thư mục mới (hardlink được);
+                # kho cũ không đóng vì task đang chạy có thể vẫn ghi vào
+                self._blob_store = BlobStore(root, self.config.get('Directories', 'BlobLinkMode', 'auto'))
+            return self._blob_store
+    
+    def _is_retryable(self, error):
+        """Lỗi tạm thời (mất kết nối, timeout, 429, 5xx) thì đáng tải lại"""
+        if isinstance(error, PageFetchError):
+            return True
+        if isinstance(error, requests.exceptions.HTTPError):
+            response = error.response
+            return response is None or response.status_code in (408, 425, 429) or response.status_code >= 500
+        return isinstance(error, (requests.exceptions.ConnectionError,
+                                  requests.exceptions.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+    
+    def _retry_after_of(self, response):
+        """Lấy Retry-After từ response 429/503 (nếu có)"""
+        if response is None or response.status_code not in (429, 503):
+            return None
+        return parse_retry_after(response.headers.get('Retry-After'))
+    
+    def _schedule_retry(self, task, reason, retry_after=None, pending_pages=None):
+        """Hẹn giờ tải lại task, trả về False nếu đã hết lượt thử (RetryFailed)"""
+        with task.lock:
+            if task.retry_count >= task.max_retries:
+                return False
+            task.retry_count += 1
+            attempt = task.retry_count
+            task.pending_pages = pending_pages
+            task.last_error = reason
+        
+        delay = self.retry_scheduler.schedule(task, attempt, retry_after)
+        with task.lock:
+            task.next_retry_at = time.time() + delay
+        self._update_task_progress(task, status="Retrying")
+        print(f"↻ Tải lại sau {delay:.1f}s (lần {attempt}/{task.max_retries}): {reason[:80]}")
+        return True
+    
+    def _park_task(self, task, reason, delay, pending_pages=None):
+        """Tạm gác task của host đang bị ngắt tới lần probe tiếp theo (không tính vào số lần retry)"""
+        with task.lock:
+            if pending_pages is not None:
+                task.pending_pages = pending_pages
+            task.last_error = reason
+            # Giãn nhẹ để các task của cùng host không cùng lúc quay lại
+            delay = max(delay, 1.0) + random.uniform(0, 1.0)
+            task.next_retry_at = time.time() + delay
+        self.retry_scheduler.schedule_in(task, delay)
+        self._update_task_progress(task, status="Host Down")
+    
+    def _on_retry_due(self, task):
+        """Tới giờ tải lại: đưa task về hàng đợi (bỏ qua nếu đã bị pause/xóa)"""
+        with task.lock:
+            if task.status not in ("Retrying", "Host Down"):
+                return
+            task.next_retry_at = None
+        self._update_task_progress(task, status="Queued")
+        self.queue_task(task)
+    
     def _update_task_progress(self, task, status=None, progress=None, error=None):
         """Update task progress thread-safe"""
         with task.lock:
@@ -125,13 +595,9 @@ class DownloadManager:
         try:
             self._update_task_progress(task, status="Processing", progress=0)
             
-            # Tìm module phù hợp cho URL
-            import sys
-            import os
-            sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from core.lua_module_loader import LuaModuleLoader
-            loader = LuaModuleLoader()
-            module = loader.find_module_for_url(task.url)
+            # Tìm module phù hợp cho URL (module loader dùng chung, không load lại mọi module cho mỗi task)
+            module = self._get_module_loader().find_module_for_url(task.url)
+            task.module_name = self._module_name(module)
             
             if not module:
                 self._update_task_progress(
@@ -141,6 +607,11 @@ class DownloadManager:
                 )
                 return
             
+            # Host đang bị ngắt: gác task lại, worker chuyển sang host khác
+            if self.http.is_host_down(task.url):
+                self._park_task(task, f"Host {self.http.host_of(task.url)} đang lỗi", self.http.retry_in(task.url))
+                return
+            
             # Nếu task chưa có thông tin, lấy thông tin trước
             with task.lock:
                 has_info = task.title and task.pages > 0
@@ -156,16 +627,34 @@ class DownloadManager:
                         task.chapters = info.get('chapters', 0)
                         task.pages = info.get('pages', 0)
                         task.total_pages = info.get('pages', 0)
+                        task.pages_known = info.get('pages_known', False)
+            
+            # Gallery cùng tên đã tải xong (manifest hoàn chỉnh, đúng số page) từ URL khác: không tải lại.
+            # Chỉ so khi biết số page thật, thư mục dở dang/không có manifest không bao giờ khớp
+            library = self._get_library()
+            if library is not None and not task.force:
+                with task.lock:
+                    title, pages = task.title, (task.total_pages if task.pages_known else 0)
+                entry = library.find_title(self._sanitize_filename(title), pages) if title else None
+                if entry is not None:
+                    print(f"♻ Đã có trong thư viện: {entry['location']}")
+                    self._mark_done(task, entry)
+                    return
             
             # Bắt đầu tải ảnh
             self._update_task_progress(task, status="Downloading", progress=10)
             self._download_manga_images(task, module)
                     
+        except CircuitOpenError as e:
+            self._park_task(task, str(e), e.retry_in)
         except requests.exceptions.RequestException as e:
+            reason = f"Lỗi kết nối: {str(e)[:100]}"
+            if self._is_retryable(e) and self._schedule_retry(task, reason, self._retry_after_of(e.response)):
+                return
             self._update_task_progress(
                 task, 
                 status="Error",
-                error=f"Lỗi kết nối: {str(e)[:100]}"
+                error=reason
             )
         except Exception as e:
             self._update_task_progress(
@@ -176,6 +665,10 @@ class DownloadManager:
     
     def _download_manga_images(self, task, module):
         """Tải thật các ảnh manga"""
+        storage = None
+        image_host = None  # Server ảnh của gallery (biết khi có URL ảnh đầu tiên), tính vào pool như host gallery
+        # Ảnh đang chờ convert (process pool) hoặc chờ ghi đĩa (DiskWriter): [(idx, page_item, future)]
+        pending_writes = []
         try:
             # Lấy thư mục download
             download_dir = Path(self.config.get('Directories', 'DownloadDirectory', str(Path.home() / 'Downloads' / 'Manga')))
@@ -186,224 +679,461 @@ class DownloadManager:
             
             # Sanitize tên thư mục
             safe_title = self._sanitize_filename(title)
-            manga_dir = download_dir / safe_title
-            manga_dir.mkdir(parents=True, exist_ok=True)
             
-            # Lấy danh sách ảnh pages (có thể trả về tuple (url, ext) hoặc string)
-            page_urls = self._get_page_urls(task.url, module)
+            # Thư mục ảnh rời hoặc file CBZ (archive dở từ lần trước được tiếp tục)
+            storage = open_storage(self.config.get('Directories', 'StorageMode', DEFAULT_STORAGE_MODE),
+                                   download_dir, safe_title, self._get_blob_store(download_dir), self.disk_writer)
             
-            if not page_urls:
-                # Thử lại với fallback nếu không tìm thấy
-                print("⚠ Không tìm thấy ảnh, thử fallback...")
-                # Có thể pages đã được set nhưng URL không tạo được
-                with task.lock:
-                    if task.total_pages > 0:
-                        # Đã có số pages, nhưng không tạo được URL
-                        self._update_task_progress(task, status="Error", error=f"Đã tìm thấy {task.total_pages} pages nhưng không tạo được URL ảnh")
+            # Tải ảnh bìa nếu có (đặt tên/định dạng theo output policy như các page)
+            module_name = self._module_name(module)
+            cover_name = None
+            cover_future = None
+            if task.cover_image_data:
+                cover_ext, cover_target = self.output_policy.plan(module_name, sniff_format(task.cover_image_data))
+                cover_name = storage.cover_name(cover_ext)
+                try:
+                    if storage.has(cover_name):
+                        pass
+                    elif cover_target:
+                        def write_cover(data):
+                            nonlocal cover_name
+                            # Convert lỗi (nhận lại byte gốc): giữ đuôi theo định dạng thật
+                            real_ext = sniff_format(data)
+                            if real_ext and real_ext != cover_ext:
+                                cover_name = storage.cover_name(real_ext)
+                            return self._write_behind(storage, cover_name, data)
+                        cover_future = self._transcode_behind(task.cover_image_data, write_cover,
+                                                              cover_target, cover_name)
                     else:
-                        self._update_task_progress(task, status="Error", error="Không tìm thấy ảnh nào để tải")
-                return
-            
-            # Xử lý page_urls - có thể là list of strings hoặc list of tuples
-            if page_urls and isinstance(page_urls[0], tuple):
-                # Đã là tuple (url, ext)
-                pass
-            else:
-                # Convert string URLs thành tuples
-                page_urls = [(url, '.jpg') if isinstance(url, str) else url for url in page_urls]
+                        cover_future = self._write_behind(storage, cover_name, task.cover_image_data)
+                    print(f"✓ Đã lưu ảnh bìa: {storage.location / cover_name}")
+                except Exception as e:
+                    print(f"⚠ Lỗi khi lưu ảnh bìa: {e}")
             
-            print(f"✓ Tìm thấy {len(page_urls)} URL ảnh để tải")
+            # Page đã có trong archive dở từ lần chạy trước (crash/thoát giữa chừng) không tải lại
+            resumed_pages = storage.saved_pages()
             
+            # Số pages ước lượng từ info (có thể thay đổi khi generator chạy xong)
             with task.lock:
-                task.total_pages = len(page_urls)
-                task.pages = len(page_urls)
+                expected_pages = task.total_pages
+                retry_pages = task.pending_pages
+                task.pending_pages = None
+                if retry_pages:
+                    saved_count = task.current_page
+                    downloaded_size = task.file_size
+                else:
+                    task.saved_pages = dict(resumed_pages)
+                    saved_count = len(resumed_pages)
+                    downloaded_size = sum(meta.get('size') or 0 for meta in resumed_pages.values())
+            if resumed_pages and not retry_pages:
+                print(f"↻ Bỏ qua {len(resumed_pages)} ảnh đã có trong archive")
+            
+            if retry_pages:
+                # Lần tải lại: chỉ tải các page lỗi lần trước
+                print(f"↻ Tải lại {len(retry_pages)} ảnh lỗi")
+                page_iter = iter(retry_pages)
+                total_pages = expected_pages
+            else:
+                # Danh sách ảnh pages là generator: ảnh đầu tiên được tải ngay khi biết URL,
+                # không chờ resolve xong toàn bộ danh sách
+                page_iter = enumerate(self._iter_page_urls(task.url, module), 1)
+                total_pages = 0
             
-            # Tải ảnh bìa nếu có
-            if task.cover_image_data:
-                cover_path = manga_dir / "cover.jpg"
-                try:
-                    with open(cover_path, 'wb') as f:
-                        f.write(task.cover_image_data)
-                    print(f"✓ Đã lưu ảnh bìa: {cover_path}")
-                except Exception as e:
-                    print(f"⚠ Lỗi khi lưu ảnh bìa: {e}")
+            # Page lỗi được gom lại và hẹn giờ tải lại, không làm worker phải chờ
+            failed_pages = []
+            retry_after = None
+            host_down = True  # Tất cả page lỗi đều do host ảnh bị ngắt
             
             # Tải từng ảnh page - kiểm tra kích thước thực tế để loại bỏ ảnh bìa/preview
-            total_pages = len(page_urls)
-            downloaded_size = 0
-            saved_count = 0
-            
-            for idx, page_item in enumerate(page_urls, 1):
+            for idx, page_item in page_iter:
                 if not self.running or task.status == "Paused":
+                    # Page chưa tải sẽ được tải lại khi resume
                     return
                 
+                if image_host is None:
+                    page_url = page_item.page_url if isinstance(page_item, DeferredPage) else (
+                        page_item[0] if isinstance(page_item, tuple) else page_item)
+                    image_host = self.http.host_of(page_url)
+                    if image_host == self.http.host_of(task.url):
+                        image_host = ''  # Cùng host với trang gallery: worker đã được tính
+                    self._enter_host(image_host)
+                
+                if not retry_pages:
+                    total_pages = idx
+                    if idx == 1:
+                        print(f"✓ Đã có URL ảnh đầu tiên, bắt đầu tải")
+                        # Mở sẵn kết nối tới server ảnh (CDN thường khác host của gallery)
+                        self.http.prewarm(page_url, connections=2, cookie_scope=self._module_name(module))
+                
+                # Cập nhật tổng số pages khi generator vượt quá số ước lượng
+                with task.lock:
+                    if idx > task.total_pages:
+                        task.total_pages = idx
+                        task.pages = idx
+                
+                if not retry_pages and idx in resumed_pages:
+                    continue
+                
                 try:
-                    # Xử lý URL và extension
-                    if isinstance(page_item, tuple):
-                        page_url, orig_ext = page_item
-                    else:
-                        page_url = page_item
-                        orig_ext = '.jpg'
-                    
-                    if idx <= 3 or idx % 10 == 0:  # Chỉ log một số ảnh để không spam
-                        print(f"Đang tải ảnh {idx}/{total_pages}: {page_url[:80]}...")
-                    
-                    # Thử tải với extension gốc trước
-                    response = None
-                    success = False
-                    
-                    # Thử với extension gốc
-                    try:
-                        response = self.session.get(page_url, timeout=30, stream=True, allow_redirects=True)
-                        if response.status_code == 200:
-                            success = True
-                    except:
-                        pass
-                    
-                    # Nếu không được, thử với .jpg
-                    if not success and orig_ext != '.jpg':
-                        jpg_url = page_url.rsplit('.', 1)[0] + '.jpg'
-                        try:
-                            response = self.session.get(jpg_url, timeout=30, stream=True, allow_redirects=True)
-                            if response.status_code == 200:
-                                page_url = jpg_url
-                                success = True
-                        except:
-                            pass
-                    
-                    # Nếu vẫn không được, thử với server khác (chỉ cho HentaiFox)
-                    if not success and 'hentaifox.com' in page_url:
-                        # Lấy server hiện tại từ URL
-                        current_server = None
-                        if 'i.hentaifox.com' in page_url:
-                            current_server = 'i'
-                        elif 'i2.hentaifox.com' in page_url:
-                            current_server = 'i2'
-                        elif 'i3.hentaifox.com' in page_url:
-                            current_server = 'i3'
-                        
-                        if current_server:
-                            for alt_server in ['i', 'i2', 'i3']:
-                                if alt_server != current_server:
-                                    # Thay server trong URL
-                                    alt_url = page_url.replace(f'{current_server}.hentaifox.com', f'{alt_server}.hentaifox.com')
-                                    
-                                    try:
-                                        response = self.session.get(alt_url, timeout=30, stream=True, allow_redirects=True)
-                                        if response.status_code == 200:
-                                            page_url = alt_url
-                                            success = True
-                                            print(f"  ✓ Thành công với server {alt_server}")
-                                            break
-                                    except:
-                                        continue
-                    
-                    if not success or not response or response.status_code != 200:
-                        print(f"⚠ Ảnh {idx} không tải được (status: {response.status_code if response else 'N/A'}), bỏ qua")
-                        continue
-                    
-                    response.raise_for_status()
-                    
-                    # Kiểm tra Content-Type (không quá strict)
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    if 'image' not in content_type and content_type and 'text' in content_type:
-                        print(f"⚠ Ảnh {idx} có Content-Type không phải image: {content_type}, vẫn thử tải...")
-                        # Vẫn tiếp tục, có thể server trả về sai Content-Type
-                    
-                    # Download vào memory để kiểm tra kích thước
-                    image_data = b''
-                    for chunk in response.iter_content(chunk_size=8192):
-                        image_data += chunk
-                        # Giới hạn 10MB để tránh memory issue
-                        if len(image_data) > 10 * 1024 * 1024:
-                            break
-                    
-                    if len(image_data) == 0:
-                        print(f"⚠ Ảnh {idx} rỗng, bỏ qua")
-                        continue
-                    
-                    # Kiểm tra kích thước ảnh thực tế bằng PIL (không quá strict)
-                    width, height = 0, 0
-                    try:
-                        from PIL import Image
-                        import io
-                        img = Image.open(io.BytesIO(image_data))
-                        width, height = img.size
-                        print(f"✓ Ảnh {idx}: {width}x{height}, size: {len(image_data)} bytes")
-                        
-                        # Chỉ bỏ qua nếu quá nhỏ (có thể là lỗi)
-                        if width < 100 or height < 100:
-                            print(f"⚠ Bỏ qua ảnh {idx}: quá nhỏ ({width}x{height}) - có thể là lỗi")
-                            continue
-                        
-                    except Exception as e:
-                        print(f"⚠ Không thể kiểm tra kích thước ảnh {idx}: {e}")
-                        # Vẫn lưu nếu không kiểm tra được (có thể là JPG hợp lệ)
-                        print(f"  Vẫn lưu ảnh {idx} (không parse được nhưng có thể là ảnh hợp lệ)")
-                    
-                    # Lưu ảnh với số thứ tự đúng (luôn dùng .jpg)
-                    saved_count += 1
-                    image_path = manga_dir / f"{saved_count}.jpg"
-                    
-                    # Nếu không phải JPG, convert về JPG
-                    if orig_ext != '.jpg' and width > 0 and height > 0:
-                        try:
-                            from PIL import Image
-                            import io
-                            img = Image.open(io.BytesIO(image_data))
-                            # Convert về RGB nếu cần (cho PNG có alpha)
-                            if img.mode in ('RGBA', 'LA', 'P'):
-                                rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                                if img.mode == 'P':
-                                    img = img.convert('RGBA')
-                                rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                                img = rgb_img
-                            # Save as JPG
-                            img.save(image_path, 'JPEG', quality=95)
-                            downloaded_size += image_path.stat().st_size
-                        except Exception as e:
-                            print(f"⚠ Không thể convert ảnh {idx} về JPG: {e}, lưu trực tiếp...")
-                            with open(image_path, 'wb') as f:
-                                f.write(image_data)
-                                downloaded_size += len(image_data)
-                    else:
-                        with open(image_path, 'wb') as f:
-                            f.write(image_data)
-                            downloaded_size += len(image_data)
-                    
-                    # Update progress
-                    with task.lock:
-                        task.current_page = saved_count
-                        task.file_size = downloaded_size
-                    
-                    progress = 20 + int((saved_count / total_pages) * 80) if total_pages > 0 else 100
-                    self._update_task_progress(task, progress=progress)
-                    
-                    size_info = f"({width}x{height})" if width > 0 and height > 0 else ""
-                    print(f"✓ Đã tải ảnh {saved_count}/{total_pages}: {image_path.name} {size_info}")
-                    
+                    saved_size = self._download_page(task, module, idx, page_item, storage, max(expected_pages, idx))
+                except PageFetchError as e:
+                    print(f"⚠ Ảnh {idx} không tải được ({e}), sẽ tải lại sau")
+                    if isinstance(page_item, DeferredPage):
+                        page_item.soup = None
+                    failed_pages.append((idx, page_item))
+                    host_down = host_down and e.host_down
+                    if e.retry_after is not None:
+                        retry_after = max(retry_after or 0, e.retry_after)
+                    continue
                 except Exception as e:
-                    print(f"⚠ Lỗi khi tải ảnh {idx}: {e}")
-                    # Tiếp tục với ảnh tiếp theo
+                    # Lỗi không lường trước: không bỏ page, tải lại cùng các page lỗi khác
+                    print(f"⚠ Lỗi khi tải ảnh {idx}: {e}, sẽ tải lại sau")
+                    if isinstance(page_item, DeferredPage):
+                        page_item.soup = None
+                    failed_pages.append((idx, page_item))
+                    host_down = False
                     continue
+                
+                if isinstance(saved_size, Future):
+                    # Ảnh chờ convert/ghi đĩa: thread tải chuyển sang page tiếp theo
+                    pending_writes.append((idx, page_item, saved_size))
+                    saved_size = 0
+                
+                # Ảnh đã ghi xong được tính vào tiến độ
+                sizes, write_failed = self._drain_writes(pending_writes)
+                failed_pages.extend(write_failed)
+                if saved_size:
+                    sizes.append(saved_size)
+                if not sizes:
+                    continue
+                
+                saved_count += len(sizes)
+                downloaded_size += sum(sizes)
+                
+                # Update progress
+                with task.lock:
+                    task.current_page = saved_count
+                    task.file_size = downloaded_size
+                
+                estimated_total = max(expected_pages, idx)
+                progress = 20 + int((saved_count / estimated_total) * 80)
+                self._update_task_progress(task, progress=min(progress, 99))
+            
+            # Chờ các ảnh còn đang convert/ghi
+            sizes, write_failed = self._drain_writes(pending_writes, wait=True)
+            failed_pages.extend(write_failed)
+            host_down = host_down and not write_failed
+            saved_count += len(sizes)
+            downloaded_size += sum(sizes)
+            with task.lock:
+                task.current_page = saved_count
+                task.file_size = downloaded_size
+            
+            if total_pages == 0:
+                # Generator không trả về ảnh nào
+                with task.lock:
+                    known_pages = task.total_pages
+                if known_pages > 0:
+                    self._update_task_progress(task, status="Error", error=f"Đã tìm thấy {known_pages} pages nhưng không tạo được URL ảnh")
+                else:
+                    self._update_task_progress(task, status="Error", error="Không tìm thấy ảnh nào để tải")
+                return
+            
+            if failed_pages and host_down:
+                # Host ảnh đang bị ngắt: gác lại tới lần probe, không tốn lượt retry
+                self._park_task(task, f"{len(failed_pages)} ảnh chờ host hoạt động lại",
+                                retry_after or 0, pending_pages=failed_pages)
+                return
+            
+            if failed_pages:
+                reason = f"{len(failed_pages)} ảnh không tải được"
+                if self._schedule_retry(task, reason, retry_after, pending_pages=failed_pages):
+                    return
+                self._update_task_progress(task, status="Error", error=f"{reason} sau {task.max_retries} lần thử lại")
+                return
             
             # Update total pages với số ảnh thực tế đã lưu
             with task.lock:
                 task.total_pages = saved_count
                 task.pages = saved_count
             
-            # Hoàn thành
+            # Manifest: nguồn, định dạng đầu ra và danh sách file page (dùng cho archive/thư viện)
+            # CBZ: manifest được ghi vào archive rồi archive mới được đổi tên thành .cbz
+            if cover_future is not None:
+                try:
+                    cover_future.result()
+                except Exception as e:
+                    print(f"⚠ Lỗi khi lưu ảnh bìa: {e}")
+                    cover_name = None
+            with task.lock:
+                saved_pages = dict(task.saved_pages)
+            manifest = build_manifest(task.url, title, module_name,
+                                      self.output_policy.format_for(module_name), saved_pages, cover=cover_name)
+            try:
+                location = storage.finalize(manifest)
+            except OSError as e:
+                self._update_task_progress(task, status="Error", error=f"Không hoàn tất lưu gallery: {e}"[:100])
+                return
+            
+            # Hoàn thành (đuôi file học theo host vẫn được giữ cho gallery khác)
+            self.url_learner.forget(task.url)
             self._update_task_progress(task, status="Completed", progress=100)
             with task.lock:
-                task.current_page = total_pages
+                task.current_page = saved_count
                 task.file_size = downloaded_size
-            
-            print(f"✓ Hoàn thành tải {total_pages} ảnh vào: {manga_dir}")
+                task.location = str(location)
+            index = self._get_url_index()
+            if index is not None:
+                index.add([task.fingerprint])
+            library = self._get_library()
+            if library is not None:
+                library.record(location, manifest, downloaded_size)
+            
+            print(f"✓ Hoàn thành tải {saved_count} ảnh vào: {location}")
                 
+        except requests.exceptions.RequestException:
+            # Lỗi mạng khi resolve danh sách page: để _process_download hẹn giờ tải lại
+            raise
         except Exception as e:
             import traceback
             traceback.print_exc()
             self._update_task_progress(task, status="Error", error=str(e)[:100])
+        finally:
+            self._leave_host(image_host)
+            if storage is not None:
+                # Pause/hẹn giờ tải lại: ghi nốt ảnh đang convert/chờ ghi rồi đóng (archive dở được giữ để tiếp tục)
+                self._drain_writes(pending_writes, wait=True)
+                storage.close()
+    
+    def _fetch_image(self, urls, module=None):
+        """GET ảnh từ danh sách URL mirror (hedged request), trả về (response, url, retry_after)"""
+        host = self.http.host_of(urls[0])
+        response, url, failed_response = self.mirrors.hedged_get(
+            urls,
+            lambda u: self._http_get(u, module, kind='image', stream=True, allow_redirects=True),
+            self.http.latency.hedge_delay(host, self.hedge_delay),
+            module_name=self._module_name(module)
+        )
+        retry_after = self._retry_after_of(failed_response)
+        if failed_response is not None:
+            failed_response.close()
+        return response, url, retry_after
+    
+    def _download_page(self, task, module, idx, page_item, storage, estimated_total):
+        """Tải một ảnh page và lưu vào storage với tên theo idx và đuôi theo output policy
+        
+        Trả về số byte đã lưu hoặc Future (0 nếu bỏ qua ảnh), raise PageFetchError nếu không tải được
+        """
+        # RAM cho buffer tải được giữ trước khi mở kết nối: budget đầy thì thread tải chờ ở đây
+        with self.memory.lease('fetch', FETCH_RESERVE) as lease:
+            return self._fetch_page(task, module, idx, page_item, storage, estimated_total, lease)
+    
+    def _fetch_page(self, task, module, idx, page_item, storage, estimated_total, lease):
+        """Phần thân của _download_page; buffer ảnh tăng tới đâu thì lease tăng tới đó"""
+        # Page trì hoãn: resolve URL ảnh ngay trước khi tải
+        if isinstance(page_item, DeferredPage):
+            try:
+                resolved = self._resolve_deferred_page(page_item, module)
+            except requests.exceptions.RequestException as e:
+                raise PageFetchError(f"không resolve được page: {str(e)[:60]}",
+                                     self._retry_after_of(getattr(e, 'response', None)))
+            if not resolved:
+                print(f"⚠ Không resolve được URL ảnh cho page {idx}, bỏ qua")
+                return 0
+            page_item = resolved
+        
+        # Xử lý URL và extension
+        if isinstance(page_item, tuple):
+            page_url, orig_ext = page_item
+        else:
+            page_url = page_item
+            orig_ext = self._guess_extension(page_url)
+        
+        # Các mirror của server ảnh (nhanh nhất trước), bỏ qua mirror đang bị ngắt
+        candidates = [u for u in self.mirrors.candidates(page_url, self._module_name(module))
+                      if not self.http.is_host_down(u)]
+        if not candidates:
+            # Host ảnh đang bị ngắt: báo lỗi ngay, không chờ timeout
+            raise PageFetchError("host đang tạm ngắt", self.http.retry_in(page_url), host_down=True)
+        
+        # Server đã phục vụ gallery lên đầu; đuôi file đã học thử trước, rồi tới đuôi khai báo, rồi .jpg
+        page_host = self.http.host_of(page_url)
+        candidates = self.url_learner.order_hosts(task.url, candidates)
+        ext_order = self.url_learner.extension_order(task.url, page_host, orig_ext)
+        
+        if idx <= 3 or idx % 10 == 0:  # Chỉ log một số ảnh để không spam
+            print(f"Đang tải ảnh {idx}/{estimated_total}: {replace_extension(candidates[0], ext_order[0])[:80]}...")
+        
+        response = None
+        retry_after = None
+        for attempt, ext in enumerate(ext_order, 1):
+            urls = candidates if ext == orig_ext else [replace_extension(u, ext) for u in candidates]
+            response, fetched_url, failed_retry_after = self._fetch_image(urls, module)
+            if response is not None:
+                self.url_learner.record(task.url, page_host, orig_ext, ext,
+                                        self.http.host_of(fetched_url), attempt)
+                break
+            if retry_after is None:
+                retry_after = failed_retry_after
+        
+        if response is None:
+            if self.http.is_host_down(page_url):
+                raise PageFetchError("host đang tạm ngắt", self.http.retry_in(page_url), host_down=True)
+            raise PageFetchError("không tải được từ server ảnh", retry_after)
+        
+        if fetched_url != candidates[0]:
+            print(f"  ✓ Thành công với {self.http.host_of(fetched_url)}")
+        page_url = fetched_url
+        
+        # Kiểm tra Content-Type (không quá strict)
+        content_type = response.headers.get('Content-Type', '').lower()
+        if 'image' not in content_type and content_type and 'text' in content_type:
+            print(f"⚠ Ảnh {idx} có Content-Type không phải image: {content_type}, vẫn thử tải...")
+            # Vẫn tiếp tục, có thể server trả về sai Content-Type
+        
+        # Download vào memory; kích thước ảnh được đọc từ header ngay khi có vài KB đầu
+        image_data = bytearray()
+        dimensions = None
+        probing = True
+        try:
+            for chunk in self.http.iter_content(response, chunk_size=8192):
+                image_data += chunk
+                if len(image_data) > lease.nbytes:
+                    lease.grow(len(image_data) + FETCH_RESERVE)
+                if probing:
+                    dimensions = probe_dimensions(image_data)
+                    if dimensions:
+                        probing = False
+                        _, width, height = dimensions
+                        # Chỉ bỏ qua nếu quá nhỏ (có thể là lỗi) - không tải phần còn lại
+                        if width < 100 or height < 100:
+                            response.close()
+                            print(f"⚠ Bỏ qua ảnh {idx}: quá nhỏ ({width}x{height}) - có thể là lỗi")
+                            return 0
+                    elif len(image_data) >= PROBE_LIMIT:
+                        probing = False
+                # Giới hạn 10MB để tránh memory issue
+                if len(image_data) > 10 * 1024 * 1024:
+                    break
+        except requests.exceptions.RequestException as e:
+            raise PageFetchError(f"mất kết nối khi tải: {str(e)[:60]}")
+        
+        if len(image_data) == 0:
+            raise PageFetchError("ảnh rỗng")
+        image_data = bytes(image_data)
+        
+        # Header không đọc được (định dạng lạ): để PIL đọc header (Image.open không decode pixel)
+        width, height = 0, 0
+        if dimensions:
+            _, width, height = dimensions
+            print(f"✓ Ảnh {idx}: {width}x{height}, size: {len(image_data)} bytes")
+        else:
+            try:
+                from PIL import Image
+                import io
+                with Image.open(io.BytesIO(image_data)) as img:
+                    width, height = img.size
+                print(f"✓ Ảnh {idx}: {width}x{height}, size: {len(image_data)} bytes")
+                
+                # Chỉ bỏ qua nếu quá nhỏ (có thể là lỗi)
+                if width < 100 or height < 100:
+                    print(f"⚠ Bỏ qua ảnh {idx}: quá nhỏ ({width}x{height}) - có thể là lỗi")
+                    return 0
+                
+            except Exception as e:
+                print(f"⚠ Không thể kiểm tra kích thước ảnh {idx}: {e}")
+                # Vẫn lưu nếu không kiểm tra được (có thể là JPG hợp lệ)
+                print(f"  Vẫn lưu ảnh {idx} (không parse được nhưng có thể là ảnh hợp lệ)")
+        
+        # Định dạng thật theo magic bytes (URL/g_th có thể ghi sai đuôi file)
+        actual_ext = (dimensions[0] if dimensions else sniff_format(image_data)) or orig_ext
+        
+        # Output policy: giữ nguyên byte (đuôi theo định dạng thật) hoặc chuyển sang định dạng đích
+        out_ext, target = self.output_policy.plan(self._module_name(module), actual_ext)
+        if not (width > 0 and height > 0):
+            # Không đọc được ảnh: không convert, lưu nguyên byte
+            out_ext, target = actual_ext, None
+        
+        # Lưu ảnh theo số thứ tự page - page tải lại giữ đúng vị trí
+        page_name = storage.page_name(idx, out_ext)
+        meta = {
+            'index': idx,
+            'file': page_name,
+            'format': out_ext.lstrip('.'),
+            'source_format': actual_ext.lstrip('.'),
+            'width': width,
+            'height': height,
+        }
+        
+        def store(data):
+            # Ghi page trên thread ghi đĩa, ghi nhận vào manifest khi ghi xong
+            name = page_name
+            if target:
+                # Convert lỗi (nhận lại byte gốc): giữ đuôi và định dạng thật, không ghi PNG thành .jpg
+                real_ext = sniff_format(data)
+                if real_ext and real_ext != out_ext:
+                    name = storage.page_name(idx, real_ext)
+                    meta['file'] = name
+                    meta['format'] = real_ext.lstrip('.')
+            meta['size'] = len(data)
+            saved_size = storage.write(name, data, meta)
+            with task.lock:
+                task.saved_pages[idx] = meta
+            return saved_size
+        
+        # Cần convert: chạy trong process pool (không chiếm GIL của thread tải)
+        if target:
+            if idx <= 3 or idx % 10 == 0:
+                print(f"  Ảnh {idx} ({actual_ext}) được đưa vào hàng đợi convert {target}")
+            return self._transcode_behind(image_data, lambda data: self._submit_write(data, store),
+                                          target, page_name)
+        
+        size_info = f"({width}x{height})" if width > 0 and height > 0 else ""
+        print(f"✓ Đã tải ảnh {idx}/{estimated_total}: {page_name} {size_info}")
+        return self._submit_write(image_data, store)
+    
+    def _transcode_behind(self, data, write, target, label):
+        """Đưa ảnh vào process pool convert; RAM ảnh gốc tính vào stage 'transcode' tới khi ghi xong"""
+        size = len(data)
+        self.memory.charge('transcode', size)
+        future = self.transcoder.submit(data, write, target, label=label)
+        future.add_done_callback(lambda f: self.memory.release('transcode', size))
+        return future
+    
+    def _submit_write(self, data, write):
+        """Đưa write(data) vào DiskWriter, trả về Future; RAM của data tính vào stage 'write' tới khi ghi xong"""
+        size = len(data)
+        self.memory.charge('write', size)
+        
+        def job():
+            try:
+                return write(data)
+            finally:
+                self.memory.release('write', size)
+        return self.disk_writer.submit(size, job)
+    
+    def _write_behind(self, storage, name, data):
+        """Ghi file qua DiskWriter, trả về Future (số byte đã ghi)"""
+        return self._submit_write(data, lambda data: storage.write(name, data))
+    
+    def _drain_writes(self, pending_writes, wait=False):
+        """Lấy kết quả các ảnh đã convert/ghi xong (wait=True: chờ hết)
+
+        Trả về (danh sách số byte đã ghi, [(idx, page_item)] convert/ghi lỗi); entry đã xong bị xóa khỏi pending_writes
+        """
+        sizes = []
+        failed = []
+        for entry in list(pending_writes):
+            idx, page_item, future = entry
+            if not wait and not future.done():
+                continue
+            pending_writes.remove(entry)
+            try:
+                sizes.append(future.result())
+            except Exception as e:
+                print(f"⚠ Lỗi khi convert/ghi ảnh {idx}: {e}")
+                failed.append((idx, page_item))
+        return sizes, failed
     
     def _sanitize_filename(self, filename):
         """Làm sạch tên file để dùng làm tên thư mục"""
@@ -417,33 +1147,51 @@ class DownloadManager:
             filename = filename[:200]
         return filename or "Unknown"
     
-    def _get_image_extension(self, response, url):
-        """Luôn trả về .jpg vì chỉ tải JPG"""
-        return '.jpg'
+    def _is_image_url(self, url):
+        """Kiểm tra xem URL có phải là URL ảnh không (JPG, PNG, GIF, WebP...)"""
+        return is_image_url(url)
     
-    def _is_jpg_url(self, url):
-        """Kiểm tra xem URL có phải là ảnh JPG không"""
-        url_lower = url.lower()
-        return url_lower.endswith('.jpg') or url_lower.endswith('.jpeg') or '.jpg' in url_lower or '.jpeg' in url_lower
+    def _guess_extension(self, url):
+        """Đoán extension ảnh từ URL (mặc định .jpg)"""
+        path = urlparse(url).path.lower()
+        for ext in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
+            if path.endswith(ext):
+                return '.jpg' if ext == '.jpeg' else ext
+        return '.jpg'
     
-    def _get_page_urls(self, url, module):
-        """Lấy danh sách URL của các ảnh pages từ reader/viewer"""
+    def _iter_page_urls(self, url, module):
+        """Generator trả về URL ảnh pages ngay khi resolve được từ reader/viewer
+        
+        Mỗi phần tử là tuple (url, ext), string URL, hoặc DeferredPage (cần resolve trước khi tải)
+        """
+        seen = set()
+        
+        def unseen(page_item):
+            key = page_item.page_url if isinstance(page_item, DeferredPage) else (
+                page_item[0] if isinstance(page_item, tuple) else page_item)
+            if not key or key in seen:
+                return False
+            seen.add(key)
+            return True
+        
         try:
             # Đọc HTML
-            response = self.session.get(url, timeout=15)
+            response = self._http_get(url, module, kind='page')
             response.raise_for_status()
             content = response.content[:1000000]  # Đọc 1MB để có đủ JavaScript
             soup = BeautifulSoup(content, 'html.parser')
+            reader_url = None
             
             # Pattern 1: Tìm reader URL và parse theo cách của HentaiFox
             if 'hentaifox.com' in url:
                 reader_url = self._find_reader_url_hentaifox(url, soup)
                 if reader_url:
                     print(f"✓ Tìm thấy reader URL: {reader_url}")
-                    page_urls = self._parse_hentaifox_pages(reader_url)
+                    page_urls = self._parse_hentaifox_pages(reader_url, module)
                     if page_urls and len(page_urls) > 0:
                         print(f"✓ Parse HentaiFox thành công: {len(page_urls)} ảnh")
-                        return page_urls
+                        yield from (p for p in page_urls if unseen(p))
+                        return
                     else:
                         print(f"⚠ Parse HentaiFox không tạo được URL ảnh (đã parse được JSON nhưng không tạo được URL)")
                 else:
@@ -455,41 +1203,164 @@ class DownloadManager:
             
             if reader_url:
                 # Lấy danh sách ảnh từ reader page
-                reader_response = self.session.get(reader_url, timeout=15)
+                reader_response = self._http_get(reader_url, module, kind='page')
                 reader_content = reader_response.content[:1000000]
                 reader_soup = BeautifulSoup(reader_content, 'html.parser')
                 
                 # Chỉ lấy ảnh từ reader/viewer area, không lấy ảnh bìa
                 page_urls = self._extract_images_from_reader_area(reader_url, reader_soup)
                 
+                # Reader mỗi page một ảnh: trả về từng page, resolve khi tới lượt tải
+                if len(page_urls) <= 1 or self._defers_page_requests(module):
+                    page_links = self._find_reader_page_links(reader_url, reader_soup)
+                    if len(page_links) > 1:
+                        print(f"✓ Reader có {len(page_links)} pages riêng, resolve từng page khi tải")
+                        for link in page_links:
+                            # Page hiện tại đã có HTML sẵn, không cần request lại
+                            same_page = link.rstrip('/') == reader_url.rstrip('/')
+                            page = DeferredPage(link, reader_soup if same_page else None)
+                            if unseen(page):
+                                yield page
+                        return
+                    
+                    # Không có danh sách page - đi theo link "next" từng page một
+                    if len(page_urls) == 1:
+                        yielded = False
+                        for page_item in self._walk_reader_pages(reader_url, reader_soup, module):
+                            if unseen(page_item):
+                                yielded = True
+                                yield page_item
+                        if yielded:
+                            return
+                
                 if page_urls:
-                    return page_urls
+                    yield from (p for p in page_urls if unseen(p))
+                    return
             
             # Pattern 3: Parse JavaScript để lấy danh sách ảnh
             page_urls = self._parse_images_from_javascript(content, url)
             if page_urls:
-                return page_urls
+                yield from (p for p in page_urls if unseen(p))
+                return
             
             # Pattern 4: Tìm trong reader area của trang hiện tại
             page_urls = self._extract_images_from_reader_area(url, soup)
             
-            # Loại bỏ duplicate và chỉ lấy JPG
-            seen = set()
-            unique_urls = []
+            # Loại bỏ duplicate, chỉ lấy URL ảnh
             for img_url in page_urls:
-                if img_url and img_url not in seen and img_url.startswith('http'):
-                    # Chỉ lấy ảnh JPG
-                    if self._is_jpg_url(img_url):
-                        seen.add(img_url)
-                        unique_urls.append(img_url)
-            
-            return unique_urls
+                if img_url and img_url.startswith('http') and self._is_image_url(img_url):
+                    if unseen(img_url):
+                        yield img_url
             
+        except (GeneratorExit, requests.exceptions.RequestException):
+            # Lỗi mạng được đẩy lên để hẹn giờ tải lại cả gallery
+            raise
         except Exception as e:
             print(f"Lỗi khi lấy danh sách ảnh: {e}")
             import traceback
             traceback.print_exc()
-            return []
+    
+    def _defers_page_requests(self, module):
+        """Module yêu cầu trì hoãn request từng page (module.DeferHttpRequests / BeforeDownloadPage)"""
+        if not module:
+            return False
+        info = module.get('info', {})
+        return bool(info.get('defer_http_requests') or info.get('resolves_pages_lazily'))
+    
+    def _find_reader_page_links(self, reader_url, soup):
+        """Tìm danh sách URL các page của reader dạng mỗi page một ảnh (select/pagination)"""
+        from urllib.parse import urljoin
+        import re
+        
+        links = []
+        # URL gốc của reader (bỏ số page ở cuối nếu có)
+        base_prefix = re.sub(r'/\d+$', '', reader_url.rstrip('/'))
+        
+        # Pattern 1: <select> chọn page với value là URL hoặc số page
+        for select in soup.find_all('select'):
+            select_attrs = (str(select.get('class', '')) + str(select.get('id', '')) + str(select.get('name', ''))).lower()
+            if 'page' not in select_attrs:
+                continue
+            for option in select.find_all('option'):
+                value = (option.get('value') or '').strip()
+                if not value:
+                    continue
+                if value.isdigit():
+                    links.append(f"{base_prefix}/{value}")
+                else:
+                    links.append(urljoin(reader_url, value))
+            if links:
+                return links
+        
+        # Pattern 2: link pagination có dạng <reader_url>/<số>
+        numbered = {}
+        for link in soup.find_all('a', href=True):
+            href = urljoin(reader_url, link.get('href'))
+            match = re.match(re.escape(base_prefix) + r'/(\d+)/?$', href)
+            if match:
+                numbered[int(match.group(1))] = href
+        if len(numbered) > 1:
+            links = [numbered[n] for n in sorted(numbered)]
+        
+        return links
+    
+    def _walk_reader_pages(self, reader_url, soup, module=None, max_pages=2000):
+        """Generator đi theo link "next" của reader, mỗi request trả về một ảnh"""
+        from urllib.parse import urljoin
+        
+        visited = set()
+        page_url = reader_url
+        while page_url and page_url not in visited and len(visited) < max_pages:
+            visited.add(page_url)
+            
+            images = self._extract_images_from_reader_area(page_url, soup)
+            if not images:
+                return
+            yield (images[0], self._guess_extension(images[0]))
+            
+            # Tìm link sang page kế tiếp
+            next_link = soup.find('a', attrs={'rel': 'next'}, href=True) or soup.find(
+                'a', href=True, class_=lambda x: x and 'next' in str(x).lower())
+            if not next_link:
+                return
+            page_url = urljoin(page_url, next_link.get('href'))
+            if page_url in visited:
+                return
+            
+            response = self._http_get(page_url, module, kind='page')
+            response.raise_for_status()
+            soup = BeautifulSoup(response.content[:1000000], 'html.parser')
+    
+    def _resolve_deferred_page(self, page, module=None):
+        """Resolve URL ảnh của một DeferredPage ngay trước khi tải"""
+        try:
+            soup = page.soup
+            if soup is None:
+                response = self._http_get(page.page_url, module, kind='page')
+                response.raise_for_status()
+                soup = BeautifulSoup(response.content[:1000000], 'html.parser')
+            page.soup = None  # Giải phóng HTML
+            
+            from urllib.parse import urljoin
+            
+            # Link download ảnh gốc (như Danbooru: //a[@download]/@href)
+            download_link = soup.find('a', attrs={'download': True}, href=True)
+            if download_link:
+                img_url = urljoin(page.page_url, download_link.get('href'))
+                return (img_url, self._guess_extension(img_url))
+            
+            images = self._extract_images_from_reader_area(page.page_url, soup)
+            if images:
+                return (images[0], self._guess_extension(images[0]))
+            
+            meta = soup.find('meta', attrs={'property': 'og:image'})
+            if meta and meta.get('content', '').startswith('http'):
+                img_url = meta.get('content')
+                return (img_url, self._guess_extension(img_url))
+        except Exception as e:
+            print(f"⚠ Lỗi khi resolve page {page.page_url}: {e}")
+        
+        return None
     
     def _find_reader_url_hentaifox(self, url, soup):
         """Tìm reader URL theo cách của HentaiFox"""
@@ -537,15 +1408,14 @@ class DownloadManager:
         print("⚠ Không tìm thấy reader URL")
         return None
     
-    def _parse_hentaifox_pages(self, reader_url):
+    def _parse_hentaifox_pages(self, reader_url, module=None):
         """Parse ảnh pages từ HentaiFox reader page theo đúng chuẩn HentaiFox.lua GetPages()"""
         try:
             import re
             import json
-            import random
             
             print(f"Đang parse HentaiFox reader: {reader_url}")
-            response = self.session.get(reader_url, timeout=15)
+            response = self._http_get(reader_url, module, kind='page')
             response.raise_for_status()
             content = response.text
             
@@ -608,11 +1478,13 @@ class DownloadManager:
             # local imageServers = { "i", "i2" }
             # local imageServer = imageServers[math.random(1, #imageServers)]
             # if not uniqueId or uniqueId > 140236 then imageServer = "i3" end
+            # Thay vì chọn ngẫu nhiên, chọn mirror đang nhanh nhất (khi tải vẫn hedge sang mirror khác)
             if unique_id > 140236:
                 image_server = "i3"
             else:
-                image_servers = ["i", "i2"]
-                image_server = random.choice(image_servers)
+                group = self.mirrors.group_for("https://i.hentaifox.com/", self._module_name(module))
+                best = group.best(["i.hentaifox.com", "i2.hentaifox.com"]) if group else None
+                image_server = best.split('.', 1)[0] if best else random.choice(["i", "i2"])
             
             # Tạo danh sách URL ảnh theo module Lua
             # FormatString('//{0}.{1}/{2}/{3}/{4}{5}', imageServer, module.Domain, imageDir, galleryId, pageNumber, pageExtension)
@@ -709,7 +1581,7 @@ class DownloadManager:
                         images_json = json.loads(match.group(1))
                         page_urls = []
                         for img_url in images_json:
-                            if isinstance(img_url, str) and self._is_jpg_url(img_url):
+                            if isinstance(img_url, str) and self._is_image_url(img_url):
                                 from urllib.parse import urljoin
                                 if not img_url.startswith('http'):
                                     img_url = urljoin(url, img_url)
@@ -783,7 +1655,7 @@ class DownloadManager:
             elif not src.startswith('http'):
                 src = urljoin(base_url, src)
             
-            if not src.startswith('http') or not self._is_jpg_url(src):
+            if not src.startswith('http') or not self._is_image_url(src):
                 continue
             
             src_lower = src.lower()
@@ -838,7 +1710,7 @@ class DownloadManager:
             # Chỉ lấy ảnh có vẻ là page (có số trong path hoặc tên file)
             import re
             # Kiểm tra xem có số trong path không (thường ảnh page có số)
-            has_number_in_path = bool(re.search(r'/\d+\.jpg|/\d+\.jpeg|page\d+|p\d+|_\d+\.jpg', url_path))
+            has_number_in_path = bool(re.search(r'/\d+\.(?:jpe?g|png|gif|webp|avif)|page\d+|p\d+|_\d+\.(?:jpe?g|png|gif|webp|avif)', url_path))
             
             # Hoặc ảnh từ image server (như hentaifox: i.hentaifox.com/image_dir/gallery_id/1.jpg)
             is_image_server = bool(re.search(r'/(i\d*|cdn|img|images|static)/', url_path))
@@ -857,8 +1729,8 @@ class DownloadManager:
     def _get_manga_info(self, url, module):
         """Lấy thông tin manga từ URL theo chuẩn module Lua"""
         try:
-            # Sử dụng session để tái sử dụng connection
-            response = self.session.get(url, timeout=20, stream=True, allow_redirects=True)
+            # Sử dụng session của host để tái sử dụng connection
+            response = self._http_get(url, module, kind='info', stream=True, allow_redirects=True)
             response.raise_for_status()
             
             content = response.content[:500000]  # Đọc 500KB để có đủ thông tin
@@ -930,17 +1802,21 @@ class DownloadManager:
                         pages = int(match.group(1))
                         break
             
+            # Không tìm thấy số page: 1 chỉ để task được phép bắt đầu, số page thật biết khi tải xong
             info['pages'] = pages if pages > 0 else 1
+            info['pages_known'] = pages > 0
             info['chapters'] = 1  # Mặc định 1 chapter cho gallery
             
             return info
             
+        except CircuitOpenError:
+            raise
         except requests.exceptions.Timeout:
-            raise Exception("Timeout khi kết nối đến server")
+            raise requests.exceptions.Timeout("Timeout khi kết nối đến server")
         except requests.exceptions.ConnectionError:
-            raise Exception("Không thể kết nối đến server")
+            raise requests.exceptions.ConnectionError("Không thể kết nối đến server")
         except requests.exceptions.HTTPError as e:
-            raise Exception(f"Lỗi HTTP {e.response.status_code}: {e.response.reason}")
+            raise requests.exceptions.HTTPError(f"Lỗi HTTP {e.response.status_code}: {e.response.reason}", response=e.response)
         except Exception as e:
             raise Exception(f"Lỗi khi lấy thông tin: {str(e)[:50]}")
         
@@ -960,9 +1836,30 @@ class DownloadManager:
         """Tiếp tục download"""
         if task.status == "Paused":
             task.status = "Queued"
-            self.download_queue.put(task)
+            self.queue_task(task)
             
+    def set_cover_image(self, task, content):
+        """Gán ảnh bìa của task (tính vào stage 'cover'); trả lại phần RAM của ảnh cũ trước khi giữ ảnh mới
+
+        False nếu budget gần đầy (task không có ảnh bìa); content=None chỉ bỏ ảnh cũ
+        """
+        if task.cover_image_data:
+            self.memory.release('cover', len(task.cover_image_data))
+            task.cover_image_data = None
+        if not content or task.status == "Removed":  # Task đã xóa trong lúc tải ảnh bìa: không giữ
+            return True
+        if not self.memory.try_reserve('cover', len(content)):
+            return False
+        task.cover_image_data = content
+        return True
+
     def remove_download(self, task):
         """Xóa download khỏi hàng đợi"""
         task.status = "Removed"
+        self.tasks.remove(task)
+        self.set_cover_image(task, None)
+        if self._fingerprints.get(task.fingerprint) is task:
+            del self._fingerprints[task.fingerprint]
+        if self.all_tasks.get(task.url) is task:
+            del self.all_tasks[task.url]
 
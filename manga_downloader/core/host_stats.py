@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Host Stats - Thống kê độ trễ theo host (connect, TTFB, throughput) để tính timeout thích ứng
+"""
+
+import threading
+import time
+from collections import deque
+import requests
+
+# Timeout mặc định theo loại request khi host chưa đủ mẫu (giây)
+DEFAULT_TIMEOUTS = {
+    'image': 30,
+    'page': 15,
+    'info': 20,
+    'cover': 10,
+}
+
+# Số mẫu tối thiểu trước khi tin vào percentile
+MIN_SAMPLES = 10
+
+# Kích thước cửa sổ trượt (số mẫu gần nhất)
+WINDOW_SIZE = 200
+
+class StalledStreamError(requests.exceptions.Timeout):
+    """Luồng tải quá chậm (throughput dưới ngưỡng tối thiểu)"""
+    pass
+
+class LatencyWindow:
+    """Cửa sổ trượt các mẫu gần nhất, tính percentile"""
+    def __init__(self, size=WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+
+    def add(self, value):
+        self._samples.append(value)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p):
+        """Percentile p (0-100), None nếu chưa có mẫu"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(round(p / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+class HostLatency:
+    """Độ trễ của một host: thời gian kết nối, thời gian tới byte đầu tiên, tốc độ tải"""
+    def __init__(self, host):
+        self.host = host
+        self.connect = LatencyWindow()  # Giây (TCP + TLS)
+        self.ttfb = LatencyWindow()  # Giây từ lúc gửi request tới khi có header
+        self.throughput = LatencyWindow()  # Byte/giây của body
+        self.stalls = 0  # Số lần luồng tải bị ngắt vì quá chậm
+        self.lock = threading.Lock()
+
+    def as_dict(self):
+        with self.lock:
+            def ms(window, p):
+                value = window.percentile(p)
+                return None if value is None else round(value * 1000, 1)
+            throughput = self.throughput.percentile(50)
+            return {
+                'connect_p50_ms': ms(self.connect, 50),
+                'connect_p99_ms': ms(self.connect, 99),
+                'ttfb_p50_ms': ms(self.ttfb, 50),
+                'ttfb_p99_ms': ms(self.ttfb, 99),
+                'throughput_p50_kbps': None if throughput is None else round(throughput / 1024, 1),
+                'samples': len(self.ttfb),
+                'stalls': self.stalls,
+            }
+
+class HostLatencyTracker:
+    """Tính timeout (connect, read) cho từng host từ percentile độ trễ
+
+    timeout = p99 × factor, kẹp trong [floor, ceiling]; host chưa đủ mẫu dùng DEFAULT_TIMEOUTS
+    """
+    def __init__(self, factor=3.0, connect_floor=2.0, connect_ceiling=15.0,
+                 read_floor=3.0, read_ceiling=60.0, min_throughput=4096):
+        self.factor = float(factor)
+        self.connect_floor = float(connect_floor)
+        self.connect_ceiling = float(connect_ceiling)
+        self.read_floor = float(read_floor)
+        self.read_ceiling = float(read_ceiling)
+        self.min_throughput = float(min_throughput)  # Byte/giây tối thiểu trước khi coi là stall
+        self._hosts = {}  # {host: HostLatency}
+        self._lock = threading.Lock()
+
+    def latency_for(self, host):
+        host = (host or "").lower()
+        with self._lock:
+            latency = self._hosts.get(host)
+            if latency is None:
+                latency = self._hosts[host] = HostLatency(host)
+            return latency
+
+    def record_connect(self, host, seconds):
+        latency = self.latency_for(host)
+        with latency.lock:
+            latency.connect.add(seconds)
+
+    def record_ttfb(self, host, seconds):
+        latency = self.latency_for(host)
+        with latency.lock:
+            latency.ttfb.add(seconds)
+
+    def record_throughput(self, host, nbytes, seconds):
+        # Body quá nhỏ đo không chính xác
+        if nbytes < 16 * 1024 or seconds <= 0:
+            return
+        latency = self.latency_for(host)
+        with latency.lock:
+            latency.throughput.add(nbytes / seconds)
+
+    def timeout_for(self, host, kind='page'):
+        """Trả về (connect_timeout, read_timeout) cho request loại kind tới host"""
+        default = float(DEFAULT_TIMEOUTS.get(kind, DEFAULT_TIMEOUTS['page']))
+        latency = self.latency_for(host)
+        with latency.lock:
+            connect_p99 = latency.connect.percentile(99) if len(latency.connect) >= MIN_SAMPLES else None
+            ttfb_p99 = latency.ttfb.percentile(99) if len(latency.ttfb) >= MIN_SAMPLES else None
+
+        connect_timeout = min(default, self.connect_ceiling)
+        if connect_p99 is not None:
+            connect_timeout = min(max(connect_p99 * self.factor, self.connect_floor), self.connect_ceiling)
+
+        read_timeout = default
+        if ttfb_p99 is not None:
+            read_timeout = min(max(ttfb_p99 * self.factor, self.read_floor), self.read_ceiling)
+        return (round(connect_timeout, 2), round(read_timeout, 2))
+
+    def hedge_delay(self, host, default=2.0):
+        """Thời gian chờ trước khi gửi request dự phòng: p95 TTFB của host (default nếu chưa đủ mẫu)"""
+        latency = self.latency_for(host)
+        with latency.lock:
+            if len(latency.ttfb) < MIN_SAMPLES:
+                return default
+            return max(latency.ttfb.percentile(95), 0.05)
+
+    def iter_content(self, response, host, chunk_size=8192, grace=2.0, window=3.0):
+        """iter_content có kiểm tra tốc độ: raise StalledStreamError nếu throughput
+        trong cửa sổ window giây thấp hơn min_throughput (sau grace giây đầu)"""
+        started = time.monotonic()
+        window_start = started
+        window_bytes = 0
+        total = 0
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            now = time.monotonic()
+            total += len(chunk)
+            window_bytes += len(chunk)
+            if now - window_start >= window:
+                rate = window_bytes / (now - window_start)
+                if now - started >= grace and rate < self.min_throughput:
+                    latency = self.latency_for(host)
+                    with latency.lock:
+                        latency.stalls += 1
+                    response.close()
+                    raise StalledStreamError(
+                        f"Tốc độ tải quá chậm ({rate / 1024:.1f} KB/s) từ {host}")
+                window_start = now
+                window_bytes = 0
+            yield chunk
+        self.record_throughput(host, total, time.monotonic() - started)
+
+    def get_stats(self):
+        """Thống kê độ trễ theo host: {host: {...}}"""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {h.host: h.as_dict() for h in hosts}
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP Session Manager - Mỗi host một session/connection pool riêng, cookie jar riêng cho từng module
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from core.circuit_breaker import CircuitBreakerRegistry
+from core.dns_cache import DNSCache
+from core.host_stats import HostLatencyTracker
+
+# Giới hạn kích thước pool cho một host (tránh mở quá nhiều kết nối tới một server)
+MAX_POOL_SIZE = 64
+
+# Pool nhỏ nhất cho một host (một worker vẫn có thể mở sẵn 2 kết nối / gửi hedged request)
+MIN_POOL_SIZE = 2
+
+# Số kết nối mở sẵn tối đa cho một host khi lên lịch tải
+PREWARM_CONNECTIONS = 4
+
+# Không mở sẵn lại cho host vừa được mở sẵn (giây)
+PREWARM_INTERVAL = 30
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+class HostPoolStats:
+    """Bộ đếm connection của một host - để kiểm tra hiệu quả keep-alive"""
+    def __init__(self, host):
+        self.host = host
+        self.requests = 0  # Số request đã gửi
+        self.connections = 0  # Số lần mở kết nối TCP/TLS mới
+        self.prewarmed = 0  # Số kết nối mở sẵn trước khi có request
+        self.discarded = 0  # Số connection bị bỏ vì pool đầy
+        self.in_flight = 0  # Số request đang chạy
+        self.peak_in_flight = 0  # Số request đồng thời cao nhất
+        self.lock = threading.Lock()
+
+    def reused(self):
+        """Số request dùng lại connection có sẵn (kể cả connection mở sẵn)"""
+        return max(self.requests - (self.connections - self.prewarmed), 0)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'host': self.host,
+                'requests': self.requests,
+                'connections': self.connections,
+                'reused': self.reused(),
+                'reuse_ratio': self.reused() / self.requests if self.requests else 0.0,
+                'prewarmed': self.prewarmed,
+                'discarded': self.discarded,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+            }
+
+class _HostAdapter(HTTPAdapter):
+    """HTTPAdapter đếm request/connection cho một host"""
+    def __init__(self, stats, dns_cache=None, latency=None, **kwargs):
+        self.stats = stats
+        self.dns_cache = dns_cache
+        self.latency = latency
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = _counting_pool_classes(self.stats, self.dns_cache, self.latency)
+
+    def send(self, request, **kwargs):
+        with self.stats.lock:
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.stats.in_flight)
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            with self.stats.lock:
+                self.stats.in_flight -= 1
+
+def _counting_pool_classes(stats, dns_cache=None, latency=None):
+    """Tạo connection pool class đếm số lần mở kết nối mới, đo thời gian kết nối và dùng DNS cache cho host"""
+    class CountingConnectionMixin:
+        def connect(self):
+            with stats.lock:
+                stats.connections += 1
+            started = time.monotonic()
+            super().connect()
+            if latency is not None:
+                latency.record_connect(stats.host, time.monotonic() - started)
+
+        def _new_conn(self):
+            host = self._dns_host
+            if dns_cache is None or dns_cache.is_ip_address(host):
+                return super()._new_conn()
+            try:
+                addresses = dns_cache.resolve(host, self.port)
+            except OSError:
+                # Để urllib3 tự báo lỗi phân giải tên miền như bình thường
+                return super()._new_conn()
+
+            # Kết nối thẳng tới IP đã cache (SNI/Host header vẫn dùng self.host)
+            last_error = None
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception as e:
+                    last_error = e
+                finally:
+                    self._dns_host = host
+            dns_cache.invalidate(host)
+            raise last_error
+
+    class CountingHTTPConnection(CountingConnectionMixin, HTTPConnection):
+        pass
+
+    class CountingHTTPSConnection(CountingConnectionMixin, HTTPSConnection):
+        pass
+
+    class CountingHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = CountingHTTPConnection
+
+        def _put_conn(self, conn):
+            if self.pool is not None and self.pool.full():
+                with stats.lock:
+                    stats.discarded += 1
+            super()._put_conn(conn)
+
+    class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = CountingHTTPSConnection
+
+        def _put_conn(self, conn):
+            if self.pool is not None and self.pool.full():
+                with stats.lock:
+                    stats.discarded += 1
+            super()._put_conn(conn)
+
+    return {'http': CountingHTTPConnectionPool, 'https': CountingHTTPSConnectionPool}
+
+class SessionManager:
+    """Quản lý requests.Session theo host
+
+    - Mỗi (module, host) có session và connection pool riêng, kích thước theo số request đồng thời tới host
+    - Các host của cùng một module dùng chung cookie jar (global.SetCookies), module khác nhau không lẫn cookie
+    """
+    def __init__(self, per_host_connections=10, headers=None, dns_ttl=300,
+                 failure_threshold=5, reset_timeout=30.0, latency=None):
+        self.per_host_connections = max(int(per_host_connections), 1)
+        self.dns_cache = DNSCache(ttl=dns_ttl)
+        # Timeout theo độ trễ thực tế của từng host
+        self.latency = latency or HostLatencyTracker()
+        self.breakers = CircuitBreakerRegistry(failure_threshold, reset_timeout)
+        self._prewarmed_at = {}  # {host: thời điểm mở sẵn gần nhất}
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self._sessions = {}  # {(cookie_scope, host): requests.Session}
+        self._pool_sizes = {}  # {(cookie_scope, host): pool_maxsize}
+        self._host_concurrency = {}  # {host: số request đồng thời dự kiến}
+        self._cookie_jars = {}  # {cookie_scope: RequestsCookieJar}
+        self._stats = {}  # {host: HostPoolStats}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        """Lấy host (lowercase) từ URL"""
+        return (urlparse(url).hostname or '').lower()
+
+    def _stats_for(self, host):
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = HostPoolStats(host)
+        return stats
+
+    def _pool_size_for(self, host):
+        return max(min(self._host_concurrency.get(host, self.per_host_connections), MAX_POOL_SIZE), MIN_POOL_SIZE)
+
+    def _resize_pools(self, host, key=None):
+        """Gắn lại pool theo concurrency hiện tại của host (đang giữ lock)
+
+        Lớn lên ngay; nhỏ lại chỉ khi host không còn request đang chạy (không đóng kết nối đang dùng)
+        """
+        pool_size = self._pool_size_for(host)
+        keys = [key] if key is not None else [k for k in self._sessions if k[1] == host]
+        for key in keys:
+            current = self._pool_sizes[key]
+            if pool_size > current or (pool_size < current and not self._stats_for(host).in_flight):
+                self._mount(self._sessions[key], host, pool_size)
+                self._pool_sizes[key] = pool_size
+
+    def _mount(self, session, host, pool_size):
+        """Gắn adapter với pool pool_size cho session; adapter cũ (nếu có) được đóng"""
+        old = session.adapters.get("https://")
+        adapter = _HostAdapter(
+            self._stats_for(host),
+            dns_cache=self.dns_cache,
+            latency=self.latency,
+            # Chỉ thử lại kết nối một lần ngay lập tức, không sleep trong worker;
+            # các lỗi khác do RetryScheduler hẹn giờ tải lại
+            max_retries=Retry(total=1, connect=1, read=0, status=0, backoff_factor=0,
+                              respect_retry_after_header=False),
+            pool_connections=4,  # http/https + host redirect
+            pool_maxsize=pool_size
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if isinstance(old, _HostAdapter):
+            # Đóng pool cũ: kết nối rảnh được đóng ngay, kết nối đang dùng đóng khi request xong
+            old.close()
+
+    def cookie_jar(self, cookie_scope):
+        """Cookie jar dùng chung cho tất cả host của một module"""
+        with self._lock:
+            jar = self._cookie_jars.get(cookie_scope)
+            if jar is None:
+                jar = self._cookie_jars[cookie_scope] = RequestsCookieJar()
+            return jar
+
+    def session_for(self, url, cookie_scope=None):
+        """Lấy session cho URL (tạo mới nếu chưa có)"""
+        host = self.host_of(url)
+        scope = cookie_scope or host
+        key = (scope, host)
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                if self._pool_sizes[key] != self._pool_size_for(host):
+                    # Pool nhỏ lại đang chờ host rảnh
+                    self._resize_pools(host, key)
+                return session
+
+            session = requests.Session()
+            session.headers.update(self.headers)
+            jar = self._cookie_jars.get(scope)
+            if jar is None:
+                jar = self._cookie_jars[scope] = RequestsCookieJar()
+            session.cookies = jar
+
+            pool_size = self._pool_size_for(host)
+            self._mount(session, host, pool_size)
+            self._sessions[key] = session
+            self._pool_sizes[key] = pool_size
+            return session
+
+    def get(self, url, cookie_scope=None, kind=None, **kwargs):
+        """GET qua session của host
+
+        kind ('image', 'page', 'info', 'cover'): nếu không truyền timeout, timeout (connect, read)
+        được tính từ độ trễ của host. Raise CircuitOpenError ngay (không chờ timeout) nếu host đang bị tạm ngắt
+        """
+        host = self.host_of(url)
+        breaker = self.breakers.breaker_for(host)
+        breaker.check()
+        if kind and 'timeout' not in kwargs:
+            kwargs['timeout'] = self.latency.timeout_for(host, kind)
+        try:
+            response = self.session_for(url, cookie_scope).get(url, **kwargs)
+        except requests.exceptions.ReadTimeout:
+            # Tính cả request timeout vào thống kê để timeout không bị kéo xuống quá thấp
+            timeout = kwargs.get('timeout')
+            if isinstance(timeout, tuple):
+                timeout = timeout[1]
+            if timeout:
+                self.latency.record_ttfb(host, float(timeout))
+            breaker.record_failure()
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            breaker.record_failure()
+            raise
+        except Exception:
+            breaker.cancel_probe()
+            raise
+
+        # Với stream=True, elapsed là thời gian tới khi nhận xong header (TTFB)
+        self.latency.record_ttfb(host, response.elapsed.total_seconds())
+
+        # 5xx là host lỗi; 4xx (kể cả 429) nghĩa là host vẫn trả lời
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def iter_content(self, response, chunk_size=8192):
+        """Đọc body theo chunk, ngắt nếu tốc độ tải dưới ngưỡng (StalledStreamError) và ghi nhận throughput"""
+        return self.latency.iter_content(response, self.host_of(response.url), chunk_size=chunk_size)
+
+    def is_host_down(self, url):
+        """Host của URL đang bị tạm ngắt (breaker mở)"""
+        return self.breakers.breaker_for(self.host_of(url)).is_open()
+
+    def retry_in(self, url):
+        """Số giây tới lần thử lại host của URL"""
+        return self.breakers.breaker_for(self.host_of(url)).retry_in()
+
+    def prewarm(self, url, connections=2, cookie_scope=None):
+        """Mở sẵn vài kết nối keep-alive tới host của URL (chạy nền)
+
+        Request đầu tiên tới host sẽ dùng lại các kết nối này thay vì chờ DNS + TCP + TLS
+        """
+        host = self.host_of(url)
+        if not host or self.is_host_down(url):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            last = self._prewarmed_at.get(host)
+            if last is not None and now - last < PREWARM_INTERVAL:
+                return None
+            self._prewarmed_at[host] = now
+
+        connections = max(1, min(int(connections), PREWARM_CONNECTIONS, self._pool_size_for(host)))
+        thread = threading.Thread(
+            target=self._prewarm_connections,
+            args=(url, connections, cookie_scope),
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _connection_pool_for(self, session, url):
+        """Lấy đúng urllib3 pool mà session sẽ dùng cho URL"""
+        adapter = session.get_adapter(url)
+        settings = session.merge_environment_settings(url, {}, None, None, None)
+        request = requests.Request('GET', url).prepare()
+        if hasattr(adapter, 'get_connection_with_tls_context'):
+            return adapter.get_connection_with_tls_context(
+                request, settings.get('verify', True), proxies=settings.get('proxies'), cert=settings.get('cert'))
+        return adapter.get_connection(url, settings.get('proxies'))
+
+    def _prewarm_connections(self, url, connections, cookie_scope=None):
+        host = self.host_of(url)
+        try:
+            # Phân giải DNS trước (vào cache)
+            parsed = urlparse(url)
+            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+            if not self.dns_cache.is_ip_address(host):
+                self.dns_cache.resolve(host, port)
+
+            session = self.session_for(url, cookie_scope)
+            pool = self._connection_pool_for(session, url)
+            with self._lock:
+                stats = self._stats_for(host)
+
+            conns = []
+            try:
+                for _ in range(connections):
+                    conn = pool._get_conn()
+                    conns.append(conn)
+                    if getattr(conn, 'sock', None) is None:
+                        conn.timeout = 10
+                        conn.connect()
+                        with stats.lock:
+                            stats.prewarmed += 1
+            finally:
+                # Trả kết nối về pool để request sau dùng lại
+                for conn in conns:
+                    pool._put_conn(conn)
+        except Exception as e:
+            print(f"⚠ Không mở sẵn được kết nối tới {host}: {str(e)[:80]}")
+
+    def set_host_concurrency(self, host, concurrency):
+        """Đặt số request đồng thời hiện tại tới host (số worker đang tải từ host), pool theo kích thước này"""
+        host = host.lower()
+        concurrency = max(int(concurrency), 1)
+        with self._lock:
+            if self._host_concurrency.get(host) == concurrency:
+                return
+            self._host_concurrency[host] = concurrency
+            self._resize_pools(host)
+
+    def get_pool_stats(self):
+        """Thống kê connection theo host: {host: {...}}"""
+        with self._lock:
+            stats = list(self._stats.values())
+        return {s.host: s.as_dict() for s in stats}
+
+    def get_latency_stats(self):
+        """Độ trễ theo host (p50/p99 connect, TTFB, throughput): {host: {...}}"""
+        return self.latency.get_stats()
+
+    def get_circuit_states(self):
+        """Trạng thái circuit breaker theo host: {host: {...}}"""
+        return self.breakers.get_states()
+
+    def close(self):
+        """Đóng tất cả sessions"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._pool_sizes.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except:
+                pass
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Image Probe - Nhận dạng định dạng/kích thước ảnh từ header và học đuôi file/server đúng của từng gallery
+"""
+
+import threading
+from urllib.parse import urlparse, urlunparse
+
+# Số byte đầu tối đa đọc để tìm kích thước ảnh (JPEG có EXIF/ICC lớn cần nhiều hơn vài KB)
+PROBE_LIMIT = 256 * 1024
+
+# Đuôi file ảnh được chấp nhận trong URL
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.bmp')
+
+# Số lần xác nhận trước khi tin vào đuôi file đã học
+GALLERY_CONFIDENCE = 2  # Trong cùng gallery
+HOST_CONFIDENCE = 5  # Áp dụng cho gallery khác của cùng host
+
+def sniff_format(data):
+    """Định dạng ảnh theo magic bytes ('.jpg', '.png', ...), None nếu không nhận ra"""
+    if not data or len(data) < 12:
+        return None
+    if data[:3] == b'\xff\xd8\xff':
+        return '.jpg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return '.png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return '.avif'
+    if data[:2] == b'BM':
+        return '.bmp'
+    return None
+
+def probe_dimensions(data):
+    """Đọc (định dạng, rộng, cao) từ header ảnh mà không decode
+
+    Hỗ trợ JPEG (SOF), PNG (IHDR), GIF, WebP (VP8/VP8L/VP8X), BMP.
+    Trả về None nếu header chưa đủ dữ liệu hoặc không nhận ra định dạng
+    """
+    fmt = sniff_format(data)
+    try:
+        if fmt == '.png':
+            if len(data) >= 24 and data[12:16] == b'IHDR':
+                return fmt, int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+        elif fmt == '.gif':
+            return fmt, int.from_bytes(data[6:8], 'little'), int.from_bytes(data[8:10], 'little')
+        elif fmt == '.webp':
+            chunk = data[12:16]
+            if chunk == b'VP8 ' and len(data) >= 30:
+                return (fmt, int.from_bytes(data[26:28], 'little') & 0x3FFF,
+                        int.from_bytes(data[28:30], 'little') & 0x3FFF)
+            if chunk == b'VP8L' and len(data) >= 25:
+                bits = int.from_bytes(data[21:25], 'little')
+                return fmt, (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8X' and len(data) >= 30:
+                return fmt, int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        elif fmt == '.bmp':
+            if len(data) >= 26:
+                return (fmt, int.from_bytes(data[18:22], 'little', signed=True),
+                        abs(int.from_bytes(data[22:26], 'little', signed=True)))
+        elif fmt == '.jpg':
+            return _probe_jpeg(data)
+    except (IndexError, ValueError):
+        pass
+    return None
+
+def _probe_jpeg(data):
+    """Duyệt các marker JPEG tới SOFn để lấy kích thước"""
+    pos = 2
+    size = len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Byte đệm
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Marker không có độ dài
+            pos += 2
+            continue
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        # SOF0..SOF15 trừ DHT (C4), JPG (C8), DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if pos + 9 > size:
+                return None
+            height = int.from_bytes(data[pos + 5:pos + 7], 'big')
+            width = int.from_bytes(data[pos + 7:pos + 9], 'big')
+            return '.jpg', width, height
+        pos += 2 + length
+    return None
+
+def is_image_url(url):
+    """URL có dạng URL ảnh (mọi định dạng, không chỉ JPG)"""
+    url_lower = url.lower()
+    return any(ext in url_lower for ext in IMAGE_EXTENSIONS)
+
+def replace_extension(url, ext):
+    """Đổi đuôi file trong path của URL (giữ nguyên query)"""
+    parsed = urlparse(url)
+    path = parsed.path
+    slash = path.rfind('/')
+    dot = path.rfind('.')
+    if dot > slash:
+        path = path[:dot]
+    return urlunparse(parsed._replace(path=path + ext))
+
+class PageUrlLearner:
+    """Học đuôi file và server ảnh thật của gallery sau vài page đầu
+
+    Ví dụ g_th khai báo .png nhưng server chỉ có .jpg: sau GALLERY_CONFIDENCE page,
+    các page sau của gallery sẽ request thẳng .jpg thay vì thử .png trước.
+    """
+    def __init__(self):
+        self._gallery_ext = {}  # {(gallery, đuôi khai báo): [đuôi thật, số lần xác nhận]}
+        self._host_ext = {}  # {(host, đuôi khai báo): [đuôi thật, số lần xác nhận]}
+        self._gallery_host = {}  # {gallery: host mirror đã phục vụ gallery}
+        self._lock = threading.Lock()
+        self.first_hits = 0  # Page tải được ngay với URL đầu tiên
+        self.extra_requests = 0  # Request thừa do đoán sai đuôi file
+
+    def extension_order(self, gallery, host, declared_ext):
+        """Thứ tự đuôi file nên thử cho page: đuôi đã học trước, rồi đuôi khai báo, rồi .jpg"""
+        with self._lock:
+            learned = None
+            entry = self._gallery_ext.get((gallery, declared_ext))
+            if entry and entry[1] >= GALLERY_CONFIDENCE:
+                learned = entry[0]
+            else:
+                entry = self._host_ext.get((host, declared_ext))
+                if entry and entry[1] >= HOST_CONFIDENCE:
+                    learned = entry[0]
+        order = []
+        for ext in (learned, declared_ext, '.jpg'):
+            if ext and ext not in order:
+                order.append(ext)
+        return order
+
+    def order_hosts(self, gallery, urls):
+        """Đưa mirror đã phục vụ gallery lên đầu (gallery mới có thể chỉ nằm trên một server)"""
+        with self._lock:
+            host = self._gallery_host.get(gallery)
+        if not host:
+            return urls
+        preferred = [u for u in urls if (urlparse(u).hostname or "").lower() == host]
+        return preferred + [u for u in urls if u not in preferred]
+
+    def record(self, gallery, host, declared_ext, served_ext, served_host, attempts):
+        """Ghi nhận URL đã tải được: served_ext là đuôi trong URL thành công, attempts là số lượt đuôi đã thử"""
+        with self._lock:
+            for table, key in ((self._gallery_ext, (gallery, declared_ext)), (self._host_ext, (host, declared_ext))):
+                entry = table.get(key)
+                if entry and entry[0] == served_ext:
+                    entry[1] += 1
+                else:
+                    table[key] = [served_ext, 1]
+            if served_host:
+                self._gallery_host[gallery] = served_host.lower()
+            if attempts <= 1:
+                self.first_hits += 1
+            else:
+                self.extra_requests += attempts - 1
+
+    def forget(self, gallery):
+        """Xóa những gì đã học của gallery (khi gallery tải xong)"""
+        with self._lock:
+            for key in [k for k in self._gallery_ext if k[0] == gallery]:
+                del self._gallery_ext[key]
+            self._gallery_host.pop(gallery, None)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'first_hits': self.first_hits,
+                'extra_requests': self.extra_requests,
+                'galleries': len(self._gallery_host),
+            }
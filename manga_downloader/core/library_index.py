@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Library Index - Index các gallery đã có trong thư mục download (URL chuẩn hóa, tiêu đề -> vị trí, số page, dung lượng)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+from core.image_probe import IMAGE_EXTENSIONS
+from core.manifest import MANIFEST_NAME
+
+INDEX_NAME = ".library_index.sqlite"
+
+# Số gallery ghi vào SQLite mỗi lần commit khi quét
+SCAN_BATCH = 500
+
+# Số fingerprint mỗi câu SELECT ... IN (...) (giới hạn tham số của SQLite)
+QUERY_CHUNK = 500
+
+def _is_complete(manifest):
+    """Manifest của gallery đã tải xong (build_manifest ghi completed_at và page_count)"""
+    return isinstance(manifest, dict) and bool(manifest.get('completed_at')) and bool(manifest.get('page_count'))
+
+class LibraryIndex:
+    """Gallery trong <thư mục download>: thư mục ảnh và file .cbz ở cấp đầu tiên
+
+    - Gallery có manifest.json hoàn chỉnh (có completed_at; thư mục, hoặc entry trong .cbz):
+      tra theo fingerprint URL, hoặc theo tiêu đề + đúng số page (cùng gallery từ URL khác)
+    - Thư mục cũ/dở dang không có manifest: chỉ được index để thống kê, không bao giờ khớp
+      (số ảnh trong thư mục không cho biết gallery đã tải đủ hay chưa)
+
+    scan() chỉ đọc lại mục có mtime đổi (lần quét sau chủ yếu là scandir + so mtime) và bỏ mục
+    đã bị xóa; gallery vừa tải xong được ghi ngay bằng record().
+    """
+    def __init__(self, root, fingerprint):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / INDEX_NAME
+        self.fingerprint = fingerprint  # url -> fingerprint (URL chuẩn hóa)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS galleries (
+            location TEXT PRIMARY KEY, fp INTEGER, title_key TEXT, url TEXT, title TEXT, kind TEXT,
+            page_count INTEGER, bytes INTEGER, mtime REAL, has_manifest INTEGER)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS galleries_fp ON galleries (fp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS galleries_title ON galleries (title_key)")
+        self._db.commit()
+        self.scanning = False
+        self.last_scan = None  # {'entries', 'read', 'removed', 'seconds'} của lần quét gần nhất
+        self._deleted = set()  # Fingerprint của gallery đã index mà không còn ở vị trí đã ghi (phiên này)
+
+    # ----- Quét thư mục -----
+
+    def scan(self):
+        """Đồng bộ index với thư mục download, trả về thống kê lần quét"""
+        started = time.perf_counter()
+        with self._lock:
+            known = dict(self._db.execute("SELECT location, mtime FROM galleries"))
+        seen, rows, read = set(), [], 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError as e:
+            print(f"⚠ Không quét được thư mục download {self.root}: {e}")
+            entries = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir():
+                    kind = 'folder'
+                    try:
+                        mtime = os.stat(os.path.join(entry.path, MANIFEST_NAME)).st_mtime
+                    except OSError:
+                        mtime = entry.stat().st_mtime
+                elif entry.name.lower().endswith('.cbz'):
+                    kind = 'cbz'
+                    mtime = entry.stat().st_mtime
+                else:
+                    continue
+                seen.add(entry.path)
+                if known.get(entry.path) == mtime:
+                    continue
+                row = self._read_folder(entry.path) if kind == 'folder' else self._read_cbz(entry.path)
+            except (OSError, zipfile.BadZipFile, ValueError) as e:
+                print(f"⚠ Bỏ qua {entry.name} khi quét thư viện: {e}")
+                continue
+            if row is not None:
+                rows.append((entry.path, *row, kind, mtime))
+                read += 1
+            if len(rows) >= SCAN_BATCH:
+                self._store(rows)
+                rows = []
+        self._store(rows)
+
+        removed = [location for location in known if location not in seen]
+        if removed:
+            with self._lock:
+                self._forget_fps(removed)
+                self._db.executemany("DELETE FROM galleries WHERE location = ?", ((location,) for location in removed))
+                self._db.commit()
+        self.last_scan = {
+            'entries': len(seen),
+            'read': read,
+            'removed': len(removed),
+            'seconds': time.perf_counter() - started,
+        }
+        return self.last_scan
+
+    def _read_folder(self, folder):
+        """(url, title, page_count, bytes, has_manifest) của thư mục gallery"""
+        images, size = 0, 0
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_file():
+                    size += entry.stat().st_size
+                    name = entry.name.lower()
+                    if name.endswith(IMAGE_EXTENSIONS) and not name.startswith('cover'):
+                        images += 1
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if not _is_complete(manifest):
+            return None, os.path.basename(folder), images, size, False
+        return manifest.get('url'), manifest.get('title'), manifest['page_count'], size, True
+
+    def _read_cbz(self, archive):
+        with zipfile.ZipFile(archive) as zf:
+            try:
+                manifest = json.loads(zf.read(MANIFEST_NAME).decode('utf-8'))
+            except KeyError:
+                manifest = None
+            images = sum(1 for name in zf.namelist()
+                         if name.lower().endswith(IMAGE_EXTENSIONS) and '_cover' not in name)
+        size = os.path.getsize(archive)
+        title = os.path.basename(archive)[:-len('.cbz')]
+        if not _is_complete(manifest):
+            return None, title, images, size, False
+        return manifest.get('url'), manifest.get('title'), manifest['page_count'], size, True
+
+    def _store(self, rows):
+        """rows: [(location, url, title, page_count, bytes, has_manifest, kind, mtime)]"""
+        if not rows:
+            return
+        records = []
+        for location, url, title, page_count, size, has_manifest, kind, mtime in rows:
+            # Khóa tiêu đề theo tên trên đĩa (tên thư mục/file = tiêu đề đã sanitize)
+            name = os.path.basename(location)
+            title_key = (name[:-len('.cbz')] if kind == 'cbz' else name).lower()
+            fp = self.fingerprint(url) if url else None
+            records.append((location, fp, title_key, url, title, kind, page_count, size, mtime, int(has_manifest)))
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO galleries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self._db.commit()
+
+    def record(self, location, manifest, size):
+        """Ghi gallery vừa tải xong (không chờ lần quét sau)"""
+        location = Path(location)
+        kind = 'cbz' if location.suffix.lower() == '.cbz' else 'folder'
+        try:
+            mtime = os.stat(location / MANIFEST_NAME if kind == 'folder' else location).st_mtime
+        except OSError:
+            mtime = None
+        self._store([(str(location), manifest.get('url'), manifest.get('title'), manifest.get('page_count'),
+                      size, True, kind, mtime)])
+        if manifest.get('url'):
+            with self._lock:
+                self._deleted.discard(self.fingerprint(manifest['url']))
+
+    # ----- Tra cứu -----
+
+    def _entry(self, row):
+        location, url, title, kind, page_count, size, has_manifest = row
+        return {
+            'location': location,
+            'url': url,
+            'title': title,
+            'kind': kind,
+            'page_count': page_count,
+            'bytes': size,
+            'has_manifest': bool(has_manifest),
+        }
+
+    def find_urls(self, fingerprints):
+        """{fingerprint: gallery} của các gallery hoàn chỉnh (có manifest) trùng URL chuẩn hóa
+
+        Gallery bị xóa khỏi đĩa sau lần quét gần nhất bị bỏ khỏi index ngay (không trả về)
+        """
+        found, missing = {}, []
+        fingerprints = list(fingerprints)
+        with self._lock:
+            for i in range(0, len(fingerprints), QUERY_CHUNK):
+                chunk = fingerprints[i:i + QUERY_CHUNK]
+                rows = self._db.execute(
+                    "SELECT fp, location, url, title, kind, page_count, bytes, has_manifest FROM galleries "
+                    f"WHERE has_manifest = 1 AND fp IN ({','.join('?' * len(chunk))})", chunk)
+                for row in rows.fetchall():
+                    if row[0] in found:
+                        continue
+                    if not os.path.exists(row[1]):
+                        missing.append(row[1])
+                        continue
+                    found[row[0]] = self._entry(row[1:])
+            if missing:
+                self._forget_fps(missing)
+                self._db.executemany("DELETE FROM galleries WHERE location = ?", ((location,) for location in missing))
+                self._db.commit()
+        return found
+
+    def _forget_fps(self, locations):
+        """Ghi nhận fingerprint của các gallery sắp bị bỏ khỏi index vì không còn trên đĩa (đang giữ lock)"""
+        for i in range(0, len(locations), QUERY_CHUNK):
+            chunk = locations[i:i + QUERY_CHUNK]
+            rows = self._db.execute(
+                f"SELECT fp FROM galleries WHERE fp IS NOT NULL AND location IN ({','.join('?' * len(chunk))})", chunk)
+            self._deleted.update(fp for (fp,) in rows)
+
+    def deleted_among(self, fingerprints):
+        """Các fingerprint trong fingerprints có gallery đã bị xóa khỏi vị trí đã ghi trên đĩa"""
+        with self._lock:
+            return self._deleted.intersection(fingerprints)
+
+    def find_title(self, safe_title, pages):
+        """Gallery đã tải xong (manifest hoàn chỉnh) cùng tên và đúng pages page
+        
+        pages là số page thật của gallery; 0/None (không biết) thì không khớp
+        """
+        if not pages:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT location, url, title, kind, page_count, bytes, has_manifest FROM galleries "
+                "WHERE title_key = ? AND has_manifest = 1 AND page_count = ? LIMIT 1",
+                (safe_title.lower(), pages)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None
+        return self._entry(row)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM galleries").fetchone()[0]
+
+    def get_stats(self):
+        with self._lock:
+            count, complete, pages, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(has_manifest), 0), COALESCE(SUM(page_count), 0), "
+                "COALESCE(SUM(bytes), 0) FROM galleries").fetchone()
+        return {
+            'galleries': count,
+            'with_manifest': complete,
+            'pages': pages,
+            'bytes': size,
+            'scanning': self.scanning,
+            'last_scan': self.last_scan,
+        }
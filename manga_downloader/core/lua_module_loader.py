@@ -5,10 +5,20 @@ Lua Module Loader - Đọc và quản lý các module Lua từ modules/lua
 """
 
 import os
+import re
 import sys
 import json
+import threading
 from pathlib import Path
-from urllib.parse import urlparse
+
+# Host của URL (bỏ scheme, user@ và port); nhanh hơn urlparse khi phân loại hàng triệu URL
+URL_HOST = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?([^/?#:]*)')
+
+def host_of_url(url):
+    """Host viết thường, bỏ 'www.' ('' nếu không phải URL)"""
+    match = URL_HOST.match(url.strip())
+    host = match.group(1).lower() if match else ''
+    return host[4:] if host.startswith('www.') else host
 
 class LuaModuleLoader:
     def __init__(self):
@@ -19,6 +29,9 @@ class LuaModuleLoader:
         
         self.modules = {}
         self.metadata = {}
+        self._routes = {}  # {domain (viết thường, bỏ www.): module_data} dựng khi load modules
+        self._host_routes = {}  # {host: module_data hoặc None} cache kết quả tra theo host
+        self._route_lock = threading.Lock()
         
         # Kiểm tra và thông báo nếu không tìm thấy modules
         if not self.modules_dir.exists():
@@ -117,6 +130,10 @@ class LuaModuleLoader:
             print(f"✗ Không thể load modules: thư mục không tồn tại")
             return
         
+        with self._route_lock:
+            self._routes = {}
+            self._host_routes = {}
+        
         lua_files = list(self.modules_dir.glob("*.lua"))
         if not lua_files:
             print(f"⚠ Không tìm thấy file .lua nào trong {self.modules_dir}")
@@ -150,6 +167,7 @@ class LuaModuleLoader:
             except Exception as e:
                 print(f"⚠ Lỗi khi tải module {module_name}: {e}")
         
+        self._build_routes()
         if loaded_count > 0:
             print(f"✓ Đã load thành công {loaded_count}/{len(lua_files)} modules")
         else:
@@ -160,7 +178,10 @@ class LuaModuleLoader:
         info = {
             'name': module_name,
             'domains': [],
-            'language': 'Unknown'
+            'language': 'Unknown',
+            'defer_http_requests': False,
+            # Module có BeforeDownloadPage() thì URL ảnh chỉ biết khi tới lượt tải page
+            'resolves_pages_lazily': 'function BeforeDownloadPage' in content
         }
         
         # Tìm function Register()
@@ -193,6 +214,10 @@ class LuaModuleLoader:
                         except:
                             pass
                             
+                    # Parse module.DeferHttpRequests
+                    if 'module.DeferHttpRequests' in line:
+                        info['defer_http_requests'] = 'true' in line.split('=', 1)[-1].lower()
+                            
                     # Parse module.Domains
                     # Hỗ trợ cả module.Domains.Add và module.Domains:Add
                     if 'module.Domains' in line and ('Add' in line or 'add' in line):
@@ -220,60 +245,60 @@ class LuaModuleLoader:
                             
         return info
         
+    def _build_routes(self):
+        """Index domain -> module (domain trùng giữa các module: module load trước thắng, như khi duyệt tuần tự)"""
+        routes = {}
+        for module_data in self.modules.values():
+            for domain in module_data['info'].get('domains', []):
+                routes.setdefault(domain.lower().replace('www.', ''), module_data)
+        with self._route_lock:
+            self._routes = routes
+            self._host_routes = {}
+    
+    def module_for_host(self, host):
+        """Module cho host: khớp domain, không có thì domain cha (subdomain); kết quả được cache theo host"""
+        route = self._host_routes.get(host, False)
+        if route is not False:
+            return route
+        domain, route = host, None
+        while domain:
+            route = self._routes.get(domain)
+            if route is not None:
+                break
+            domain = domain.partition('.')[2]
+        with self._route_lock:
+            self._host_routes[host] = route
+        return route
+    
     def find_module_for_url(self, url):
-        """Tìm module phù hợp cho URL"""
-        try:
-            parsed = urlparse(url)
-            if not parsed.netloc:
-                print(f"⚠ URL không hợp lệ (không có netloc): {url}")
-                return None
-                
-            domain = parsed.netloc.lower().replace('www.', '')
-            print(f"🔍 Đang tìm module cho domain: {domain}")
-            
-            # Debug: in tất cả domains đã load
-            if not self.modules:
-                print("⚠ Không có modules nào được load!")
-                return None
-            
-            # Tìm exact match trước
-            for module_name, module_data in self.modules.items():
-                module_domains = module_data['info'].get('domains', [])
-                if not module_domains:
-                    continue
-                    
-                for module_domain in module_domains:
-                    module_domain_clean = module_domain.lower().replace('www.', '')
-                    if domain == module_domain_clean:
-                        print(f"✓ Tìm thấy module: {module_name} (exact match: {module_domain})")
-                        return module_data
-            
-            # Tìm partial match (subdomain)
-            for module_name, module_data in self.modules.items():
-                module_domains = module_data['info'].get('domains', [])
-                if not module_domains:
-                    continue
-                    
-                for module_domain in module_domains:
-                    module_domain_clean = module_domain.lower().replace('www.', '')
-                    if domain.endswith('.' + module_domain_clean) or domain == module_domain_clean:
-                        print(f"✓ Tìm thấy module: {module_name} (partial match: {module_domain})")
-                        return module_data
-            
-            # Không tìm thấy
-            print(f"✗ Không tìm thấy module cho domain: {domain}")
-            print(f"  Các domains đã load:")
-            for module_name, module_data in self.modules.items():
-                domains = module_data['info'].get('domains', [])
-                if domains:
-                    print(f"    - {module_name}: {', '.join(domains)}")
-                        
-        except Exception as e:
-            print(f"Lỗi khi tìm module cho URL {url}: {e}")
-            import traceback
-            traceback.print_exc()
-            
-        return None
+        """Tìm module phù hợp cho URL (None nếu không có module nào hỗ trợ host)"""
+        host = host_of_url(url)
+        if not host:
+            return None
+        return self.module_for_host(host)
+    
+    def classify_urls(self, urls):
+        """Gán module cho cả một khối URL: gom theo host, mỗi host chỉ tra một lần
+        
+        Trả về (list module_data hoặc None theo thứ tự urls, {host không được hỗ trợ: số URL})
+        """
+        routes = {}  # {host: module_data} của khối này
+        unsupported = {}
+        assignments = []
+        for url in urls:
+            host = host_of_url(url)
+            if host in routes:
+                module = routes[host]
+            else:
+                module = routes[host] = self.module_for_host(host) if host else None
+            if module is None:
+                unsupported[host] = unsupported.get(host, 0) + 1
+            assignments.append(module)
+        return assignments, unsupported
+    
+    def domain_map(self):
+        """{domain: tên module} của mọi module đã load (dùng cho luật chuẩn hóa URL theo module)"""
+        return {domain: module_data['info']['name'] for domain, module_data in self._routes.items()}
         
     def get_all_modules(self):
         """Lấy danh sách tất cả các module"""
@@ -282,4 +307,3 @@ class LuaModuleLoader:
     def get_module(self, module_name):
         """Lấy module theo tên"""
         return self.modules.get(module_name)
-
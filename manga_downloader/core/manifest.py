@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manifest - Ghi manifest.json mô tả gallery đã tải (nguồn, định dạng đầu ra, danh sách file page)
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def build_manifest(url, title, module_name, output_format, pages, cover=None):
+    """Tạo nội dung manifest (dict)
+
+    pages: {idx: {'file', 'format', 'source_format', 'width', 'height', 'size'}} - size ghi nhận lúc lưu page
+    """
+    entries = []
+    for idx in sorted(pages):
+        entry = dict(pages[idx])
+        entry['index'] = idx
+        entry.setdefault('size', None)
+        entries.append(entry)
+
+    return {
+        'version': MANIFEST_VERSION,
+        'url': url,
+        'title': title,
+        'module': module_name,
+        'output_format': output_format,
+        'cover': cover,
+        'page_count': len(entries),
+        'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'pages': entries,
+    }
+
+def manifest_bytes(manifest):
+    """Manifest dạng JSON UTF-8 (để ghi vào archive)"""
+    return json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+
+def write_manifest(manga_dir, manifest):
+    """Ghi manifest.json vào thư mục gallery (ghi file tạm rồi đổi tên để không bao giờ bị dở dang)"""
+    path = Path(manga_dir) / MANIFEST_NAME
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(manifest_bytes(manifest))
+    os.replace(tmp_path, path)
+    return path
+
+def read_manifest(manga_dir):
+    """Đọc manifest.json của gallery, None nếu không có hoặc hỏng"""
+    path = Path(manga_dir) / MANIFEST_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory Budget - Giới hạn tổng RAM của pipeline (buffer tải, convert, chờ ghi, ảnh bìa, thumbnail UI)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Các stage xin RAM từ budget
+STAGES = ('fetch', 'transcode', 'write', 'cover', 'decode', 'thumbnail', 'ui_queue')
+
+class MemoryBudget:
+    """Kế toán RAM dùng chung cho mọi stage
+
+    - reserve(): stage phía trên (thread tải) chờ tới khi budget còn chỗ (backpressure)
+    - try_reserve(): stage không được chờ (UI thread) bỏ việc khi budget gần đầy (shed)
+    - charge(): ghi nhận RAM đã bị giữ sẵn (dữ liệu đã có trong RAM, không thể chờ)
+    """
+    def __init__(self, limit_bytes=512 * 1024 * 1024, shed_ratio=0.9):
+        self.limit = max(int(limit_bytes), 1)
+        self.shed_ratio = shed_ratio  # try_reserve từ chối khi dùng vượt tỉ lệ này
+        self._usage = {stage: 0 for stage in STAGES}
+        self._total = 0
+        self._cond = threading.Condition()
+        self.peak = 0
+        self.waits = 0  # Số lần reserve() phải chờ
+        self.wait_time = 0.0
+        self.shed = {stage: 0 for stage in STAGES}  # Số lần try_reserve() bị từ chối
+
+    def _add(self, stage, nbytes):
+        self._usage[stage] = self._usage.get(stage, 0) + nbytes
+        self._total += nbytes
+        if self._total > self.peak:
+            self.peak = self._total
+
+    def reserve(self, stage, nbytes, timeout=None):
+        """Chờ tới khi đủ chỗ rồi giữ nbytes cho stage; False nếu hết timeout
+
+        Khi không stage nào đang giữ RAM, yêu cầu lớn hơn cả budget vẫn được nhận (tránh kẹt vĩnh viễn)
+        """
+        with self._cond:
+            if self._total and self._total + nbytes > self.limit:
+                self.waits += 1
+                started = time.monotonic()
+                deadline = None if timeout is None else started + timeout
+                while self._total and self._total + nbytes > self.limit:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.wait_time += time.monotonic() - started
+                        return False
+                    self._cond.wait(remaining)
+                self.wait_time += time.monotonic() - started
+            self._add(stage, nbytes)
+            return True
+
+    def try_reserve(self, stage, nbytes):
+        """Giữ nbytes nếu sau đó vẫn dưới ngưỡng shed_ratio, không chờ"""
+        with self._cond:
+            if self._total and self._total + nbytes > self.limit * self.shed_ratio:
+                self.shed[stage] = self.shed.get(stage, 0) + 1
+                return False
+            self._add(stage, nbytes)
+            return True
+
+    def charge(self, stage, nbytes):
+        """Ghi nhận nbytes đã nằm trong RAM (không chờ, có thể vượt budget tạm thời)"""
+        with self._cond:
+            self._add(stage, nbytes)
+
+    def release(self, stage, nbytes):
+        if nbytes <= 0:
+            return
+        with self._cond:
+            self._usage[stage] = self._usage.get(stage, 0) - nbytes
+            self._total -= nbytes
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserved(self, stage, nbytes):
+        """with budget.reserved('decode', n): ... - tự trả lại khi xong"""
+        self.reserve(stage, nbytes)
+        try:
+            yield
+        finally:
+            self.release(stage, nbytes)
+
+    def lease(self, stage, nbytes):
+        """Giữ nbytes (chờ nếu cần), có thể tăng thêm khi buffer lớn dần; trả lại hết khi đóng"""
+        self.reserve(stage, nbytes)
+        return Lease(self, stage, nbytes)
+
+    def near_limit(self):
+        return self._total >= self.limit * self.shed_ratio
+
+    def used(self):
+        return self._total
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'used': self._total,
+                'peak': self.peak,
+                'stages': dict(self._usage),
+                'waits': self.waits,
+                'wait_time': round(self.wait_time, 2),
+                'shed': {stage: count for stage, count in self.shed.items() if count},
+            }
+
+class Lease:
+    """Phần RAM một buffer đang giữ trong budget (dùng với with)"""
+    def __init__(self, budget, stage, nbytes):
+        self.budget = budget
+        self.stage = stage
+        self.nbytes = nbytes
+
+    def grow(self, nbytes):
+        """Buffer vượt phần đã giữ: ghi nhận thêm (dữ liệu đã nằm trong RAM nên không chờ)"""
+        if nbytes > self.nbytes:
+            self.budget.charge(self.stage, nbytes - self.nbytes)
+            self.nbytes = nbytes
+
+    def release(self):
+        self.budget.release(self.stage, self.nbytes)
+        self.nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
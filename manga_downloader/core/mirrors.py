@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mirrors - Nhóm server ảnh giống hệt nhau của một module, gửi request dự phòng (hedged) và chấm điểm theo tốc độ
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, urlunparse
+
+# Mirror ảnh khai báo theo module: {tên module: [[host, ...], ...]}
+# Các host trong cùng một nhóm phục vụ cùng một đường dẫn ảnh
+MODULE_MIRRORS = {
+    'HentaiFox': [
+        ['i.hentaifox.com', 'i2.hentaifox.com', 'i3.hentaifox.com'],
+    ],
+}
+
+# Trọng số EWMA cho mẫu mới
+EWMA_ALPHA = 0.3
+
+# Điểm phạt (giây) cho mirror trả lỗi
+FAILURE_PENALTY = 10.0
+
+def replace_host(url, host):
+    """Đổi host của URL, giữ nguyên scheme/path/query"""
+    parsed = urlparse(url)
+    netloc = host
+    if parsed.port:
+        netloc = f"{host}:{parsed.port}"
+    return urlunparse(parsed._replace(netloc=netloc))
+
+class MirrorGroup:
+    """Một nhóm mirror, điểm của mỗi host là EWMA thời gian phản hồi (giây, thấp hơn là tốt hơn)"""
+    def __init__(self, name, hosts):
+        self.name = name
+        self.hosts = [h.lower() for h in hosts]
+        self.scores = {}  # {host: EWMA giây}; host chưa có điểm được ưu tiên thử
+        self.wins = {}  # {host: số lần thắng}
+        self.failures = {}  # {host: số lần lỗi}
+        self._lock = threading.Lock()
+
+    def __contains__(self, host):
+        return (host or "").lower() in self.hosts
+
+    def record(self, host, seconds=None, lower_bound=False):
+        """Ghi nhận kết quả của mirror
+
+        seconds=None: mirror lỗi; lower_bound=True: request bị hủy sau seconds giây (chậm hơn bên thắng)
+        """
+        host = host.lower()
+        with self._lock:
+            current = self.scores.get(host)
+            if seconds is None:
+                self.failures[host] = self.failures.get(host, 0) + 1
+                sample = FAILURE_PENALTY
+            elif lower_bound:
+                # Chỉ biết mirror chậm hơn seconds: không hạ điểm của nó
+                sample = max(seconds, current or 0.0)
+            else:
+                self.wins[host] = self.wins.get(host, 0) + 1
+                sample = seconds
+            self.scores[host] = sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+    def ranked(self, hosts=None, prefer=None):
+        """Host xếp theo điểm (nhanh trước); hòa điểm thì ưu tiên prefer"""
+        hosts = [h.lower() for h in (hosts or self.hosts)]
+        with self._lock:
+            scores = dict(self.scores)
+        return sorted(hosts, key=lambda h: (scores.get(h, 0.0), h != prefer))
+
+    def best(self, hosts=None):
+        """Mirror nhanh nhất hiện tại"""
+        ranked = self.ranked(hosts)
+        return ranked[0] if ranked else None
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                host: {
+                    'score_ms': None if host not in self.scores else round(self.scores[host] * 1000, 1),
+                    'wins': self.wins.get(host, 0),
+                    'failures': self.failures.get(host, 0),
+                }
+                for host in self.hosts
+            }
+
+class MirrorRegistry:
+    """Các nhóm mirror theo module và bộ gửi request dự phòng (hedged request)"""
+    def __init__(self, declarations=None, max_workers=16):
+        self._groups = {}  # {tên module: [MirrorGroup]}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mirror")
+        self.hedged = 0  # Số lần đã gửi request dự phòng
+        self.hedge_wins = 0  # Số lần request dự phòng thắng
+        for module_name, groups in (MODULE_MIRRORS if declarations is None else declarations).items():
+            for hosts in groups:
+                self.register(module_name, hosts)
+
+    def register(self, module_name, hosts):
+        group = MirrorGroup(f"{module_name}:{hosts[0]}", hosts)
+        self._groups.setdefault(module_name, []).append(group)
+        return group
+
+    def group_for(self, url, module_name=None):
+        """Nhóm mirror chứa host của URL (ưu tiên nhóm của module)"""
+        host = (urlparse(url).hostname or "").lower()
+        if module_name in self._groups:
+            groups = self._groups[module_name]
+        else:
+            groups = [g for gs in self._groups.values() for g in gs]
+        for group in groups:
+            if host in group:
+                return group
+        return None
+
+    def candidates(self, url, module_name=None):
+        """Các URL tương đương trên mọi mirror, mirror nhanh nhất trước"""
+        group = self.group_for(url, module_name)
+        if group is None:
+            return [url]
+        host = (urlparse(url).hostname or "").lower()
+        return [replace_host(url, h) for h in group.ranked(prefer=host)]
+
+    def _record(self, url, module_name, seconds=None, lower_bound=False):
+        group = self.group_for(url, module_name)
+        if group is not None:
+            group.record(urlparse(url).hostname, seconds, lower_bound)
+
+    def hedged_get(self, urls, fetch, hedge_delay, module_name=None, ok=lambda r: r.status_code == 200):
+        """Tải URL đầu tiên; nếu quá hedge_delay giây chưa xong thì gửi thêm request tới mirror tiếp theo
+
+        Request nào trả kết quả tốt trước thì thắng, các request còn lại bị hủy/đóng.
+        Mirror lỗi nhanh thì chuyển ngay sang mirror tiếp theo.
+        Trả về (response, url, last_response): response=None nếu mọi mirror đều lỗi,
+        last_response là response lỗi gần nhất (để đọc Retry-After)
+        """
+        remaining = list(urls)
+        if len(remaining) == 1:
+            # Không có mirror: tải trực tiếp, không qua thread pool
+            url = remaining[0]
+            started = time.monotonic()
+            try:
+                response = fetch(url)
+            except Exception:
+                self._record(url, module_name)
+                return None, None, None
+            if ok(response):
+                self._record(url, module_name, time.monotonic() - started)
+                return response, url, None
+            self._record(url, module_name)
+            return None, None, response
+
+        pending = {}  # {future: (url, started)}
+        winner = None
+        last_response = None
+        first_url = remaining[0]
+
+        def launch():
+            url = remaining.pop(0)
+            pending[self._executor.submit(fetch, url)] = (url, time.monotonic())
+
+        launch()
+        while pending:
+            done, _ = wait(list(pending), timeout=hedge_delay if remaining else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                # Request đang chạy chậm hơn p95 của host: gửi bản sao tới mirror tiếp theo
+                self.hedged += 1
+                launch()
+                continue
+
+            for future in done:
+                url, started = pending.pop(future)
+                elapsed = time.monotonic() - started
+                try:
+                    response = future.result()
+                except Exception:
+                    self._record(url, module_name)
+                    continue
+                if winner is None and ok(response):
+                    winner = (response, url)
+                    self._record(url, module_name, elapsed)
+                    if url != first_url:
+                        self.hedge_wins += 1
+                    continue
+                if not ok(response):
+                    self._record(url, module_name)
+                if last_response is not None:
+                    last_response.close()
+                last_response = response
+
+            if winner is not None:
+                break
+            if not pending and remaining:
+                # Mirror hiện tại lỗi: thử ngay mirror tiếp theo
+                launch()
+
+        # Hủy các request thua: chưa chạy thì bỏ, đang chạy thì đóng response khi có
+        now = time.monotonic()
+        for future, (url, started) in pending.items():
+            self._record(url, module_name, now - started, lower_bound=True)
+            if not future.cancel():
+                future.add_done_callback(_close_result)
+
+        if winner is None:
+            return None, None, last_response
+        if last_response is not None:
+            last_response.close()
+        return winner[0], winner[1], None
+
+    def get_stats(self):
+        """Điểm các mirror và số lần hedge"""
+        groups = {}
+        for group_list in self._groups.values():
+            for group in group_list:
+                groups[group.name] = group.as_dict()
+        return {'hedged': self.hedged, 'hedge_wins': self.hedge_wins, 'groups': groups}
+
+def _close_result(future):
+    """Đóng response của request thua (trả kết nối về pool)"""
+    try:
+        future.result().close()
+    except Exception:
+        pass
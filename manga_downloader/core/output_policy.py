@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Output Policy - Quyết định ảnh page được lưu nguyên bản hay chuyển sang định dạng khác (global hoặc theo module)
+"""
+
+# Định dạng đầu ra: {tên: (định dạng PIL, đuôi file)}; 'original' giữ nguyên byte tải về
+OUTPUT_FORMATS = {
+    'original': (None, None),
+    'jpeg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+}
+
+DEFAULT_OUTPUT_FORMAT = 'jpeg'
+
+# Section cấu hình định dạng đầu ra theo module: <tên module> = original|jpeg|png|webp
+MODULE_OUTPUT_SECTION = 'Module Output'
+
+def normalize_format(name):
+    """Chuẩn hóa tên định dạng ('jpg' -> 'jpeg'), None nếu không hợp lệ"""
+    name = (name or '').strip().lower()
+    if name == 'jpg':
+        name = 'jpeg'
+    return name if name in OUTPUT_FORMATS else None
+
+class OutputPolicy:
+    """Định dạng lưu ảnh: mặc định toàn cục, có thể ghi đè cho từng module"""
+    def __init__(self, default=DEFAULT_OUTPUT_FORMAT, per_module=None):
+        self.default = normalize_format(default) or DEFAULT_OUTPUT_FORMAT
+        self.per_module = {}  # {tên module (chữ thường): định dạng}
+        for module_name, fmt in (per_module or {}).items():
+            fmt = normalize_format(fmt)
+            if fmt:
+                self.per_module[module_name.lower()] = fmt
+
+    @classmethod
+    def from_config(cls, config):
+        """Đọc [Processing] OutputFormat và section [Module Output]"""
+        return cls(
+            config.get('Processing', 'OutputFormat', DEFAULT_OUTPUT_FORMAT),
+            config.get_section(MODULE_OUTPUT_SECTION)
+        )
+
+    def format_for(self, module_name=None):
+        """Tên định dạng đầu ra cho module"""
+        if module_name:
+            return self.per_module.get(module_name.lower(), self.default)
+        return self.default
+
+    def plan(self, module_name, actual_ext):
+        """Trả về (đuôi file lưu, định dạng PIL cần chuyển sang hoặc None nếu ghi nguyên byte)
+
+        actual_ext là định dạng thật của ảnh (theo magic bytes)
+        """
+        target, target_ext = OUTPUT_FORMATS[self.format_for(module_name)]
+        actual_ext = actual_ext or '.jpg'
+        if target is None or actual_ext == target_ext:
+            # Giữ nguyên byte: không tốn CPU, đuôi file theo định dạng thật
+            return actual_ext, None
+        return target_ext, target
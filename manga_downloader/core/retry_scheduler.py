@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retry Scheduler - Hẹn giờ tải lại task lỗi (exponential backoff + jitter) mà không sleep trong worker
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+def parse_retry_after(value):
+    """Đọc header Retry-After (số giây hoặc HTTP-date), trả về số giây hoặc None"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+class RetryScheduler:
+    """Heap các task chờ tải lại
+
+    Worker chỉ gọi schedule() rồi làm việc khác; thread của scheduler đưa task về hàng đợi khi tới giờ
+    """
+    def __init__(self, on_due, base_delay=2.0, max_delay=300.0):
+        self.on_due = on_due  # Callback nhận task khi tới giờ tải lại
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._heap = []  # [(due_at, seq, task)]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def compute_delay(self, attempt, retry_after=None):
+        """Thời gian chờ cho lần thử thứ attempt (1, 2, ...): backoff lũy thừa + jitter, tôn trọng Retry-After"""
+        delay = min(self.base_delay * (2 ** max(attempt - 1, 0)), self.max_delay)
+        # Jitter: ngẫu nhiên trong [delay/2, delay] để các task không retry cùng lúc
+        delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    def schedule(self, task, attempt, retry_after=None):
+        """Hẹn giờ tải lại task, trả về số giây chờ"""
+        delay = self.compute_delay(attempt, retry_after)
+        self.schedule_in(task, delay)
+        return delay
+
+    def schedule_in(self, task, delay):
+        """Đưa task về hàng đợi sau đúng delay giây (không backoff)"""
+        due_at = time.monotonic() + max(float(delay), 0.0)
+        with self._cond:
+            heapq.heappush(self._heap, (due_at, next(self._seq), task))
+            self._cond.notify()
+
+    def cancel(self, task):
+        """Bỏ task khỏi danh sách chờ"""
+        with self._cond:
+            remaining = [entry for entry in self._heap if entry[2] is not task]
+            if len(remaining) != len(self._heap):
+                self._heap = remaining
+                heapq.heapify(self._heap)
+                self._cond.notify()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._heap)
+
+    def start(self):
+        with self._cond:
+            self._running = True
+            # Thread cũ chưa kịp thoát sau stop() thì chạy tiếp, không tạo thread thứ hai
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    self._thread = None
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, task = heapq.heappop(self._heap)
+            try:
+                self.on_due(task)
+            except Exception as e:
+                print(f"Lỗi khi đưa task về hàng đợi: {e}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Storage - Nơi lưu page của gallery: thư mục ảnh rời (folder) hoặc một file CBZ (cbz)
+"""
+
+from pathlib import Path
+
+from core.archive_writer import CbzWriter
+from core.manifest import MANIFEST_NAME, manifest_bytes, write_manifest
+
+# [Directories] StorageMode
+STORAGE_MODES = ('folder', 'cbz')
+DEFAULT_STORAGE_MODE = 'folder'
+
+class FolderStorage:
+    """Mỗi gallery là một thư mục: 1.jpg, 2.jpg, ..., cover.jpg, manifest.json
+
+    Có blob store: file page là link tới blob trong kho (page trùng giữa các gallery chỉ lưu một lần)
+    """
+    def __init__(self, manga_dir, blobs=None, writer=None):
+        self.location = Path(manga_dir)
+        self.blobs = blobs
+        self.writer = writer  # DiskWriter: mkdir một lần, fsync theo chế độ
+        if writer is not None:
+            writer.ensure_dir(self.location, recheck=True)
+        else:
+            self.location.mkdir(parents=True, exist_ok=True)
+        self.deduped = 0  # Page của gallery đã có sẵn trong kho
+        self.bytes_saved = 0
+
+    def page_name(self, idx, ext):
+        return f"{idx}{ext}"
+
+    def cover_name(self, ext):
+        return f"cover{ext}"
+
+    def saved_pages(self):
+        """{idx: metadata} các page đã lưu từ lần chạy trước (thư mục luôn tải lại từ đầu)"""
+        return {}
+
+    def has(self, name):
+        return (self.location / name).exists()
+
+    def write(self, name, data, meta=None):
+        path = self.location / name
+        if self.blobs is not None:
+            size, existed = self.blobs.store(data, path, self.writer.write_file if self.writer else None)
+            if self.writer is not None:
+                self.writer.track(path, self.location)
+            if existed:
+                self.deduped += 1
+                self.bytes_saved += size
+            return size
+        if self.writer is not None:
+            return self.writer.write_file(path, data, self.location)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    def finalize(self, manifest):
+        if self.deduped:
+            print(f"♻ {self.deduped} ảnh đã có trong kho blob, tiết kiệm {self.bytes_saved / 1024 / 1024:.1f} MB")
+        path = write_manifest(self.location, manifest)
+        if self.writer is not None:
+            self.writer.track(path, self.location)
+            self.writer.sync(self.location)
+        return self.location
+
+    def close(self):
+        pass
+
+class CbzStorage:
+    """Mỗi gallery là một file <tên>.cbz (ZIP stored), page được ghi vào ngay khi tải xong
+
+    Tên entry có số 0 đứng trước (0001.jpg) để reader sắp đúng thứ tự;
+    ảnh bìa là 0000_cover.jpg nên luôn đứng đầu. Page nằm trong archive nên không dùng blob store
+    """
+    def __init__(self, archive_path, fsync_entries=False):
+        self.location = Path(archive_path)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        self.writer = CbzWriter(self.location, fsync_entries)
+        if self.writer.resumed:
+            print(f"↻ Tiếp tục archive dở: {self.writer.part_path.name} ({self.writer.resumed} entry)")
+
+    def page_name(self, idx, ext):
+        return f"{idx:04d}{ext}"
+
+    def cover_name(self, ext):
+        return f"0000_cover{ext}"
+
+    def saved_pages(self):
+        """{idx: metadata} các page đã có trong archive dở (khôi phục từ journal)"""
+        pages = {}
+        for meta in self.writer.entries().values():
+            if meta and 'index' in meta:
+                pages[meta['index']] = meta
+        return pages
+
+    def has(self, name):
+        return self.writer.has(name)
+
+    def write(self, name, data, meta=None):
+        return self.writer.write(name, data, meta)
+
+    def finalize(self, manifest):
+        self.writer.write(MANIFEST_NAME, manifest_bytes(manifest))
+        return self.writer.finalize()
+
+    def close(self):
+        self.writer.close()
+
+def open_storage(mode, download_dir, safe_title, blobs=None, writer=None):
+    """Tạo storage cho gallery theo StorageMode"""
+    if (mode or '').strip().lower() == 'cbz':
+        return CbzStorage(Path(download_dir) / f"{safe_title}.cbz",
+                          fsync_entries=writer is not None and writer.fsync == 'page')
+    return FolderStorage(Path(download_dir) / safe_title, blobs, writer)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Task Store - Tập task của download manager với bộ đếm theo status/host/module cập nhật khi task đổi trạng thái
+"""
+
+import bisect
+import threading
+
+class Tracked:
+    """Thuộc tính của DownloadTask mà TaskStore theo dõi: mỗi lần gán giá trị mới thì báo cho store
+
+    Giá trị nằm trong __dict__ của task dưới tên '_<tên>'; task chưa thuộc store nào thì chỉ gán
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.attr = f"_{name}"
+
+    def __get__(self, task, owner=None):
+        if task is None:
+            return self
+        return task.__dict__.get(self.attr)
+
+    def __set__(self, task, value):
+        old = task.__dict__.get(self.attr)
+        task.__dict__[self.attr] = value
+        store = task.__dict__.get('_store')
+        if store is not None and old != value:
+            store._on_change(task, self.name, old, value)
+
+# Tập ID ứng viên nhỏ hơn mức này thì tìm chuỗi trực tiếp trên từng tiêu đề thay vì chuỗi nối
+SCAN_LIMIT = 5000
+
+def _title_key(task):
+    return (task.title or task.url).lower()
+
+class TaskStore:
+    """Tất cả task đang quản lý và các con số tổng hợp (không cần duyệt task để đếm)
+
+    - Bucket theo status, host, module: {giá trị: set(task ID)}, số lượng = len(bucket)
+    - Tổng page (total_pages), page đã tải (current_page), byte đã tải (file_size)
+    - Index cho tìm kiếm: danh sách (tiêu đề, ID) đã sort, tiêu đề/URL viết thường và lỗi theo ID
+
+    Bộ đếm và index được cập nhật trong setter của task (Tracked), đổi status là O(1),
+    đổi tiêu đề là một lần bisect.
+    """
+    def __init__(self, host_of):
+        self.host_of = host_of  # url -> host
+        self._lock = threading.Lock()
+        self._tasks = {}  # {task ID: task}
+        self._hosts = {}  # {task ID: host} (URL của task không đổi)
+        self._by_status = {}
+        self._by_host = {}
+        self._by_module = {}
+        self._titles = []  # [(tiêu đề viết thường, task ID)] luôn được sort
+        self._search = {}  # {task ID: tiêu đề (hoặc URL) viết thường}
+        self._blob = None  # (chuỗi nối mọi tiêu đề, [vị trí bắt đầu], [task ID]) dựng lại khi tiêu đề đổi
+        self._errors = {}  # {task ID: lỗi viết thường} chỉ task đang có lỗi
+        self.pages_total = 0
+        self.pages_done = 0
+        self.bytes_done = 0
+
+    @staticmethod
+    def _bucket_add(buckets, key, task_id):
+        if key is not None:
+            buckets.setdefault(key, set()).add(task_id)
+
+    @staticmethod
+    def _bucket_remove(buckets, key, task_id):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(task_id)
+            if not bucket:
+                del buckets[key]
+
+    def _index_title(self, task):
+        key = _title_key(task)
+        self._search[task.id] = key
+        self._blob = None
+        bisect.insort(self._titles, (key, task.id))
+
+    def _unindex_title(self, task_id):
+        self._blob = None
+        key = self._search.pop(task_id, None)
+        if key is not None:
+            i = bisect.bisect_left(self._titles, (key, task_id))
+            if i < len(self._titles) and self._titles[i] == (key, task_id):
+                del self._titles[i]
+
+    def _index_error(self, task_id, error):
+        if error:
+            self._errors[task_id] = str(error).lower()
+        else:
+            self._errors.pop(task_id, None)
+
+    def add(self, task):
+        host = self.host_of(task.url)
+        with self._lock:
+            if task.id in self._tasks:
+                return
+            self._tasks[task.id] = task
+            self._hosts[task.id] = host
+            self._bucket_add(self._by_status, task.status, task.id)
+            self._bucket_add(self._by_host, host, task.id)
+            self._bucket_add(self._by_module, task.module_name, task.id)
+            self._index_title(task)
+            self._index_error(task.id, task.error)
+            self.pages_total += task.total_pages or 0
+            self.pages_done += task.current_page or 0
+            self.bytes_done += task.file_size or 0
+            task._store = self
+
+    def remove(self, task):
+        with self._lock:
+            if self._tasks.pop(task.id, None) is None:
+                return
+            task._store = None
+            self._bucket_remove(self._by_status, task.status, task.id)
+            self._bucket_remove(self._by_host, self._hosts.pop(task.id), task.id)
+            self._bucket_remove(self._by_module, task.module_name, task.id)
+            self._unindex_title(task.id)
+            self._errors.pop(task.id, None)
+            self.pages_total -= task.total_pages or 0
+            self.pages_done -= task.current_page or 0
+            self.bytes_done -= task.file_size or 0
+
+    def _on_change(self, task, field, old, new):
+        """Gọi từ Tracked.__set__ (thường đang giữ task.lock; store không bao giờ lấy task.lock)"""
+        with self._lock:
+            if task.id not in self._tasks:
+                return
+            if field == 'status':
+                self._bucket_remove(self._by_status, old, task.id)
+                self._bucket_add(self._by_status, new, task.id)
+            elif field == 'module_name':
+                self._bucket_remove(self._by_module, old, task.id)
+                self._bucket_add(self._by_module, new, task.id)
+            elif field == 'title':
+                self._unindex_title(task.id)
+                self._index_title(task)
+            elif field == 'error':
+                self._index_error(task.id, new)
+            elif field == 'total_pages':
+                self.pages_total += (new or 0) - (old or 0)
+            elif field == 'current_page':
+                self.pages_done += (new or 0) - (old or 0)
+            elif field == 'file_size':
+                self.bytes_done += (new or 0) - (old or 0)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, task):
+        return task.id in self._tasks
+
+    def get(self, task_id):
+        return self._tasks.get(task_id)
+
+    def host(self, task):
+        return self._hosts.get(task.id)
+
+    def count(self, *statuses):
+        """Số task có một trong các status"""
+        with self._lock:
+            return sum(len(self._by_status.get(status, ())) for status in statuses)
+
+    def tasks_with_status(self, *statuses):
+        with self._lock:
+            return [self._tasks[task_id] for status in statuses for task_id in self._by_status.get(status, ())]
+
+    # ----- Index cho filter/sort -----
+
+    def ids_matching(self, status=None, host=None, module=None, text=None, error=None):
+        """Tập task ID thỏa mọi điều kiện (None = không lọc theo điều kiện đó); None nếu không có điều kiện nào
+
+        Bắt đầu từ bucket nhỏ nhất rồi giao với các bucket còn lại; tìm chuỗi (tiêu đề/URL, lỗi)
+        chỉ duyệt các ID còn lại sau bước đó
+        """
+        with self._lock:
+            buckets = [index.get(key, set()) for index, key in
+                       ((self._by_status, status), (self._by_host, host), (self._by_module, module))
+                       if key is not None]
+            if error:
+                # Task có lỗi thường ít: dùng như một bucket
+                needle = error.lower()
+                buckets.append({task_id for task_id, message in self._errors.items() if needle in message})
+            if buckets:
+                buckets.sort(key=len)
+                ids = set(buckets[0]).intersection(*buckets[1:])
+            else:
+                ids = None
+            if text:
+                needle = text.lower().replace('\n', ' ')
+                if ids is not None and len(ids) < SCAN_LIMIT:
+                    search = self._search
+                    ids = {task_id for task_id in ids if needle in search.get(task_id, '')}
+                else:
+                    found = self._search_blob(needle)
+                    ids = found if ids is None else found & ids
+            return ids
+
+    def _search_blob(self, needle):
+        """Tìm chuỗi con trong mọi tiêu đề bằng str.find trên một chuỗi nối (gọi khi đang giữ lock)"""
+        if self._blob is None:
+            ids = list(self._search)
+            offsets, position = [], 0
+            for task_id in ids:
+                offsets.append(position)
+                position += len(self._search[task_id]) + 1
+            self._blob = ('\n'.join(self._search[task_id] for task_id in ids), offsets, ids)
+        blob, offsets, ids = self._blob
+        found = set()
+        position = blob.find(needle)
+        while position >= 0:
+            i = bisect.bisect_right(offsets, position) - 1
+            found.add(ids[i])
+            # Nhảy sang tiêu đề kế tiếp
+            position = blob.find(needle, offsets[i + 1] if i + 1 < len(offsets) else len(blob))
+        return found
+
+    def title_order(self):
+        """Task ID theo thứ tự tiêu đề (index được giữ sẵn, không phải sort lại)"""
+        with self._lock:
+            return [task_id for _, task_id in self._titles]
+
+    def status_order(self):
+        """Task ID theo status (A-Z), cùng status thì theo thứ tự thêm vào"""
+        with self._lock:
+            return [task_id for status in sorted(self._by_status) for task_id in sorted(self._by_status[status])]
+
+    def hosts(self):
+        with self._lock:
+            return sorted(self._by_host)
+
+    def modules(self):
+        with self._lock:
+            return sorted(self._by_module)
+
+    def status_counts(self):
+        with self._lock:
+            return {status: len(tasks) for status, tasks in self._by_status.items()}
+
+    def host_counts(self):
+        with self._lock:
+            return {host: len(tasks) for host, tasks in self._by_host.items()}
+
+    def module_counts(self):
+        with self._lock:
+            return {module: len(tasks) for module, tasks in self._by_module.items()}
+
+    def get_stats(self):
+        """Các con số dùng chung cho status bar, CLI và metrics"""
+        with self._lock:
+            return {
+                'total': len(self._tasks),
+                'status': {status: len(tasks) for status, tasks in self._by_status.items()},
+                'hosts': {host: len(tasks) for host, tasks in self._by_host.items()},
+                'modules': {module: len(tasks) for module, tasks in self._by_module.items()},
+                'pages_total': self.pages_total,
+                'pages_done': self.pages_done,
+                'bytes_done': self.bytes_done,
+            }
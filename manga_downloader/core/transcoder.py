@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transcoder - Chuyển định dạng ảnh (mặc định sang JPEG) trong process pool riêng, không chiếm GIL của thread tải
+"""
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+def transcode(image_data, target='JPEG', quality=95):
+    """Decode ảnh và encode lại sang định dạng target (JPEG, PNG, WEBP), trả về bytes"""
+    from PIL import Image
+    img = Image.open(io.BytesIO(image_data))
+    if target != 'JPEG':
+        # PNG/WebP giữ được alpha
+        if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            img = img.convert('RGBA')
+        output = io.BytesIO()
+        img.save(output, target, quality=quality)
+        return output.getvalue()
+    # Convert về RGB nếu cần (cho PNG có alpha)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        rgb_img.paste(img, mask=img.split()[-1])
+        img = rgb_img
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=quality)
+    return output.getvalue()
+
+def _transcode_job(image_data, quality, target='JPEG', label=''):
+    """Chạy trong process con: convert và trả về bytes đã convert
+
+    Không convert được thì trả về dữ liệu gốc (giống cách xử lý cũ)
+    """
+    try:
+        return transcode(image_data, target, quality)
+    except Exception as e:
+        print(f"⚠ Không thể convert {label} sang {target}: {e}, lưu trực tiếp...")
+        return image_data
+
+def _chain(value, result):
+    """Đặt kết quả cho result: giá trị thường, hoặc kết quả của Future value khi nó xong"""
+    if not isinstance(value, Future):
+        result.set_result(value)
+        return
+
+    def copy(done):
+        if done.exception() is not None:
+            result.set_exception(done.exception())
+        else:
+            result.set_result(done.result())
+    value.add_done_callback(copy)
+
+class Transcoder:
+    """Stage chuyển định dạng ảnh chạy trên process pool (số process = số core)
+
+    Thread tải chỉ gọi submit(); ảnh convert xong được chuyển cho hàm write (ghi file hoặc
+    ghi vào archive) ngay trong process chính. Hàng đợi có giới hạn (max_pending) nên khi pool bận,
+    submit() chờ cho tới khi có chỗ trống (backpressure) thay vì giữ hàng trăm ảnh trong RAM
+    """
+    def __init__(self, workers=0, max_pending=0, quality=95):
+        self.workers = int(workers) or (os.cpu_count() or 2)
+        self.max_pending = int(max_pending) or self.workers * 2
+        self.quality = quality
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.wait_time = 0.0  # Tổng thời gian thread tải phải chờ chỗ trống trong hàng đợi
+
+    def _get_pool(self):
+        # Tạo pool khi có ảnh đầu tiên cần convert (gallery toàn JPG không tốn process nào)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def submit(self, image_data, write, target='JPEG', label=''):
+        """Đưa ảnh vào hàng đợi convert sang target, trả về Future
+
+        write(data) được gọi với bytes đã convert; kết quả của Future là giá trị write trả về (số byte đã ghi).
+        write có thể trả về Future (ghi qua DiskWriter): Future của submit xong khi Future đó xong
+        """
+        started = time.monotonic()
+        self._slots.acquire()
+        self.wait_time += time.monotonic() - started
+        result = Future()
+        try:
+            job = self._get_pool().submit(_transcode_job, image_data, self.quality, target, label)
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            # Pool không dùng được (process con bị kill...): convert ngay trong thread hiện tại
+            self._slots.release()
+            print(f"⚠ Process pool convert ảnh lỗi ({e}), convert trực tiếp")
+            with self._lock:
+                self._pool = None
+            try:
+                _chain(write(_transcode_job(image_data, self.quality, target, label)), result)
+            except Exception as e:
+                result.set_exception(e)
+            return result
+        job.add_done_callback(lambda job: self._on_done(job, write, result))
+        return result
+
+    def _on_done(self, job, write, result):
+        self._slots.release()
+        try:
+            _chain(write(job.result()), result)
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            result.set_exception(e)
+
+    def pending_count(self):
+        return self.max_pending - self._slots._value
+
+    def get_stats(self):
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending_count(),
+            'completed': self.completed,
+            'failed': self.failed,
+            'wait_time': round(self.wait_time, 2),
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=wait)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL Canon - Chuẩn hóa URL gallery để nhận ra URL trùng (http/https, www., dấu / cuối, tham số tracking, /g/ và /gallery/)
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+
+# Tham số query chỉ dùng để tracking (bỏ khi chuẩn hóa)
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+                   'ref', 'ref_src', 'referrer', 'source', 'spm', '_ga'}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+# scheme://authority path ?query (#fragment bị bỏ); nhanh hơn urlsplit khi chuẩn hóa hàng triệu URL
+URL_PARTS = re.compile(r'([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)([^?#]*)(?:\?([^#]*))?')
+
+# Section cấu hình luật theo module, mỗi dòng: <regex trên path> -> <thay thế>
+#   [URL Rules]
+#   HentaiFox = ^/(?:g|gallery)/(\d+)(?:/.*)?$ -> /gallery/\1
+URL_RULES_SECTION = 'URL Rules'
+
+# Luật có sẵn: các dạng URL của cùng một gallery (trang gallery, trang reader, /g/ và /gallery/)
+MODULE_RULES = {
+    'nhentai': [(r'^/[gd]/(\d+)(?:/.*)?$', r'/g/\1')],  # 3hentai dùng /d/ thay cho /g/
+    'AsmHentai': [(r'^/(?:g|gallery)/(\d+)(?:/.*)?$', r'/g/\1')],
+    'HentaiFox': [(r'^/(?:g|gallery)/(\d+)(?:/.*)?$', r'/gallery/\1')],
+    'Pururin': [(r'^/(?:gallery|read)/(\d+)(?:/.*)?$', r'/gallery/\1')],
+}
+
+def parse_rules(text):
+    """Đọc luật từ giá trị cấu hình (mỗi dòng 'regex -> thay thế'), bỏ dòng lỗi"""
+    rules = []
+    for line in (text or '').splitlines():
+        pattern, sep, replacement = line.strip().rpartition(' -> ')
+        if not sep or not pattern:
+            continue
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            print(f"⚠ Luật URL không hợp lệ '{pattern}': {e}")
+            continue
+        rules.append((pattern, replacement.strip()))
+    return rules
+
+def fingerprint(canonical):
+    """Dấu vân tay 64-bit (số có dấu, vừa kiểu INTEGER của SQLite) của URL đã chuẩn hóa"""
+    return int.from_bytes(hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+class UrlCanonicalizer:
+    """Chuẩn hóa URL: luật chung cho mọi URL + luật viết lại path theo module của host
+
+    Dạng chuẩn không có scheme (http và https là một): host viết thường bỏ 'www.' và port mặc định,
+    path bỏ '/' thừa, query bỏ tham số tracking và sort lại, bỏ fragment.
+    """
+    def __init__(self, rules=None):
+        self.rules = {}  # {tên module (chữ thường): [(regex đã compile, thay thế)]}
+        for module_name, module_rules in {**MODULE_RULES, **(rules or {})}.items():
+            self.rules[module_name.lower()] = [(re.compile(pattern), replacement)
+                                               for pattern, replacement in module_rules]
+        self.domains = {}  # {domain: tên module}
+
+    @classmethod
+    def from_config(cls, config):
+        """Luật có sẵn + section [URL Rules] (luật trong cấu hình thay luật có sẵn của module đó)"""
+        return cls({module_name: parse_rules(text)
+                    for module_name, text in config.get_section(URL_RULES_SECTION).items()})
+
+    def set_domains(self, domains):
+        """Bảng domain -> tên module (từ các module Lua đã load)"""
+        self.domains = {domain.lower().removeprefix('www.'): module_name for domain, module_name in domains.items()}
+
+    def module_for_host(self, host):
+        """Module của host (khớp domain hoặc domain cha)"""
+        while host:
+            module_name = self.domains.get(host)
+            if module_name is not None:
+                return module_name
+            host = host.partition('.')[2]
+        return None
+
+    def canonicalize(self, url):
+        """Dạng chuẩn của URL (chuỗi không phải URL thì giữ nguyên)"""
+        url = url.strip()
+        match = URL_PARTS.match(url)
+        if match is None:
+            return url
+        scheme, authority, path, query = match.groups()
+        host = authority.rpartition('@')[2].lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        name, sep, port = host.rpartition(':')
+        if not (sep and port.isdigit()):
+            name = host
+        elif port == DEFAULT_PORTS.get(scheme.lower()):
+            host = name
+
+        if '//' in path:
+            path = re.sub(r'/{2,}', '/', path)
+        path = path.rstrip('/')
+        if self.domains:
+            module_name = self.module_for_host(name)
+            if module_name is not None:
+                for pattern, replacement in self.rules.get(module_name.lower(), ()):
+                    path, count = pattern.subn(replacement, path)
+                    if count:
+                        break
+
+        if query:
+            params = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+                      if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+            if params:
+                return f"{host}{path}?{urlencode(sorted(params))}"
+        return f"{host}{path}"
+
+    def fingerprint(self, url):
+        return fingerprint(self.canonicalize(url))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL Index - Index lưu trên đĩa các gallery đã tải (dấu vân tay 64-bit của URL chuẩn hóa) + Bloom filter trong RAM
+"""
+
+import math
+import os
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+
+INDEX_NAME = ".url_index.sqlite"
+
+# Số fingerprint mỗi câu SELECT ... IN (...) (giới hạn tham số của SQLite)
+QUERY_CHUNK = 500
+
+class BloomFilter:
+    """Bloom filter trên bytearray: 'không có' là chắc chắn, 'có' thì cần hỏi lại index
+
+    Vị trí bit lấy từ chính fingerprint 64-bit (đã là hash): h1 + i*h2 (double hashing)
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 64)  # Số bit
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fp):
+        fp &= 0xFFFFFFFFFFFFFFFF
+        h1, h2 = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, fp):
+        bits = self.bits
+        for position in self._positions(fp):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fp):
+        bits = self.bits
+        for position in self._positions(fp):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def save(self, path):
+        """Ghi ra file tạm rồi đổi tên (không để lại file dở khi đang ghi)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(struct.pack('<QQdQ', self.capacity, self.size, self.error_rate, self.count))
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """None nếu file không có hoặc hỏng"""
+        try:
+            with open(path, 'rb') as f:
+                capacity, size, error_rate, count = struct.unpack('<QQdQ', f.read(32))
+                bloom = cls(capacity, error_rate)
+                if bloom.size != size:
+                    return None
+                f.readinto(bloom.bits)
+                bloom.count = count
+                return bloom
+        except (OSError, struct.error):
+            return None
+
+class UrlIndex:
+    """Tập fingerprint các gallery đã tải xong, lưu trong SQLite (<thư mục download>/.url_index.sqlite)
+
+    Mỗi URL chỉ tốn một khóa INTEGER 8 byte trên đĩa; trong RAM chỉ có Bloom filter
+    (~1.2 byte/URL với tỉ lệ dương tính giả 1%), lưu cạnh file index để lần sau không phải dựng lại.
+    URL chưa tải (đa số khi import) bị Bloom filter loại ngay, không cần hỏi SQLite.
+    """
+    def __init__(self, path, capacity=1000000, error_rate=0.01, bloom=True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._bloom_path = f"{self.path}.bloom"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS urls (fp INTEGER PRIMARY KEY)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = None
+        self._bloom_dirty = False
+        if bloom:
+            self._bloom = BloomFilter.load(self._bloom_path)
+            if self._bloom is None or self._bloom.count != self._count or self._bloom.capacity < self._count:
+                self._rebuild_bloom()
+
+        # Thống kê của lần chạy này
+        self.lookups = 0
+        self.bloom_rejects = 0  # Lookup được Bloom filter trả lời (không hỏi SQLite)
+        self.hits = 0
+
+    def _rebuild_bloom(self):
+        """Dựng lại Bloom filter từ SQLite (lần đầu, file hỏng hoặc index vượt sức chứa)"""
+        self._bloom = BloomFilter(max(self.capacity, self._count * 2), self.error_rate)
+        for (fp,) in self._db.execute("SELECT fp FROM urls"):
+            self._bloom.add(fp)
+        self._bloom_dirty = True
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, fp):
+        return bool(self.contains_many([fp]))
+
+    def contains_many(self, fps):
+        """Các fingerprint trong fps đã có trong index"""
+        with self._lock:
+            self.lookups += len(fps)
+            if self._bloom is not None:
+                candidates = [fp for fp in fps if fp in self._bloom]
+                self.bloom_rejects += len(fps) - len(candidates)
+            else:
+                candidates = list(fps)
+            found = set()
+            for i in range(0, len(candidates), QUERY_CHUNK):
+                chunk = candidates[i:i + QUERY_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT fp FROM urls WHERE fp IN ({','.join('?' * len(chunk))})", chunk)
+                found.update(fp for (fp,) in rows)
+            self.hits += len(found)
+            return found
+
+    def add(self, fps):
+        """Thêm fingerprint (gallery vừa tải xong)"""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO urls (fp) VALUES (?)", ((fp,) for fp in fps))
+            self._db.commit()
+            added = self._db.total_changes - before
+            if added:
+                self._count += added
+                if self._bloom is not None:
+                    if self._count > self._bloom.capacity:
+                        self._rebuild_bloom()
+                    else:
+                        for fp in fps:
+                            self._bloom.add(fp)
+                    self._bloom_dirty = True
+            return added
+
+    def remove(self, fps):
+        """Bỏ fingerprint (Bloom filter không xóa được bit: lookup sau đó chỉ hỏi SQLite rồi trả về 'không có')"""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("DELETE FROM urls WHERE fp = ?", ((fp,) for fp in fps))
+            self._db.commit()
+            self._count -= self._db.total_changes - before
+
+    def flush(self):
+        """Lưu Bloom filter xuống đĩa nếu đã đổi"""
+        with self._lock:
+            if self._bloom is not None and self._bloom_dirty:
+                # count của file Bloom phải khớp số dòng SQLite thì lần sau mới dùng lại
+                self._bloom.count = self._count
+                self._bloom.save(self._bloom_path)
+                self._bloom_dirty = False
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def get_stats(self):
+        return {
+            'entries': self._count,
+            'bloom_bytes': len(self._bloom.bits) if self._bloom is not None else 0,
+            'lookups': self.lookups,
+            'bloom_rejects': self.bloom_rejects,
+            'hits': self.hits,
+        }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL List - Đọc file danh sách URL (TXT, .gz, .bz2, .xz) một lượt, trả URL theo từng khối
+"""
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import re
+
+# Mỗi lần xử lý một khối byte (cắt ở cuối dòng), đủ lớn để regex chạy ở tốc độ C
+BLOCK_BYTES = 4 * 1024 * 1024
+
+# Dòng bắt đầu bằng http:// hoặc https:// (bỏ khoảng trắng hai đầu); dòng trống, comment '#'
+# và dòng khác tự bị bỏ qua
+URL_LINE = re.compile(r'^[ \t]*(https?://[^\r\n]*\S)', re.M)
+
+# Magic bytes của các định dạng nén hỗ trợ (nhận dạng theo nội dung, không theo đuôi file)
+COMPRESSED_FORMATS = (
+    (b'\x1f\x8b', 'gzip', lambda raw: gzip.GzipFile(fileobj=raw)),
+    (b'BZh', 'bz2', bz2.BZ2File),
+    (b'\xfd7zXZ\x00', 'xz', lzma.LZMAFile),
+)
+
+def detect_compression(path):
+    """'gzip' / 'bz2' / 'xz', None nếu là file thường"""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, name, _ in COMPRESSED_FORMATS:
+        if head.startswith(magic):
+            return name
+    return None
+
+def _extract(block):
+    # Decode cả khối một lần (khối luôn kết thúc ở cuối dòng nên không cắt đôi ký tự UTF-8)
+    return URL_LINE.findall(block.decode('utf-8', 'ignore'))
+
+def _iter_mmap(f, size, progress):
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = min(start + BLOCK_BYTES, size)
+            if end < size:
+                # Cắt ở cuối dòng cuối cùng trong khối (dòng dài hơn cả khối thì lấy tới hết dòng)
+                newline = data.rfind(b'\n', start, end)
+                if newline < 0:
+                    newline = data.find(b'\n', end)
+                end = size if newline < 0 else newline + 1
+            urls = _extract(data[start:end])
+            start = end
+            if progress is not None:
+                progress(start, size)
+            yield urls
+
+def _iter_stream(raw, opener, size, progress):
+    # Đóng stream giải nén cả khi người đọc dừng giữa chừng (generator bị close)
+    with opener(raw) as stream:
+        tail = b''
+        while True:
+            block = stream.read(BLOCK_BYTES)
+            if not block:
+                break
+            block = tail + block
+            newline = block.rfind(b'\n')
+            if newline < 0:
+                tail = block
+                continue
+            tail = block[newline + 1:]
+            urls = _extract(block[:newline + 1])
+            if progress is not None:
+                # Tiến độ theo vị trí trong file nén (không biết trước kích thước sau giải nén)
+                progress(raw.tell(), size)
+            yield urls
+        if tail:
+            yield _extract(tail)
+    if progress is not None:
+        progress(size, size)
+
+def iter_url_blocks(path, progress=None):
+    """Đọc file danh sách URL một lượt, yield list URL của từng khối ~BLOCK_BYTES
+
+    File thường được mmap (không copy cả file vào RAM), file gzip/bz2/xz được giải nén dạng stream.
+    progress(byte đã đọc, tổng byte của file trên đĩa) được gọi sau mỗi khối.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(6)
+        f.seek(0)
+        for magic, _, opener in COMPRESSED_FORMATS:
+            if head.startswith(magic):
+                yield from _iter_stream(f, opener, size, progress)
+                return
+        if size == 0:  # mmap không nhận file rỗng
+            return
+        yield from _iter_mmap(f, size, progress)
@@ -10,11 +10,41 @@ import os
 import threading
 import time
 import queue
+from collections import OrderedDict
 from pathlib import Path
 from PIL import Image, ImageTk
-import io
 import requests
 
+from core.output_policy import OUTPUT_FORMATS, OutputPolicy
+from gui.task_list_model import TaskListModel
+from gui.thumbnail_worker import ThumbnailWorker
+from gui.ui_bridge import UiUpdateBridge
+from gui.virtual_list import VirtualTaskList
+from core.storage import DEFAULT_STORAGE_MODE, STORAGE_MODES
+from core.url_list import detect_compression, iter_url_blocks
+
+# Số batch tối đa chờ insert vào treeview
+TREEVIEW_QUEUE_BATCHES = 8
+
+# RAM ước tính cho mỗi dòng chờ insert (task + URL)
+QUEUE_ENTRY_BYTES = 512
+
+# Thumbnail ảnh bìa trong cột Cover: kích thước, số ảnh giữ lại, số ảnh đưa lên Treeview mỗi frame
+THUMBNAIL_SIZE = (60, 60)
+THUMBNAIL_CACHE_SIZE = 2000
+THUMBNAILS_PER_FRAME = 20
+
+# Ảnh bìa phóng to khi hover: kích thước, thời gian chuột phải dừng trên dòng, số ảnh giữ lại
+HOVER_PREVIEW_SIZE = (300, 300)
+HOVER_DELAY_MS = 120
+HOVER_CACHE_SIZE = 32
+
+# Filter bar: giá trị "tất cả", các status có thể lọc, thời gian chờ sau khi gõ mới lọc
+FILTER_ALL = "All"
+FILTER_STATUSES = ["Queued", "Getting Info", "Processing", "Downloading", "Retrying",
+                   "Host Down", "Paused", "Completed", "Duplicate", "Error"]
+FILTER_DELAY_MS = 150
+
 class MainWindow:
     def __init__(self, root, config_manager, lua_loader, download_manager):
         self.root = root
@@ -31,15 +61,19 @@ class MainWindow:
         # Bắt đầu download manager
         self.download_manager.start_downloads()
         
-        # Dictionary để lưu task và tree item mapping
-        self.task_items = {}  # {task: tree_item_id}
-        
-        # Queue để batch insert vào treeview
-        self.treeview_insert_queue = queue.Queue()
+        # Queue để batch insert vào treeview (giới hạn số batch: thread thêm URL chờ khi UI chưa kịp insert)
+        self.treeview_insert_queue = queue.Queue(maxsize=TREEVIEW_QUEUE_BATCHES)
         self.treeview_insert_thread = None
         self.start_treeview_insert_worker()
         
-        # Progress update thread
+        # Decode ảnh bìa ở thread riêng; kết quả được nhận mỗi frame của ui_bridge
+        self.thumbnail_worker = ThumbnailWorker(self.download_manager.memory)
+        
+        # Cập nhật dòng theo dirty set: thread tải chỉ đánh dấu task, một timer Tk vẽ lại theo frame
+        self.ui_bridge = UiUpdateBridge(self.root, self._apply_dirty_tasks, on_frame=self._on_ui_frame)
+        self.ui_bridge.start()
+        
+        # Progress update thread (status bar + đếm ngược Retrying/Host Down)
         self.update_thread = None
         self.update_running = True
         self.start_progress_updater()
@@ -205,7 +239,8 @@ class MainWindow:
                        foreground=self.colors['text_primary'],
                        fieldbackground=self.colors['bg_primary'],
                        borderwidth=0,
-                       font=('Segoe UI', 9))
+                       font=('Segoe UI', 9),
+                       rowheight=THUMBNAIL_SIZE[1] + 4)  # Đủ cao cho thumbnail ảnh bìa
         
         style.configure('Custom.Treeview.Heading',
                        background=self.colors['bg_tertiary'],
@@ -435,24 +470,33 @@ class MainWindow:
         container = tk.Frame(self.downloads_frame, bg=self.colors['bg_primary'])
         container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        # Lọc theo status/host/module, tiêu đề và lỗi
+        self.create_filter_bar(container)
+        
         # Treeview để hiển thị danh sách download
-        columns = ("Cover", "Manga Title", "Chapters", "Pages", "Status", "Progress", "File Size")
-        self.download_tree = ttk.Treeview(container, columns=columns, show="headings", height=20, style='Custom.Treeview')
+        # Ảnh bìa nằm ở cột #0 (cột duy nhất của Treeview hiển thị được ảnh)
+        columns = ("Manga Title", "Chapters", "Pages", "Status", "Progress", "File Size")
+        self.download_tree = ttk.Treeview(container, columns=columns, show="tree headings", height=8, style='Custom.Treeview')
         
         # Lưu ảnh bìa đã load (để tránh load lại)
-        self.cover_images = {}  # {item_id: PhotoImage}
-        
-        # Định nghĩa các cột với icon đẹp hơn (FontAwesome style)
-        self.download_tree.heading("Cover", text="🖼 Cover")
-        self.download_tree.heading("Manga Title", text="📚 Manga Title")
-        self.download_tree.heading("Chapters", text="📑 Chapters")
-        self.download_tree.heading("Pages", text="📄 Pages")
-        self.download_tree.heading("Status", text="⚡ Status")
-        self.download_tree.heading("Progress", text="📊 Progress")
-        self.download_tree.heading("File Size", text="💾 File Size")
+        self.cover_images = OrderedDict()  # {task: PhotoImage} (LRU THUMBNAIL_CACHE_SIZE ảnh)
+        self._cover_failed = set()  # Task có ảnh bìa không decode được (không thử lại)
+        
+        # Định nghĩa các cột với icon đẹp hơn (FontAwesome style), bấm vào tiêu đề cột để sort
+        self.download_tree.heading("#0", text="🖼 Cover")
+        self.column_titles = {
+            "Manga Title": "📚 Manga Title",
+            "Chapters": "📑 Chapters",
+            "Pages": "📄 Pages",
+            "Status": "⚡ Status",
+            "Progress": "📊 Progress",
+            "File Size": "💾 File Size",
+        }
+        for column, title in self.column_titles.items():
+            self.download_tree.heading(column, text=title, command=lambda c=column: self.sort_by_column(c))
         
         # Đặt độ rộng cột
-        self.download_tree.column("Cover", width=90, anchor=tk.CENTER)
+        self.download_tree.column("#0", width=90, minwidth=THUMBNAIL_SIZE[0] + 10, stretch=False, anchor=tk.CENTER)
         self.download_tree.column("Manga Title", width=350)
         self.download_tree.column("Chapters", width=90, anchor=tk.CENTER)
         self.download_tree.column("Pages", width=100, anchor=tk.CENTER)
@@ -466,16 +510,21 @@ class MainWindow:
         self.download_tree.tag_configure("Getting Info", foreground=self.colors['accent_soft'])
         self.download_tree.tag_configure("Downloading", foreground=self.colors['progress_blue'])
         self.download_tree.tag_configure("Retrying", foreground=self.colors['progress_yellow'])
+        self.download_tree.tag_configure("Host Down", foreground=self.colors['error'])
         self.download_tree.tag_configure("Completed", foreground=self.colors['success'])
         self.download_tree.tag_configure("Error", foreground=self.colors['error'])
         self.download_tree.tag_configure("Paused", foreground=self.colors['progress_yellow'])
+        self.download_tree.tag_configure("Duplicate", foreground=self.colors['text_secondary'])
         
         # Scrollbar với style
         scrollbar_frame = tk.Frame(container, bg=self.colors['bg_primary'])
         scrollbar_frame.pack(side=tk.RIGHT, fill=tk.Y)
         
-        scrollbar = ttk.Scrollbar(scrollbar_frame, orient=tk.VERTICAL, command=self.download_tree.yview)
-        self.download_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(scrollbar_frame, orient=tk.VERTICAL)
+        
+        # Danh sách task nằm trong model; Treeview chỉ giữ các dòng đang hiển thị
+        self.task_model = TaskListModel(self.download_manager.tasks)
+        self.task_list = VirtualTaskList(self.download_tree, scrollbar, self.task_model, self._render_task_row)
         
         # Pack
         tree_frame = tk.Frame(container, bg=self.colors['bg_primary'])
@@ -491,8 +540,109 @@ class MainWindow:
         
         # Hover để hiển thị ảnh bìa phóng to
         self.download_tree.bind("<Motion>", self._on_treeview_hover)
+        self.download_tree.bind("<Leave>", lambda event: self._hide_cover_tooltip())
         self.cover_tooltip = None  # Tooltip window cho ảnh phóng to
+        self.preview_photos = OrderedDict()  # {task: PhotoImage 300px} (LRU)
+        self._hover_task = None  # Task chuột đang dừng trên ảnh bìa
+        self._hover_pos = (0, 0)
+        self._hover_after = None
+        self._tooltip_task = None  # Task đang hiển thị trong tooltip
+        
+    def create_filter_bar(self, parent):
+        """Thanh lọc danh sách download (lọc qua index của TaskStore, không dựng lại widget)"""
+        bar = tk.Frame(parent, bg=self.colors['bg_primary'])
+        bar.pack(side=tk.TOP, fill=tk.X, pady=(0, 8))
+        
+        self.filter_vars = {}
+        self._filter_after = None
+        
+        # Status/host/module: chọn một giá trị (host/module lấy từ TaskStore khi mở danh sách)
+        for label, field, width in (("Status", 'status', 12), ("Host", 'host', 18), ("Module", 'module', 14)):
+            tk.Label(bar, text=f"{label}:", bg=self.colors['bg_primary'], fg=self.colors['text_secondary'],
+                     font=('Segoe UI', 9)).pack(side=tk.LEFT, padx=(0, 4))
+            var = tk.StringVar(value=FILTER_ALL)
+            combo = ttk.Combobox(bar, textvariable=var, state='readonly', font=('Segoe UI', 9), width=width,
+                                 values=[FILTER_ALL] + FILTER_STATUSES if field == 'status' else [FILTER_ALL])
+            if field != 'status':
+                combo.configure(postcommand=lambda c=combo, f=field: c.configure(values=[FILTER_ALL] + (
+                    self.download_manager.tasks.hosts() if f == 'host' else self.download_manager.tasks.modules())))
+            combo.bind('<<ComboboxSelected>>', lambda event: self.apply_filter())
+            combo.pack(side=tk.LEFT, padx=(0, 10))
+            self.filter_vars[field] = var
+        
+        # Chuỗi con trong tiêu đề/URL và trong lỗi: lọc khi ngừng gõ FILTER_DELAY_MS
+        for label, field, width in (("🔍 Title", 'text', 24), ("Error", 'error', 16)):
+            tk.Label(bar, text=f"{label}:", bg=self.colors['bg_primary'], fg=self.colors['text_secondary'],
+                     font=('Segoe UI', 9)).pack(side=tk.LEFT, padx=(0, 4))
+            var = tk.StringVar()
+            entry = tk.Entry(bar, textvariable=var, width=width,
+                             font=('Segoe UI', 9),
+                             bg=self.colors['bg_secondary'],
+                             fg=self.colors['text_primary'],
+                             insertbackground=self.colors['accent'],
+                             relief=tk.FLAT,
+                             borderwidth=0,
+                             highlightthickness=1,
+                             highlightbackground=self.colors['border'],
+                             highlightcolor=self.colors['accent'])
+            entry.bind('<KeyRelease>', lambda event: self._schedule_filter())
+            entry.bind('<Return>', lambda event: self.apply_filter())
+            entry.pack(side=tk.LEFT, padx=(0, 10), ipady=3)
+            self.filter_vars[field] = var
+        
+        tk.Button(bar, text="✕", command=self.clear_filter,
+                  bg=self.colors['bg_tertiary'], fg=self.colors['text_primary'],
+                  font=('Segoe UI', 9), relief=tk.FLAT, padx=8, cursor='hand2',
+                  activebackground=self.colors['accent_hover'],
+                  activeforeground=self.colors['text_primary']).pack(side=tk.LEFT)
+        
+        self.filter_count_label = tk.Label(bar, text="", bg=self.colors['bg_primary'],
+                                           fg=self.colors['text_secondary'], font=('Segoe UI', 9))
+        self.filter_count_label.pack(side=tk.RIGHT)
+    
+    def _schedule_filter(self):
+        if self._filter_after is not None:
+            self.root.after_cancel(self._filter_after)
+        self._filter_after = self.root.after(FILTER_DELAY_MS, self.apply_filter)
+    
+    def apply_filter(self):
+        """Áp dụng điều kiện của filter bar lên model rồi vẽ lại từ dòng đầu"""
+        self._filter_after = None
+        criteria = {}
+        for field, var in self.filter_vars.items():
+            value = var.get().strip()
+            if value and value != FILTER_ALL:
+                criteria[field] = value
+        self.task_model.set_query(**criteria)
+        self.task_list.yview('moveto', 0)
+        self._update_filter_count()
+    
+    def clear_filter(self):
+        for field, var in self.filter_vars.items():
+            var.set(FILTER_ALL if field in ('status', 'host', 'module') else "")
+        self.apply_filter()
+    
+    def _update_filter_count(self):
+        if self.task_model.query:
+            self.filter_count_label.config(text=f"Hiển thị {len(self.task_model):,}/{self.task_model.total():,}")
+        else:
+            self.filter_count_label.config(text="")
+    
+    def sort_by_column(self, column):
+        """Bấm tiêu đề cột: tăng dần -> giảm dần -> thứ tự thêm vào"""
+        if self.task_model.sort_column != column:
+            self.task_model.set_sort(column)
+        elif not self.task_model.sort_reverse:
+            self.task_model.set_sort(column, reverse=True)
+        else:
+            self.task_model.set_sort(None)
         
+        for name, title in self.column_titles.items():
+            if name == self.task_model.sort_column:
+                title += " ▼" if self.task_model.sort_reverse else " ▲"
+            self.download_tree.heading(name, text=title)
+        self.task_list.yview('moveto', 0)
+    
     def create_settings_tab(self):
         """Tạo tab Settings với design đẹp"""
         # Main container - nền chính
@@ -559,6 +709,17 @@ class MainWindow:
                               activeforeground=self.colors['text_primary'])
         browse_btn.pack(side=tk.RIGHT)
         
+        # Kiểu lưu: thư mục ảnh rời hoặc một file CBZ cho mỗi gallery
+        self.storage_mode_var = tk.StringVar(
+            value=self.config.get('Directories', 'StorageMode', DEFAULT_STORAGE_MODE))
+        storage_combo = ttk.Combobox(dir_input_frame,
+                                     textvariable=self.storage_mode_var,
+                                     values=list(STORAGE_MODES),
+                                     state='readonly',
+                                     font=('Segoe UI', 10),
+                                     width=8)
+        storage_combo.pack(side=tk.RIGHT, padx=(0, 10), pady=8)
+        
         # Max concurrent downloads section với icon màu nhẹ nhàng
         max_label = tk.Label(inner_frame,
                             text="⚡ Max Concurrent Downloads:",
@@ -594,6 +755,33 @@ class MainWindow:
                            font=('Segoe UI', 9))
         max_hint.pack(side=tk.LEFT, pady=8)
         
+        # Output format (định dạng lưu ảnh page)
+        format_label = tk.Label(inner_frame,
+                               text="🖼️ Output Format:",
+                               bg=self.colors['bg_tab_selected'],
+                               fg=self.colors['text_primary'],
+                               font=('Segoe UI', 10, 'bold'))
+        format_label.grid(row=4, column=0, sticky=tk.W, pady=(0, 8))
+        
+        format_input_frame = tk.Frame(inner_frame, bg=self.colors['bg_tab_selected'])
+        format_input_frame.grid(row=5, column=0, sticky=tk.W, pady=(0, 20))
+        
+        self.output_format_var = tk.StringVar(value=self.download_manager.output_policy.default)
+        format_combo = ttk.Combobox(format_input_frame,
+                                    textvariable=self.output_format_var,
+                                    values=list(OUTPUT_FORMATS.keys()),
+                                    state='readonly',
+                                    font=('Segoe UI', 10),
+                                    width=12)
+        format_combo.pack(side=tk.LEFT, padx=(0, 10), pady=8)
+        
+        format_hint = tk.Label(format_input_frame,
+                              text="(original = giữ nguyên file gốc, không convert; theo module: [Module Output] trong config.ini)",
+                              bg=self.colors['bg_tab_selected'],
+                              fg=self.colors['text_secondary'],
+                              font=('Segoe UI', 9))
+        format_hint.pack(side=tk.LEFT, pady=8)
+        
         # Save button với icon
         save_btn = tk.Button(inner_frame,
                            text="💾 Save Settings",
@@ -607,7 +795,7 @@ class MainWindow:
                            cursor='hand2',
                            activebackground='#45a049',
                            activeforeground=self.colors['text_primary'])
-        save_btn.grid(row=4, column=0, columnspan=3, pady=(10, 0))
+        save_btn.grid(row=6, column=0, columnspan=3, pady=(10, 0))
         
     def create_status_bar(self):
         """Tạo status bar với design đẹp - Header/Toolbar màu"""
@@ -667,22 +855,22 @@ class MainWindow:
                 if not result:
                     return
                 
+        # URL cùng gallery với task đang có (khác http/https, www., dấu /...) hoặc gallery đã tải
+        duplicate = self.download_manager.duplicate_reason(url)
+        if duplicate:
+            reason = "đã có trong danh sách" if duplicate == 'queued' else "đã được tải trước đây"
+            if not messagebox.askyesno("Warning", f"Gallery này {reason}.\n\nURL: {url}\n\nVẫn thêm vào danh sách?"):
+                return
+        
         # Thêm vào download queue
         task = self.download_manager.add_download(url)
+        if duplicate:
+            self.download_manager.allow_duplicate(task)
         
-        # Thêm vào treeview (tạm thời với URL, sẽ update sau khi có info)
-        item_id = self.download_tree.insert("", tk.END, values=(
-            "",  # Cover image (sẽ load sau)
-            url[:50],  # Tạm thời hiển thị URL
-            task.chapters,
-            task.pages,
-            task.status,
-            f"{task.progress}%",
-            self.format_file_size(task.file_size)
-        ), tags=(task.status,))
-        
-        # Lưu mapping task -> item_id
-        self.task_items[task] = item_id
+        # Thêm vào danh sách (tạm thời hiển thị URL, sẽ update sau khi có info)
+        self.task_model.add([task])
+        self.task_list.invalidate()
+        self.task_list.see(task)
         
         # Lấy thông tin và ảnh bìa ngay lập tức (trong thread riêng) - KHÔNG tải ảnh
         self._fetch_manga_info_only(task, url)
@@ -705,10 +893,11 @@ class MainWindow:
             print("✓ Đã khởi động download threads")
         
         # Đếm số tasks đang queued hoặc có thông tin nhưng chưa tải
+        # (task Retrying/Host Down do retry scheduler đưa về hàng đợi khi hết backoff / host hoạt động lại)
         tasks_to_download = []
-        for task in self.task_items.keys():
+        for task in self.task_model.all_tasks():
             with task.lock:
-                if task.status in ["Queued", "Getting Info"] or (task.status not in ["Downloading", "Completed", "Error"] and task.pages > 0):
+                if task.status in ["Queued", "Getting Info"] or (task.status not in ["Downloading", "Completed", "Duplicate", "Error", "Retrying", "Host Down"] and task.pages > 0):
                     # Đảm bảo task có thông tin trước khi tải
                     if not task.title or task.pages == 0:
                         # Chưa có thông tin, bỏ qua
@@ -717,21 +906,24 @@ class MainWindow:
         
         if tasks_to_download:
             # Update status và thêm vào queue để bắt đầu download
+            try:
+                queued = set(self.download_manager.download_queue.queue)
+            except:
+                queued = set()
+            
+            new_tasks = []
             for task in tasks_to_download:
                 with task.lock:
                     # Chỉ thêm vào queue nếu có thông tin đầy đủ
                     if task.title and task.pages > 0:
                         task.status = "Queued"
                         # Thêm vào queue nếu chưa có
-                        try:
-                            # Kiểm tra xem task đã trong queue chưa
-                            queue_list = list(self.download_manager.download_queue.queue)
-                            if task not in queue_list:
-                                self.download_manager.download_queue.put(task)
-                                print(f"✓ Đã thêm task vào queue: {task.title[:50]}")
-                        except:
-                            # Nếu lỗi, thêm trực tiếp
-                            self.download_manager.download_queue.put(task)
+                        if task not in queued:
+                            new_tasks.append(task)
+                            print(f"✓ Đã thêm task vào queue: {task.title[:50]}")
+            
+            # Thêm vào queue một lần (mở sẵn kết nối tới các host)
+            self.download_manager.queue_tasks(new_tasks)
             
             self.status_bar.config(text=f"Đã bắt đầu tải {len(tasks_to_download)} manga...")
             print(f"✓ Bắt đầu tải {len(tasks_to_download)} manga")
@@ -749,9 +941,13 @@ class MainWindow:
         
     def remove_selected(self):
         """Xóa các item đã chọn"""
-        selected = self.download_tree.selection()
-        for item in selected:
-            self.download_tree.delete(item)
+        selected = self.task_list.selected_tasks()
+        self.task_model.remove(selected)
+        self.task_list.forget(selected)
+        for task in selected:
+            self._drop_cover_photo(task)
+            self.download_manager.remove_download(task)
+        self.task_list.invalidate()
         self.status_bar.config(text=f"Đã xóa {len(selected)} item(s)")
         
     def refresh_list(self):
@@ -767,8 +963,11 @@ class MainWindow:
         download_dir = Path(self.download_dir_var.get())
         if download_dir.exists() or download_dir.parent.exists():
             self.config.set_download_directory(download_dir)
+        self.config.set('Directories', 'StorageMode', self.storage_mode_var.get())
             
         self.config.set('Queuing & Error Handling', 'DownloadsMax', self.max_downloads_var.get())
+        self.config.set('Processing', 'OutputFormat', self.output_format_var.get())
+        self.download_manager.output_policy = OutputPolicy.from_config(self.config)
         
         messagebox.showinfo("Success", "Đã lưu cài đặt")
         
@@ -973,9 +1172,10 @@ class MainWindow:
     
     def _refresh_modules(self):
         """Refresh modules (reload)"""
-        # Reload modules
+        # Reload modules (index domain -> module dựng lại trong load_modules)
         self.lua_loader.modules = {}
         self.lua_loader.load_modules()
+        self.download_manager.canonicalizer.set_domains(self.lua_loader.domain_map())
         
         total_modules = len(self.lua_loader.get_all_modules())
         messagebox.showinfo(
@@ -991,6 +1191,7 @@ class MainWindow:
             try:
                 # Tìm module
                 module = self.lua_loader.find_module_for_url(url)
+                task.module_name = self.download_manager._module_name(module)
                 if not module:
                     self.root.after_idle(
                         lambda: self._update_task_error(task, "Không tìm thấy module phù hợp")
@@ -1009,6 +1210,7 @@ class MainWindow:
                         task.chapters = info.get('chapters', 0)
                         task.pages = info.get('pages', 0)
                         task.total_pages = info.get('pages', 0)
+                        task.pages_known = info.get('pages_known', False)
                     
                     print(f"✓ Đã lấy thông tin: {task.title}, {task.pages} pages")
                     
@@ -1017,13 +1219,12 @@ class MainWindow:
                     if cover_url:
                         task.cover_image_url = cover_url
                         # Download ảnh bìa
-                        self._download_cover_image(task, cover_url)
+                        self._download_cover_image(task, cover_url, module)
                         print(f"✓ Đã tải ảnh bìa")
                 
                 # Update UI
-                if task in self.task_items:
-                    item_id = self.task_items[task]
-                    self.root.after_idle(self._update_item_with_cover, task, item_id)
+                if task in self.task_model:
+                    self.ui_bridge.mark_dirty(task)
                     self.root.after_idle(
                         lambda: self.status_bar.config(text=f"Đã thêm: {task.title[:50]}...")
                     )
@@ -1045,14 +1246,12 @@ class MainWindow:
             task.status = "Error"
             task.error = error_msg
         
-        if task in self.task_items:
-            item_id = self.task_items[task]
-            self.root.after_idle(self._update_single_item, task, item_id)
+        self.ui_bridge.mark_dirty(task)
     
     def _extract_cover_image_url(self, url, module):
         """Trích xuất URL ảnh bìa từ HTML"""
         try:
-            response = self.download_manager.session.get(url, timeout=15)
+            response = self.download_manager._http_get(url, module, kind='page')
             response.raise_for_status()
             
             from bs4 import BeautifulSoup
@@ -1113,158 +1312,175 @@ class MainWindow:
         
         return None
     
-    def _download_cover_image(self, task, cover_url):
+    def _download_cover_image(self, task, cover_url, module=None):
         """Download ảnh bìa"""
         try:
-            response = self.download_manager.session.get(cover_url, timeout=10, stream=True)
+            response = self.download_manager._http_get(cover_url, module, kind='cover', stream=True)
             response.raise_for_status()
             
             # Giới hạn kích thước ảnh (max 2MB)
             content = b''
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in self.download_manager.http.iter_content(response, chunk_size=8192):
                 content += chunk
                 if len(content) > 2 * 1024 * 1024:  # 2MB
                     break
             
-            task.cover_image_data = content
+            # Ảnh bìa giữ trong RAM suốt đời task: budget gần đầy thì không giữ (chỉ mất ảnh bìa)
+            if not self.download_manager.set_cover_image(task, content):
+                print(f"⚠ Bỏ qua ảnh bìa {task.url[:50]}: budget RAM gần đầy")
             
         except Exception as e:
             print(f"Lỗi khi download cover image: {e}")
     
-    def _update_item_with_cover(self, task, item_id):
-        """Update item trong treeview với ảnh bìa"""
-        try:
-            if item_id not in self.download_tree.get_children():
-                return
-            
-            # Thread-safe read
-            with task.lock:
-                status = task.status
-                progress = task.progress
-                error = task.error
-                title = task.title
-                pages = task.pages
-                current_page = task.current_page
-                total_pages = task.total_pages
-                chapters = task.chapters
-                file_size = task.file_size
-                cover_data = task.cover_image_data
-            
-            # Hiển thị error nếu có
-            status_display = status
-            if error:
-                status_display = f"{status}: {error[:40]}"
-            
-            # Hiển thị pages đang tải
-            pages_display = pages
-            if total_pages > 0:
-                if current_page > 0:
-                    pages_display = f"{current_page}/{total_pages}"
-                else:
-                    pages_display = f"0/{total_pages}"
-            
-            # Load và hiển thị ảnh bìa
-            cover_display = "📷" if cover_data else ""
-            if cover_data and item_id not in self.cover_images:
-                try:
-                    # Resize ảnh về thumbnail (60x60)
-                    img = Image.open(io.BytesIO(cover_data))
-                    img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    
-                    # Lưu để tránh garbage collection
-                    self.cover_images[item_id] = photo
-                except Exception as e:
-                    print(f"Lỗi khi load ảnh bìa: {e}")
-            
-            # Update values
-            self.download_tree.item(item_id, values=(
-                cover_display,
-                title or task.url[:50],
-                chapters,
-                pages_display,
-                status_display,
-                f"{progress}%",
-                self.format_file_size(file_size)
-            ), tags=(status,))
-            
-            # Set image vào cột Cover (nếu có)
-            if item_id in self.cover_images:
-                # Tạm thời dùng text, sẽ cải thiện sau
-                pass
-                    
-        except Exception as e:
-            print(f"Lỗi update item với cover: {e}")
+    def _cache_cover_photo(self, task, photo):
+        """Giữ thumbnail của task (LRU, tính vào stage 'thumbnail'); budget gần đầy thì không giữ"""
+        memory = self.download_manager.memory
+        while len(self.cover_images) >= THUMBNAIL_CACHE_SIZE:
+            # Dòng đã cuộn ra khỏi màn hình từ lâu: bỏ ảnh, cuộn lại sẽ decode lại
+            _, old = self.cover_images.popitem(last=False)
+            memory.release('thumbnail', old.width() * old.height() * 4)
+        if memory.try_reserve('thumbnail', photo.width() * photo.height() * 4):
+            self.cover_images[task] = photo
+            return True
+        return False
+    
+    def _cover_thumbnail(self, task):
+        """Thumbnail của task cho cột Cover; chưa có thì gửi ảnh bìa cho thumbnail worker ("" trong lúc chờ)"""
+        photo = self.cover_images.get(task)
+        if photo is not None:
+            self.cover_images.move_to_end(task)
+            return photo
+        if task.cover_image_data and task not in self._cover_failed:
+            self.thumbnail_worker.request(task, task.cover_image_data, THUMBNAIL_SIZE)
+        return ""
+    
+    def _drop_cover_photo(self, task):
+        photo = self.cover_images.pop(task, None)
+        if photo is not None:
+            self.download_manager.memory.release('thumbnail', photo.width() * photo.height() * 4)
+        photo = self.preview_photos.pop(task, None)
+        if photo is not None:
+            self.download_manager.memory.release('thumbnail', photo.width() * photo.height() * 4)
+    
+    def _on_ui_frame(self):
+        """Mỗi frame: nhận ảnh bìa đã decode xong từ thumbnail worker (chỉ tạo PhotoImage trên Tk thread)
+
+        Tối đa THUMBNAILS_PER_FRAME ảnh mỗi frame, phần còn lại để frame sau (import hàng trăm ảnh bìa
+        không làm đứng cửa sổ)
+        """
+        thumbnails = []
+        for task, size, image in self.thumbnail_worker.take(THUMBNAILS_PER_FRAME):
+            if task not in self.task_model:
+                continue
+            if image is None:
+                self._cover_failed.add(task)
+            elif size == HOVER_PREVIEW_SIZE:
+                self._cache_preview_photo(task, ImageTk.PhotoImage(image))
+                if task is self._hover_task:
+                    self._show_cover_tooltip(task)
+            elif self._cache_cover_photo(task, ImageTk.PhotoImage(image)):
+                thumbnails.append(task)
+        if thumbnails:
+            self.task_list.refresh(thumbnails)
+    
+    def _cache_preview_photo(self, task, photo):
+        """Giữ ảnh hover của task (LRU HOVER_CACHE_SIZE ảnh, tính vào stage 'thumbnail')"""
+        memory = self.download_manager.memory
+        while len(self.preview_photos) >= HOVER_CACHE_SIZE:
+            _, old = self.preview_photos.popitem(last=False)
+            memory.release('thumbnail', old.width() * old.height() * 4)
+        if memory.try_reserve('thumbnail', photo.width() * photo.height() * 4):
+            self.preview_photos[task] = photo
+        elif task is self._hover_task:
+            # Budget gần đầy: vẫn hiển thị nhưng không giữ lại
+            self._show_cover_tooltip(task, photo)
     
     def _on_treeview_hover(self, event):
-        """Xử lý hover trên treeview để hiển thị ảnh bìa phóng to"""
+        """Xử lý hover trên treeview để hiển thị ảnh bìa phóng to
+
+        Chạy trên mỗi <Motion>: chỉ tra dòng/cột và dời tooltip. Ảnh chỉ hiện khi chuột dừng
+        HOVER_DELAY_MS trên một dòng; ảnh chưa có trong cache được decode ở thumbnail worker.
+        """
         try:
             item = self.download_tree.identify_row(event.y)
-            if not item:
-                # Ẩn tooltip nếu không hover vào item nào
-                if self.cover_tooltip:
-                    self.cover_tooltip.destroy()
-                    self.cover_tooltip = None
-                return
-            
-            # Kiểm tra xem có hover vào cột Cover không
-            column = self.download_tree.identify_column(event.x)
-            if column != '#1':  # Cột Cover là cột đầu tiên
-                if self.cover_tooltip:
-                    self.cover_tooltip.destroy()
-                    self.cover_tooltip = None
+            # Chỉ hover vào cột Cover (cột #0)
+            task = self.task_list.task_for_item(item) if item else None
+            if task is None or not task.cover_image_data or self.download_tree.identify_column(event.x) != '#0':
+                self._hide_cover_tooltip()
                 return
             
-            # Tìm task tương ứng
-            task = None
-            for t, item_id in self.task_items.items():
-                if item_id == item:
-                    task = t
-                    break
-            
-            if not task or not task.cover_image_data:
+            self._hover_pos = (event.x_root + 20, event.y_root + 20)
+            if task is self._tooltip_task:
+                # Cùng dòng: chỉ dời tooltip theo chuột
+                self.cover_tooltip.geometry(f"+{self._hover_pos[0]}+{self._hover_pos[1]}")
                 return
             
-            # Hiển thị tooltip với ảnh phóng to
+            # Debounce: chờ chuột dừng trên dòng rồi mới hiển thị
+            self._hover_task = task
+            if self._hover_after is not None:
+                self.root.after_cancel(self._hover_after)
+            self._hover_after = self.root.after(HOVER_DELAY_MS, self._on_hover_settled)
+                
+        except Exception as e:
+            print(f"Lỗi khi hover ảnh bìa: {e}")
+    
+    def _on_hover_settled(self):
+        self._hover_after = None
+        task = self._hover_task
+        if task is None:
+            return
+        if task in self.preview_photos:
+            self.preview_photos.move_to_end(task)
+            self._show_cover_tooltip(task)
+        else:
+            # Decode ở worker; _on_ui_frame hiển thị khi xong (nếu chuột vẫn ở dòng này)
+            self.thumbnail_worker.request(task, task.cover_image_data, HOVER_PREVIEW_SIZE)
+    
+    def _show_cover_tooltip(self, task, photo=None):
+        """Hiển thị tooltip với ảnh phóng to"""
+        photo = photo or self.preview_photos.get(task)
+        if photo is None:
+            return
+        try:
             if not self.cover_tooltip:
                 self.cover_tooltip = tk.Toplevel(self.root)
                 self.cover_tooltip.overrideredirect(True)
                 self.cover_tooltip.attributes('-topmost', True)
+                label = tk.Label(self.cover_tooltip)
+                label.pack()
+                self.cover_tooltip.label = label
             
-            # Load và resize ảnh
-            try:
-                img = Image.open(io.BytesIO(task.cover_image_data))
-                # Resize về kích thước lớn hơn (300x300)
-                img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                
-                # Update tooltip
-                if hasattr(self.cover_tooltip, 'label'):
-                    self.cover_tooltip.label.config(image=photo)
-                    self.cover_tooltip.label.image = photo
-                else:
-                    label = tk.Label(self.cover_tooltip, image=photo)
-                    label.image = photo  # Keep reference
-                    label.pack()
-                    self.cover_tooltip.label = label
-                
-                # Đặt vị trí tooltip
-                x = event.x_root + 20
-                y = event.y_root + 20
-                self.cover_tooltip.geometry(f"+{x}+{y}")
-                
-            except Exception as e:
-                print(f"Lỗi khi hiển thị tooltip ảnh: {e}")
-                
-        except Exception:
-            pass
+            self.cover_tooltip.label.config(image=photo)
+            self.cover_tooltip.label.image = photo  # Keep reference
+            self.cover_tooltip.geometry(f"+{self._hover_pos[0]}+{self._hover_pos[1]}")
+            self.cover_tooltip.deiconify()
+            self._tooltip_task = task
+        except Exception as e:
+            print(f"Lỗi khi hiển thị tooltip ảnh: {e}")
+    
+    def _hide_cover_tooltip(self):
+        self._hover_task = None
+        if self._hover_after is not None:
+            self.root.after_cancel(self._hover_after)
+            self._hover_after = None
+        if self._tooltip_task is not None:
+            # Giữ Toplevel để dùng lại, chỉ ẩn đi
+            self.cover_tooltip.withdraw()
+            self._tooltip_task = None
         
     def show_context_menu(self, event):
         """Hiển thị context menu"""
+        # Chuột phải vào dòng chưa chọn: chọn dòng đó
+        task = self.task_list.task_at(event.y)
+        if task is not None and not self.task_list.is_selected(task):
+            self.task_list.select([task])
+        
         menu = tk.Menu(self.root, tearoff=0)
         menu.add_command(label="Start", command=self.start_selected)
         menu.add_command(label="Pause", command=self.pause_selected)
         menu.add_command(label="Remove", command=self.remove_selected)
+        if any(t.status in ("Duplicate", "Completed") for t in self.task_list.selected_tasks()):
+            menu.add_command(label="Download Anyway", command=self.redownload_selected)
         menu.add_separator()
         menu.add_command(label="Open Folder", command=self.open_selected_folder)
         
@@ -1275,28 +1491,69 @@ class MainWindow:
             
     def start_selected(self):
         """Bắt đầu item đã chọn"""
-        pass
+        if not self.download_manager.running:
+            self.download_manager.start_downloads()
+        
+        new_tasks = []
+        for task in self.task_list.selected_tasks():
+            with task.lock:
+                # Chỉ task đã có thông tin và chưa/không còn đang tải
+                if task.title and task.pages > 0 and task.status in ("Queued", "Paused", "Error"):
+                    task.status = "Queued"
+                    new_tasks.append(task)
+        self.download_manager.queue_tasks(new_tasks)
+        self.ui_bridge.mark_many(new_tasks)
+        self.status_bar.config(text=f"Đã bắt đầu tải {len(new_tasks)} manga...")
+        
+    def redownload_selected(self):
+        """Tải lại item Duplicate/Completed đã chọn (bỏ qua kiểm tra gallery đã tải)"""
+        tasks = [task for task in self.task_list.selected_tasks() if task.status in ("Duplicate", "Completed")]
+        if not tasks or not messagebox.askyesno(
+                "Warning", f"Tải lại {len(tasks)} gallery dù đã tải trước đây?"):
+            return
+        if not self.download_manager.running:
+            self.download_manager.start_downloads()
+        for task in tasks:
+            self.download_manager.allow_duplicate(task)
+            with task.lock:
+                task.status = "Queued"
+                task.progress = 0
+                task.current_page = 0
+        self.download_manager.queue_tasks(tasks)
+        self.ui_bridge.mark_many(tasks)
+        self.status_bar.config(text=f"Đã bắt đầu tải lại {len(tasks)} manga...")
         
     def pause_selected(self):
         """Tạm dừng item đã chọn"""
-        pass
+        selected = self.task_list.selected_tasks()
+        for task in selected:
+            self.download_manager.pause_download(task)
+        self.ui_bridge.mark_many(selected)
         
     def open_selected_folder(self):
         """Mở thư mục của item đã chọn"""
-        pass
+        selected = self.task_list.selected_tasks()
+        if not selected:
+            return
+        download_dir = self.config.get_download_directory()
+        task = selected[0]
+        if task.location:
+            # Gallery đã xong/có trong thư viện: thư mục của gallery, hoặc thư mục chứa file .cbz
+            manga_dir = Path(task.location) if os.path.isdir(task.location) else Path(task.location).parent
+        else:
+            manga_dir = download_dir / self.download_manager._sanitize_filename(task.title) if task.title else None
+        folder = manga_dir if manga_dir is not None and manga_dir.is_dir() else download_dir
+        if folder.exists():
+            os.startfile(str(folder))
+        else:
+            messagebox.showwarning("Warning", "Thư mục download không tồn tại")
     
     def show_task_details(self, event):
         """Hiển thị chi tiết task khi double click"""
-        item = self.download_tree.selection()[0] if self.download_tree.selection() else None
-        if not item:
-            return
-        
-        # Tìm task tương ứng
-        task = None
-        for t, item_id in self.task_items.items():
-            if item_id == item:
-                task = t
-                break
+        task = self.task_list.task_at(event.y)
+        if task is None:
+            selected = self.task_list.selected_tasks()
+            task = selected[0] if selected else None
         
         if not task:
             return
@@ -1330,6 +1587,18 @@ Title: {task.title or 'N/A'}
         if task.retry_count > 0:
             info += f"Retry Count: {task.retry_count}/{task.max_retries}\n"
         
+        # Trạng thái circuit breaker của host
+        host = self.download_manager.http.host_of(task.url)
+        circuit = self.download_manager.get_circuit_states().get(host)
+        if circuit:
+            info += f"Host: {host} - circuit {circuit['state']} (lỗi liên tiếp: {circuit['failures']}, đã ngắt {circuit['opened_count']} lần"
+            if circuit['state'] != 'closed':
+                info += f", thử lại sau {circuit['retry_in']:.0f}s"
+            info += ")\n"
+        latency = self.download_manager.get_latency_stats().get(host)
+        if latency and latency['samples']:
+            info += f"Latency: TTFB p50 {latency['ttfb_p50_ms']}ms / p99 {latency['ttfb_p99_ms']}ms, timeout ảnh {latency['timeout_image']}\n"
+        
         text_widget.insert("1.0", info)
         text_widget.config(state=tk.DISABLED)
         
@@ -1346,10 +1615,12 @@ Title: {task.title or 'N/A'}
         return f"{size:.2f} TB"
         
     def load_from_txt_file(self):
-        """Load URLs từ file TXT"""
+        """Load URLs từ file TXT (hoặc TXT nén gzip/bz2/xz)"""
         file_path = filedialog.askopenfilename(
             title="Chọn file TXT chứa URLs",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[("Text files", "*.txt"),
+                       ("Compressed lists", "*.gz *.bz2 *.xz"),
+                       ("All files", "*.*")]
         )
         
         if not file_path:
@@ -1379,53 +1650,27 @@ Title: {task.title or 'N/A'}
         self.show_loading_dialog(file_path)
         
     def _load_txt_file_thread(self, file_path):
-        """Thread để load file TXT (không block UI)"""
+        """Thread để load file TXT (không block UI)
+        
+        Đọc file một lượt (mmap, hoặc giải nén dạng stream), mỗi khối URL đi thẳng vào
+        kiểm tra trùng và download manager; tiến độ tính theo byte đã đọc
+        """
         try:
-            urls = []
-            total_lines = 0
-            valid_urls = 0
-            last_update = 0
-            
-            # Đếm tổng số dòng trước (nhanh hơn với buffering)
-            print("Đang đếm tổng số dòng...")
-            with open(file_path, 'r', encoding='utf-8', errors='ignore', buffering=8192*16) as f:
-                for _ in f:
-                    total_lines += 1
+            compression = detect_compression(file_path)
+            print(f"Đang đọc {file_path}" + (f" (nén {compression})" if compression else ""))
+            found = [0]
             
-            print(f"Tổng số dòng: {total_lines}")
+            def on_progress(done, total):
+                self.root.after_idle(self._update_loading_progress, done, total, found[0])
             
-            # Đọc từng dòng (không load hết vào memory)
-            with open(file_path, 'r', encoding='utf-8', errors='ignore', buffering=8192*16) as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    
-                    # Bỏ qua dòng trống và comment
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # Kiểm tra URL hợp lệ
-                    if line.startswith('http://') or line.startswith('https://'):
-                        urls.append(line)
-                        valid_urls += 1
-                        
-                        # Update progress mỗi 1000 URLs (giảm tần suất)
-                        if valid_urls - last_update >= 1000:
-                            self.root.after_idle(self._update_loading_progress, 
-                                                line_num, total_lines, valid_urls)
-                            last_update = valid_urls
-                            
-                            # Cho UI thở một chút
-                            time.sleep(0.01)
+            def blocks():
+                for urls in iter_url_blocks(file_path, on_progress):
+                    found[0] += len(urls)
+                    yield urls
             
-            # Update lần cuối
-            self.root.after_idle(self._update_loading_progress, 
-                               total_lines, total_lines, valid_urls)
-            
-            print(f"Đã đọc xong: {valid_urls} URLs")
-            
-            # Thêm tất cả URLs vào queue (trong thread riêng để không block)
-            # Không dùng after_idle vì sẽ block UI, dùng thread trực tiếp
-            self._add_urls_from_txt_batch(urls, valid_urls)
+            added, skipped, unsupported = self._import_url_blocks(blocks())
+            print(f"Đã đọc xong: {found[0]} URLs")
+            self._finish_url_import(added, skipped, unsupported)
             
         except Exception as e:
             import traceback
@@ -1436,12 +1681,13 @@ Title: {task.title or 'N/A'}
             self.root.after_idle(self._close_loading_dialog)
             
     def _update_loading_progress(self, current, total, valid):
-        """Update progress khi load file"""
+        """Update progress khi load file (current/total tính theo byte của file trên đĩa)"""
         if hasattr(self, 'loading_label') and self.loading_label.winfo_exists():
             try:
                 percent = (current / total * 100) if total > 0 else 0
                 self.loading_label.config(
-                    text=f"Đang đọc: {current:,}/{total:,} dòng, {valid:,} URLs hợp lệ... ({percent:.1f}%)"
+                    text=f"Đang đọc: {self.format_file_size(current)}/{self.format_file_size(total)}, "
+                         f"{valid:,} URLs hợp lệ... ({percent:.1f}%)"
                 )
                 # Update progress bar nếu có
                 if hasattr(self, 'loading_progress_determinate'):
@@ -1450,72 +1696,12 @@ Title: {task.title or 'N/A'}
                 pass  # Ignore errors khi window đã đóng
             
     def _add_urls_from_txt_batch(self, urls, count):
-        """Thêm URLs từ TXT vào download queue (batch processing để tránh đơ UI)"""
+        """Thêm URLs vào download queue trong thread riêng (batch processing để tránh đơ UI)"""
         print(f"Bắt đầu thêm {len(urls)} URLs...")
         
-        # Chạy trong thread riêng để không block UI
         def add_urls_thread():
             try:
-                added = 0
-                skipped = 0
-                
-                # Lấy danh sách URLs hiện có để check duplicate nhanh hơn
-                existing_urls = set()
-                for task in list(self.task_items.keys()):  # Copy để tránh modification during iteration
-                    existing_urls.add(task.url)
-                
-                print(f"Đã có {len(existing_urls)} URLs trong queue")
-                
-                # Batch size để thêm vào queue
-                BATCH_SIZE = 1000  # Có thể lớn hơn vì chỉ thêm vào queue
-                
-                # Thêm URLs vào download queue (nhanh)
-                new_tasks = []
-                for i, url in enumerate(urls):
-                    # Kiểm tra URL đã tồn tại chưa
-                    if url in existing_urls:
-                        skipped += 1
-                        continue
-                    
-                    task = self.download_manager.add_download(url)
-                    new_tasks.append((task, url))
-                    existing_urls.add(url)
-                    added += 1
-                    
-                    # Thêm vào treeview insert queue (không block)
-                    if len(new_tasks) >= BATCH_SIZE:
-                        self.treeview_insert_queue.put(new_tasks.copy())
-                        new_tasks = []
-                        
-                        # Update status bar
-                        self.root.after_idle(
-                            self.status_bar.config,
-                            {"text": f"Đang thêm: {added:,}/{len(urls):,} URLs..."}
-                        )
-                
-                # Thêm batch cuối cùng
-                if new_tasks:
-                    self.treeview_insert_queue.put(new_tasks)
-                
-                # Thêm marker để biết đã xong
-                self.treeview_insert_queue.put(None)  # None = done marker
-                
-                # Update status bar cuối cùng
-                self.root.after_idle(
-                    self.status_bar.config,
-                    {"text": f"Đã thêm {added:,} URLs, bỏ qua {skipped:,} URLs trùng lặp"}
-                )
-                
-                print(f"Hoàn thành: {added} added, {skipped} skipped")
-                
-                if added > 0 and added <= 100:
-                    self.root.after_idle(
-                        lambda: messagebox.showinfo(
-                            "Thành công",
-                            f"Đã thêm {added:,} URLs vào queue!\n"
-                            f"Bỏ qua {skipped:,} URLs trùng lặp."
-                        )
-                    )
+                self._finish_url_import(*self._import_url_blocks([urls]))
             except Exception as e:
                 import traceback
                 error_msg = f"Lỗi khi thêm URLs: {str(e)}\n\n{traceback.format_exc()}"
@@ -1527,7 +1713,85 @@ Title: {task.title or 'N/A'}
         # Chạy trong thread riêng
         thread = threading.Thread(target=add_urls_thread, daemon=True)
         thread.start()
+    
+    def _import_url_blocks(self, blocks):
+        """Thêm URL từ các khối (list URL) vào download manager; trả về (added, skipped, {host không hỗ trợ: số URL})
+        
+        Chạy trên thread nền. Download manager gán module cho cả khối (theo host) và loại URL
+        không có module hỗ trợ, URL trùng (cùng dạng chuẩn với task đang có hoặc gallery đã tải);
+        task mới đi vào treeview insert queue theo batch (chờ khi queue hoặc budget RAM đầy)
+        """
+        added = 0
+        skipped = 0
+        unsupported_hosts = {}  # {host: số URL} không có module hỗ trợ
+        print(f"Đã có {len(self.download_manager.all_tasks)} URLs trong queue")
+        
+        # Batch size để thêm vào treeview insert queue
+        BATCH_SIZE = 1000
+        
+        new_tasks = []
+        for urls in blocks:
+            for i in range(0, len(urls), BATCH_SIZE):
+                tasks, duplicates, unsupported = self.download_manager.add_downloads(urls[i:i + BATCH_SIZE])
+                skipped += duplicates
+                for host, count in unsupported.items():
+                    unsupported_hosts[host] = unsupported_hosts.get(host, 0) + count
+                added += len(tasks)
+                new_tasks.extend((task, task.url) for task in tasks)
                 
+                if len(new_tasks) >= BATCH_SIZE:
+                    self._queue_treeview_batch(new_tasks)
+                    new_tasks = []
+            
+            # Update status bar mỗi khối
+            self.root.after_idle(
+                self.status_bar.config,
+                {"text": f"Đang thêm: {added:,} URLs, bỏ qua {skipped:,} URLs trùng lặp, "
+                         f"{sum(unsupported_hosts.values()):,} URLs không hỗ trợ..."}
+            )
+        
+        # Thêm batch cuối cùng
+        if new_tasks:
+            self._queue_treeview_batch(new_tasks)
+        
+        # Thêm marker để biết đã xong
+        self.treeview_insert_queue.put(None)  # None = done marker
+        return added, skipped, unsupported_hosts
+    
+    def _finish_url_import(self, added, skipped, unsupported):
+        rejected = sum(unsupported.values())
+        # Update status bar cuối cùng
+        self.root.after_idle(
+            self.status_bar.config,
+            {"text": f"Đã thêm {added:,} URLs, bỏ qua {skipped:,} URLs trùng lặp, {rejected:,} URLs không hỗ trợ"}
+        )
+        
+        print(f"Hoàn thành: {added} added, {skipped} skipped, {rejected} unsupported")
+        summary = ""
+        if unsupported:
+            # Tóm tắt host không được hỗ trợ (nhiều URL nhất trước)
+            top = sorted(unsupported.items(), key=lambda item: -item[1])[:10]
+            for host, count in top:
+                print(f"  ⚠ Không có module cho {host or '(không phải URL)'}: {count:,} URLs")
+            summary = "\n\nKhông có module hỗ trợ:\n" + "\n".join(
+                f"  {host or '(không phải URL)'}: {count:,}" for host, count in top)
+            if len(unsupported) > len(top):
+                summary += f"\n  ... và {len(unsupported) - len(top):,} host khác"
+        
+        if (added > 0 and added <= 100) or unsupported:
+            self.root.after_idle(
+                lambda: messagebox.showinfo(
+                    "Thành công",
+                    f"Đã thêm {added:,} URLs vào queue!\n"
+                    f"Bỏ qua {skipped:,} URLs trùng lặp, {rejected:,} URLs không hỗ trợ." + summary
+                )
+            )
+                
+    def _queue_treeview_batch(self, batch):
+        """Đưa batch vào queue insert (chờ nếu queue hoặc budget RAM đầy)"""
+        self.download_manager.memory.reserve('ui_queue', len(batch) * QUEUE_ENTRY_BYTES)
+        self.treeview_insert_queue.put(batch)
+    
     def start_treeview_insert_worker(self):
         """Bắt đầu worker thread để insert vào treeview với rate limiting"""
         def insert_worker():
@@ -1539,6 +1803,7 @@ Title: {task.title or 'N/A'}
                     # None = done marker
                     if batch is None:
                         continue
+                    self.download_manager.memory.release('ui_queue', len(batch) * QUEUE_ENTRY_BYTES)
                     
                     # Insert batch vào treeview
                     self.root.after_idle(self._insert_tasks_to_treeview, batch)
@@ -1555,27 +1820,12 @@ Title: {task.title or 'N/A'}
         self.treeview_insert_thread.start()
     
     def _insert_tasks_to_treeview(self, tasks):
-        """Insert nhiều tasks vào treeview cùng lúc (tối ưu)"""
+        """Thêm nhiều tasks vào model cùng lúc; Treeview chỉ vẽ lại cửa sổ đang hiển thị"""
         try:
-            # Insert tất cả items
-            for task, url in tasks:
-                item_id = self.download_tree.insert("", tk.END, values=(
-                    "",  # Cover image (sẽ load sau)
-                    url[:50],  # Tạm thời hiển thị URL
-                    task.chapters,
-                    task.pages,
-                    task.status,
-                    f"{task.progress}%",
-                    self.format_file_size(task.file_size)
-                ), tags=(task.status,))
-                self.task_items[task] = item_id
-                
-                # Lấy thông tin và ảnh bìa async
-                self._fetch_manga_info_async(task, url)
-            
-            # Chỉ update UI một lần sau khi insert xong batch
-            self.root.update_idletasks()
-            
+            self.task_model.add([task for task, url in tasks])
+            self.task_list.invalidate()
+            if self.task_model.query:
+                self._update_filter_count()
         except Exception as e:
             print(f"Lỗi khi insert tasks: {e}")
             
@@ -1677,54 +1927,31 @@ Title: {task.title or 'N/A'}
         def update_loop():
             while self.update_running:
                 try:
-                    # Đếm số lượng theo status
-                    status_count = {
-                        "Queued": 0,
-                        "Processing": 0,
-                        "Downloading": 0,
-                        "Completed": 0,
-                        "Error": 0,
-                        "Paused": 0
-                    }
-                    
-                    # Update tất cả items đang active (Processing, Downloading)
-                    items_to_update = []
-                    for task, item_id in list(self.task_items.items()):
-                        # Đếm status
-                        if task.status in status_count:
-                            status_count[task.status] += 1
-                        elif "Retrying" in task.status:
-                            status_count["Processing"] += 1
-                        elif "Getting Info" in task.status:
-                            status_count["Processing"] += 1
-                        
-                        if task.status in ["Processing", "Downloading", "Getting Info", "Retrying"]:
-                            items_to_update.append((task, item_id))
+                    # Số lượng theo status đọc từ bộ đếm của TaskStore (không duyệt task)
+                    store = self.download_manager.tasks
+                    stats = store.get_stats()
+                    status_count = stats['status']
                     
-                    # Update active items ngay lập tức
-                    for task, item_id in items_to_update:
-                        if item_id in self.download_tree.get_children():
-                            try:
-                                self.root.after_idle(self._update_single_item, task, item_id)
-                            except:
-                                pass
-                    
-                    # Update các items khác ít thường xuyên hơn
-                    all_items = list(self.task_items.items())
-                    if len(all_items) > len(items_to_update):
-                        # Chỉ update 50 items không active mỗi lần
-                        inactive_items = [(t, i) for t, i in all_items if t.status not in ["Processing", "Downloading", "Getting Info", "Retrying"]]
-                        for task, item_id in inactive_items[:50]:
-                            if item_id in self.download_tree.get_children():
-                                try:
-                                    self.root.after_idle(self._update_single_item, task, item_id)
-                                except:
-                                    pass
+                    # Dòng Retrying/Host Down hiển thị đếm ngược: đánh dấu để vẽ lại mỗi tick
+                    self.ui_bridge.mark_many(store.tasks_with_status("Retrying", "Host Down"))
                     
                     # Update status bar
-                    active = status_count["Processing"] + status_count["Downloading"]
-                    total = len(self.task_items)
-                    status_text = f"Total: {total} | Queued: {status_count['Queued']} | Active: {active} | Completed: {status_count['Completed']} | Errors: {status_count['Error']}"
+                    active = sum(status_count.get(status, 0) for status in ("Processing", "Getting Info", "Retrying", "Downloading"))
+                    status_text = f"Total: {stats['total']} | Queued: {status_count.get('Queued', 0)} | Active: {active} | Completed: {status_count.get('Completed', 0)} | Errors: {status_count.get('Error', 0)}"
+                    if stats['pages_total']:
+                        status_text += f" | Pages: {stats['pages_done']:,}/{stats['pages_total']:,} ({self.format_file_size(stats['bytes_done'])})"
+                    # Host đang bị tạm ngắt (circuit breaker mở)
+                    down_hosts = self.download_manager.http.breakers.open_hosts()
+                    if down_hosts:
+                        status_text += f" | Hosts down: {len(down_hosts)} ({', '.join(down_hosts[:3])}{'...' if len(down_hosts) > 3 else ''}) - {status_count.get('Host Down', 0)} tasks waiting"
+                    # RAM pipeline (chỉ hiện khi gần chạm budget)
+                    if self.download_manager.memory.near_limit():
+                        mem = self.download_manager.get_memory_stats()
+                        status_text += f" | RAM: {mem['used'] / 1024 / 1024:.0f}/{mem['limit'] / 1024 / 1024:.0f} MB"
+                    # Hàng đợi ghi đĩa (chỉ hiện khi có file chờ ghi)
+                    disk = self.download_manager.get_disk_stats()
+                    if disk['queue_depth']:
+                        status_text += f" | Disk: {disk['queue_depth']} chờ ghi ({disk['pending_bytes'] / 1024 / 1024:.1f} MB), {disk['throughput_mb_s']} MB/s"
                     self.root.after_idle(self.status_bar.config, {"text": status_text})
                                 
                     time.sleep(0.5)  # Update mỗi 0.5 giây cho active items
@@ -1736,12 +1963,9 @@ Title: {task.title or 'N/A'}
         self.update_thread = threading.Thread(target=update_loop, daemon=True)
         self.update_thread.start()
         
-    def _update_single_item(self, task, item_id):
-        """Update một item trong treeview"""
+    def _render_task_row(self, task):
+        """Giá trị (values, tags) của dòng hiển thị task"""
         try:
-            if item_id not in self.download_tree.get_children():
-                return
-                
             # Thread-safe read
             with task.lock:
                 status = task.status
@@ -1753,11 +1977,20 @@ Title: {task.title or 'N/A'}
                 total_pages = task.total_pages
                 chapters = task.chapters
                 file_size = task.file_size
+                retry_count = task.retry_count
+                max_retries = task.max_retries
+                next_retry_at = task.next_retry_at
             
             # Hiển thị error nếu có
             status_display = status
             if error:
                 status_display = f"{status}: {error[:40]}"
+            elif status == "Retrying":
+                status_display = f"Retrying {retry_count}/{max_retries}"
+                if next_retry_at:
+                    status_display += f" ({max(int(next_retry_at - time.time()), 0)}s)"
+            elif status == "Host Down" and next_retry_at:
+                status_display = f"Host Down ({max(int(next_retry_at - time.time()), 0)}s)"
             
             # Hiển thị pages đang tải
             pages_display = pages
@@ -1767,38 +2000,29 @@ Title: {task.title or 'N/A'}
                 else:
                     pages_display = f"0/{total_pages}"
             
-            # Load ảnh bìa nếu có
-            cover_display = ""
-            if task.cover_image_data and item_id not in self.cover_images:
-                try:
-                    img = Image.open(io.BytesIO(task.cover_image_data))
-                    img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-                    self.cover_images[item_id] = photo
-                    cover_display = "📷"
-                except:
-                    pass
-            
-            # Update values
-            self.download_tree.item(item_id, values=(
-                cover_display,
+            return (
                 title or task.url[:50],
                 chapters,
                 pages_display,
                 status_display,
                 f"{progress}%",
                 self.format_file_size(file_size)
-            ), tags=(status,))
+            ), (status,), self._cover_thumbnail(task)
                     
         except Exception as e:
             print(f"Lỗi update item: {e}")
+            return (task.url[:50], "", "", task.status, "", ""), (task.status,), ""
     
     def on_task_progress_update(self, task):
-        """Callback được gọi khi task progress thay đổi"""
-        # Update UI ngay lập tức
-        if task in self.task_items:
-            item_id = self.task_items[task]
-            self.root.after_idle(self._update_single_item, task, item_id)
+        """Callback được gọi khi task progress thay đổi (từ thread tải: chỉ đánh dấu dirty)"""
+        self.ui_bridge.mark_dirty(task)
+    
+    def _apply_dirty_tasks(self, tasks):
+        """Vẽ lại các dòng đã thay đổi trong frame (chạy trên Tk thread, một lần mỗi frame)
+
+        Chỉ task nằm trong cửa sổ đang hiển thị được vẽ; task khác lấy giá trị mới khi cuộn tới
+        """
+        self.task_list.refresh(tasks)
     
     def _check_modules_loaded(self):
         """Kiểm tra xem modules đã được load chưa"""
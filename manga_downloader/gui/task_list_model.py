@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Task List Model - Danh sách task của tab Downloads tách khỏi widget (mảng task ID + thứ tự sort/filter)
+"""
+
+import threading
+
+# Điều kiện lọc của filter bar
+QUERY_FIELDS = ('status', 'host', 'module', 'text', 'error')
+
+# Khóa sort theo cột của bảng Downloads
+SORT_KEYS = {
+    "Manga Title": lambda task: (task.title or task.url).lower(),
+    "Chapters": lambda task: task.chapters,
+    "Pages": lambda task: task.total_pages or task.pages,
+    "Status": lambda task: task.status,
+    "Progress": lambda task: task.progress,
+    "File Size": lambda task: task.file_size,
+}
+
+class TaskListModel:
+    """Model của danh sách download
+
+    - _order: mảng task ID theo thứ tự thêm vào
+    - _view: mảng task ID đang hiển thị (sau filter + sort), widget chỉ đọc một đoạn của mảng này
+    - _rows: {task ID: vị trí trong _view}, dựng lại khi cần (tra dòng của task không phải duyệt list)
+
+    Có store (TaskStore): lọc theo status/host/module/chuỗi dùng bucket và index của store,
+    sort theo tiêu đề/status đọc thứ tự index giữ sẵn; các cột số sort trực tiếp.
+
+    Thứ tự chỉ tính lại khi thêm/xóa task hoặc đổi sort/filter (giá trị của task đổi liên tục
+    trong lúc tải, sort lại mỗi lần sẽ làm các dòng nhảy vị trí).
+    """
+    def __init__(self, store=None):
+        self.store = store
+        self._tasks = {}  # {task ID: task}
+        self._order = []
+        self._view = []
+        self._rows = None
+        self._sort_column = None
+        self._sort_reverse = False
+        self._filter = None  # predicate(task) -> bool
+        self._query = {}  # {field trong QUERY_FIELDS: giá trị}
+        self._stale = False  # _view cần dựng lại (dựng lười khi widget đọc)
+        self._lock = threading.Lock()  # Thread thêm URL và Tk thread cùng dùng
+        self.version = 0  # Tăng mỗi khi _view đổi (widget vẽ lại)
+
+    def add(self, tasks):
+        with self._lock:
+            added = [task for task in tasks if task.id not in self._tasks]
+            for task in added:
+                self._tasks[task.id] = task
+                self._order.append(task.id)
+            if not added:
+                return 0
+            if self._sort_column is None and self._filter is None and not self._query and not self._stale:
+                # Không sort/filter: nối thẳng vào cuối, vị trí các dòng cũ không đổi
+                start = len(self._view)
+                self._view.extend(task.id for task in added)
+                if self._rows is not None:
+                    self._rows.update((task.id, start + i) for i, task in enumerate(added))
+            else:
+                self._stale = True
+            self.version += 1
+            return len(added)
+
+    def remove(self, tasks):
+        with self._lock:
+            removed = {task.id for task in tasks if self._tasks.pop(task.id, None) is not None}
+            if removed:
+                self._order = [task_id for task_id in self._order if task_id not in removed]
+                self._stale = True
+                self.version += 1
+            return len(removed)
+
+    def set_sort(self, column, reverse=False):
+        """Sort theo cột (None = thứ tự thêm vào)"""
+        with self._lock:
+            self._sort_column = column if column in SORT_KEYS else None
+            self._sort_reverse = reverse
+            self._stale = True
+            self.version += 1
+
+    def set_filter(self, predicate):
+        """Chỉ hiển thị task thỏa predicate (None = tất cả)"""
+        with self._lock:
+            self._filter = predicate
+            self._stale = True
+            self.version += 1
+
+    def set_query(self, **criteria):
+        """Lọc theo status/host/module (bằng), text (chuỗi con của tiêu đề/URL), error (chuỗi con của lỗi)
+
+        Giá trị rỗng/None = không lọc theo điều kiện đó
+        """
+        query = {field: value for field, value in criteria.items() if field in QUERY_FIELDS and value}
+        with self._lock:
+            self._query = query
+            self._stale = True
+            self.version += 1
+
+    @property
+    def query(self):
+        return dict(self._query)
+
+    @property
+    def sort_column(self):
+        return self._sort_column
+
+    @property
+    def sort_reverse(self):
+        return self._sort_reverse
+
+    def _ensure_view(self):
+        # Gọi khi đang giữ lock
+        if not self._stale:
+            return
+        ids = self._order
+        if self._query:
+            matched = self._match_query()
+            ids = [task_id for task_id in ids if task_id in matched]
+        if self._filter is not None:
+            tasks, predicate = self._tasks, self._filter
+            ids = [task_id for task_id in ids if predicate(tasks[task_id])]
+        else:
+            ids = list(ids)
+        if self._sort_column is not None:
+            ids = self._sorted(ids)
+        self._view = ids
+        self._rows = None
+        self._stale = False
+
+    def _match_query(self):
+        """Tập task ID thỏa _query"""
+        if self.store is not None:
+            return self.store.ids_matching(**self._query)
+        # Không có store: duyệt từng task
+        query, matched = self._query, set()
+        text, error = query.get('text', '').lower(), query.get('error', '').lower()
+        for task_id, task in self._tasks.items():
+            if 'status' in query and task.status != query['status']:
+                continue
+            if 'module' in query and task.module_name != query['module']:
+                continue
+            if 'host' in query and query['host'] not in task.url:
+                continue
+            if text and text not in (task.title or task.url).lower():
+                continue
+            if error and error not in str(task.error or '').lower():
+                continue
+            matched.add(task_id)
+        return matched
+
+    def _sorted(self, ids):
+        column, reverse = self._sort_column, self._sort_reverse
+        if self.store is not None and column in ("Manga Title", "Status"):
+            # Thứ tự có sẵn trong index của store: chỉ giữ lại các ID đang hiển thị
+            members = set(ids)
+            order = self.store.title_order() if column == "Manga Title" else self.store.status_order()
+            ids = [task_id for task_id in order if task_id in members]
+            if reverse:
+                ids.reverse()
+            return ids
+        key, tasks = SORT_KEYS[column], self._tasks
+        ids.sort(key=lambda task_id: key(tasks[task_id]), reverse=reverse)
+        return ids
+
+    def __len__(self):
+        """Số dòng đang hiển thị"""
+        with self._lock:
+            self._ensure_view()
+            return len(self._view)
+
+    def total(self):
+        """Tổng số task (kể cả task bị filter ẩn)"""
+        return len(self._tasks)
+
+    def get(self, task_id):
+        return self._tasks.get(task_id)
+
+    def __contains__(self, task):
+        return task.id in self._tasks
+
+    def all_tasks(self):
+        with self._lock:
+            return [self._tasks[task_id] for task_id in self._order]
+
+    def task_at(self, row):
+        with self._lock:
+            self._ensure_view()
+            if 0 <= row < len(self._view):
+                return self._tasks[self._view[row]]
+            return None
+
+    def tasks_in_range(self, start, stop):
+        """Task của các dòng [start, stop) - đoạn widget đang giữ"""
+        with self._lock:
+            self._ensure_view()
+            return [self._tasks[task_id] for task_id in self._view[max(start, 0):stop]]
+
+    def row_of(self, task):
+        """Vị trí dòng của task trong view, None nếu bị filter ẩn"""
+        with self._lock:
+            self._ensure_view()
+            if self._rows is None:
+                self._rows = {task_id: row for row, task_id in enumerate(self._view)}
+            return self._rows.get(task.id)
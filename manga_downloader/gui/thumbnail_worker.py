@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thumbnail Worker - Decode và thu nhỏ ảnh bìa ở thread riêng, Tk thread chỉ nhận ảnh đã thu nhỏ
+"""
+
+import io
+import itertools
+import queue
+import threading
+from collections import deque
+
+from PIL import Image
+
+from core.image_probe import probe_dimensions
+
+class ThumbnailWorker:
+    """Pool thread decode + resize ảnh bìa (PIL) ngoài Tk thread
+
+    request(key, data, size, priority) đưa job vào hàng đợi (priority nhỏ làm trước, trùng job đang
+    chờ thì bỏ qua); kết quả (key, size, PIL Image đã thu nhỏ hoặc None nếu ảnh lỗi) nằm trong hàng
+    kết quả cho tới khi Tk thread gọi take(). RAM decode được xin từ memory budget (chờ tối đa
+    decode_timeout giây, không được thì bỏ job, không trả kết quả: UI sẽ yêu cầu lại sau).
+    """
+    def __init__(self, memory=None, workers=2, decode_timeout=2.0):
+        self.memory = memory
+        self.decode_timeout = decode_timeout
+        self._jobs = queue.PriorityQueue()
+        self._seq = itertools.count()  # Thứ tự trong cùng priority (không so sánh key)
+        self._results = deque()
+        self._pending = set()  # {(key, size)} đang chờ hoặc đang decode
+        self._lock = threading.Lock()
+        self.decoded = 0
+        self.failed = 0
+        self.dropped = 0  # Job bị bỏ vì budget RAM không đủ
+        for i in range(max(int(workers), 1)):
+            threading.Thread(target=self._run, name=f"thumbnail-{i}", daemon=True).start()
+
+    def request(self, key, data, size, priority=1):
+        """Đưa ảnh vào hàng đợi decode; False nếu job này đang chờ"""
+        with self._lock:
+            if (key, size) in self._pending:
+                return False
+            self._pending.add((key, size))
+        self._jobs.put((priority, next(self._seq), key, data, size))
+        return True
+
+    def is_pending(self, key, size):
+        return (key, size) in self._pending
+
+    def take(self, limit=None):
+        """Lấy kết quả đã decode (gọi trên Tk thread), tối đa limit kết quả"""
+        results = []
+        while self._results and (limit is None or len(results) < limit):
+            results.append(self._results.popleft())
+        with self._lock:
+            # Job chỉ hết "đang chờ" khi UI đã nhận kết quả (tránh yêu cầu lại trong lúc kết quả nằm trong hàng)
+            for key, size, _ in results:
+                self._pending.discard((key, size))
+        return results
+
+    def _run(self):
+        while True:
+            _, _, key, data, size = self._jobs.get()
+            try:
+                image = self._decode(data, size)
+            except Exception as e:
+                self.failed += 1
+                self._results.append((key, size, None))
+                print(f"Lỗi khi decode ảnh bìa: {e}")
+                continue
+            if image is not None:
+                self.decoded += 1
+                self._results.append((key, size, image))
+            else:
+                with self._lock:
+                    self._pending.discard((key, size))
+
+    def _decode(self, data, size):
+        dimensions = probe_dimensions(data)
+        decode_bytes = dimensions[1] * dimensions[2] * 4 if dimensions else len(data) * 10
+        if self.memory is not None and not self.memory.reserve('decode', decode_bytes, timeout=self.decode_timeout):
+            self.dropped += 1
+            return None
+        try:
+            image = Image.open(io.BytesIO(data))
+            # JPEG: decode thẳng ở độ phân giải nhỏ hơn (nhanh và tốn ít RAM hơn)
+            image.draft('RGB', size)
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+            image.load()
+            return image
+        finally:
+            if self.memory is not None:
+                self.memory.release('decode', decode_bytes)
+
+    def get_stats(self):
+        return {
+            'queued': self._jobs.qsize(),
+            'pending': len(self._pending),
+            'ready': len(self._results),
+            'decoded': self.decoded,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI Bridge - Gom các task thay đổi (dirty set) và cập nhật UI theo từng frame bằng một timer root.after duy nhất
+"""
+
+import threading
+import time
+
+class UiUpdateBridge:
+    """Cầu nối thread tải -> Tk thread
+
+    Thread tải chỉ gọi mark_dirty(task) (thêm vào set, không gọi Tk). Mỗi frame_ms, Tk thread
+    lấy cả set ra và gọi apply_batch(keys) một lần; task đổi nhiều lần trong một frame chỉ
+    được vẽ lại một lần. Mỗi frame xử lý tối đa max_per_frame task, phần dư để frame sau.
+    """
+    def __init__(self, root, apply_batch, frame_ms=100, max_per_frame=500, on_frame=None):
+        self.root = root
+        self.apply_batch = apply_batch
+        self.frame_ms = frame_ms
+        self.max_per_frame = max_per_frame
+        self.on_frame = on_frame  # Gọi sau mỗi frame (ví dụ cập nhật status bar)
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._running = False
+        self._after_id = None
+        self.frames = 0
+        self.applied = 0  # Tổng số task đã vẽ lại
+        self.coalesced = 0  # Số lần mark_dirty trùng task đang chờ (đã được gộp)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._after_id = self.root.after(self.frame_ms, self._tick)
+
+    def stop(self):
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def mark_dirty(self, key):
+        """Gọi được từ mọi thread"""
+        with self._lock:
+            if key in self._dirty:
+                self.coalesced += 1
+            else:
+                self._dirty.add(key)
+
+    def mark_many(self, keys):
+        with self._lock:
+            self._dirty.update(keys)
+
+    def pending_count(self):
+        return len(self._dirty)
+
+    def drain(self):
+        """Lấy ra tối đa max_per_frame task đang dirty"""
+        with self._lock:
+            if len(self._dirty) <= self.max_per_frame:
+                batch, self._dirty = self._dirty, set()
+            else:
+                batch = set()
+                for _ in range(self.max_per_frame):
+                    batch.add(self._dirty.pop())
+        return batch
+
+    def _tick(self):
+        started = time.perf_counter()
+        try:
+            batch = self.drain()
+            if batch:
+                self.apply_batch(batch)
+                self.applied += len(batch)
+            if self.on_frame is not None:
+                self.on_frame()
+        except Exception as e:
+            print(f"Lỗi update UI: {e}")
+        finally:
+            self.frames += 1
+            if self._running:
+                # Frame tốn thời gian thì frame sau đến muộn hơn (Tk vẫn còn thời gian xử lý input)
+                elapsed_ms = int((time.perf_counter() - started) * 1000)
+                self._after_id = self.root.after(max(self.frame_ms, elapsed_ms * 2), self._tick)
+
+    def get_stats(self):
+        return {
+            'frames': self.frames,
+            'applied': self.applied,
+            'coalesced': self.coalesced,
+            'pending': self.pending_count(),
+        }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Virtual List - Treeview chỉ giữ các dòng đang hiển thị (+ overscan), dữ liệu lấy từ TaskListModel
+"""
+
+from tkinter import ttk
+
+class VirtualTaskList:
+    """Gắn một ttk.Treeview với TaskListModel
+
+    Treeview chỉ có một cửa sổ item cố định (số dòng nhìn thấy + overscan hai phía), item được dùng
+    lại khi cuộn: cuộn tới đâu thì ghi values của task tương ứng vào các item đó. Cuộn nhỏ trong
+    vùng overscan chỉ dời view của Treeview, ra khỏi vùng đó mới dời cửa sổ. Scrollbar hiển thị vị trí
+    theo toàn bộ model.
+
+    render_row(task) -> (values, tags, image): giá trị của một dòng (image hiện ở cột #0, "" nếu không có)
+    """
+    def __init__(self, tree, scrollbar, model, render_row, overscan=10, row_height=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.model = model
+        self.render_row = render_row
+        self.overscan = overscan
+        self.row_height = row_height
+        self._start = 0  # Dòng model của item đầu cửa sổ
+        self._top = 0  # Dòng model đầu tiên đang nhìn thấy
+        self._items = []  # Item ID của cửa sổ (dùng lại khi cuộn)
+        self._item_task = {}  # {item ID: task}
+        self._task_item = {}  # {task: item ID}
+        self._selection = set()  # Task đang chọn (giữ nguyên khi item được dùng lại)
+        self._focus_task = None
+        self._render_pending = False
+        self._version = None
+        self.renders = 0  # Số lần vẽ lại cửa sổ
+
+        tree.configure(yscrollcommand=self._on_tree_yview)
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", lambda event: self.invalidate(), add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+
+    # ----- Kích thước -----
+
+    def _row_height(self):
+        if self.row_height is None:
+            style = self.tree.cget("style") or "Treeview"
+            self.row_height = int(ttk.Style().lookup(style, "rowheight") or 20)
+        return self.row_height
+
+    def visible_rows(self):
+        """Số dòng vừa trong widget"""
+        height = self.tree.winfo_height()
+        if height <= 1:  # Chưa được vẽ lần nào
+            return int(self.tree.cget("height"))
+        return max(height // self._row_height(), 1)
+
+    # ----- Vẽ cửa sổ -----
+
+    def invalidate(self):
+        """Model hoặc kích thước đổi: vẽ lại cửa sổ ở idle tiếp theo (gộp nhiều lần gọi)"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self._render)
+
+    def _render(self):
+        self._render_pending = False
+        total = len(self.model)
+        visible = self.visible_rows()
+        self._top = max(min(self._top, total - visible), 0)
+        start = max(min(self._top - self.overscan, total - visible - 2 * self.overscan), 0)
+        tasks = self.model.tasks_in_range(start, start + visible + 2 * self.overscan)
+        self._start = start
+        self._version = self.model.version
+        self.renders += 1
+
+        # Thêm/bớt item cho vừa cửa sổ (chỉ khi kích thước hoặc số dòng đổi)
+        while len(self._items) < len(tasks):
+            self._items.append(self.tree.insert("", "end", iid=f"row{len(self._items)}"))
+        if len(self._items) > len(tasks):
+            self.tree.delete(*self._items[len(tasks):])
+            del self._items[len(tasks):]
+
+        self._item_task = {}
+        self._task_item = {}
+        selected, focus = [], None
+        for item_id, task in zip(self._items, tasks):
+            values, tags, image = self.render_row(task)
+            self.tree.item(item_id, values=values, tags=tags, image=image)
+            self._item_task[item_id] = task
+            self._task_item[task] = item_id
+            if task in self._selection:
+                selected.append(item_id)
+            if task is self._focus_task:
+                focus = item_id
+        self.tree.selection_set(selected)
+        if focus is not None:
+            self.tree.focus(focus)
+
+        # Đặt view của Treeview để dòng _top nằm trên cùng
+        if tasks:
+            self.tree.yview_moveto((self._top - start) / len(tasks))
+        self._update_scrollbar(total, visible)
+
+    def _update_scrollbar(self, total, visible):
+        if total <= 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._top / total, min((self._top + visible) / total, 1))
+
+    def _on_tree_yview(self, first, last):
+        """yscrollcommand của Treeview: view bên trong cửa sổ đổi (lăn chuột, phím, see...)"""
+        count = len(self._items)
+        total = len(self.model)
+        visible = self.visible_rows()
+        if count:
+            self._top = self._start + int(round(float(first) * count))
+        self._update_scrollbar(total, visible)
+        # Gần mép cửa sổ mà model còn dòng phía đó: dời cửa sổ
+        margin = self.overscan // 2
+        if (self._start > 0 and self._top - self._start < margin) or \
+                (self._start + count < total and self._start + count - (self._top + visible) < margin):
+            self.invalidate()
+
+    def yview(self, *args):
+        """command của Scrollbar (moveto/scroll) tính theo toàn bộ model"""
+        total = len(self.model)
+        visible = self.visible_rows()
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = visible if args[2] == "pages" else 1
+            self._top += int(args[1]) * step
+        self._top = max(min(self._top, total - visible), 0)
+        self.invalidate()
+
+    def see(self, task):
+        """Cuộn tới dòng của task"""
+        row = self.model.row_of(task)
+        if row is None:
+            return
+        visible = self.visible_rows()
+        if row < self._top or row >= self._top + visible:
+            self._top = max(row - visible // 2, 0)
+            self.invalidate()
+
+    # ----- Cập nhật dòng -----
+
+    def refresh(self, tasks):
+        """Vẽ lại các task đang nằm trong cửa sổ; task ngoài cửa sổ sẽ được vẽ khi cuộn tới"""
+        if self._version != self.model.version:
+            self.invalidate()
+            return 0
+        updated = 0
+        for task in tasks:
+            item_id = self._task_item.get(task)
+            if item_id is not None:
+                values, tags, image = self.render_row(task)
+                self.tree.item(item_id, values=values, tags=tags, image=image)
+                updated += 1
+        return updated
+
+    # ----- Tra cứu item <-> task -----
+
+    def task_for_item(self, item_id):
+        return self._item_task.get(item_id)
+
+    def item_for_task(self, task):
+        """Item đang hiển thị task (None nếu task ngoài cửa sổ)"""
+        return self._task_item.get(task)
+
+    def task_at(self, y):
+        """Task của dòng tại tọa độ y trong widget"""
+        return self._item_task.get(self.tree.identify_row(y))
+
+    # ----- Selection -----
+
+    def _on_select(self, event=None):
+        in_window = set(self._task_item)
+        selected = {self._item_task[item_id] for item_id in self.tree.selection() if item_id in self._item_task}
+        self._selection = (self._selection - in_window) | selected
+        self._focus_task = self._item_task.get(self.tree.focus())
+
+    def selected_tasks(self):
+        """Task đang chọn theo thứ tự trong view (kể cả task đã cuộn ra ngoài cửa sổ)"""
+        model = self.model
+        rows = {task: model.row_of(task) for task in self._selection if task in model}
+        return sorted(rows, key=lambda task: -1 if rows[task] is None else rows[task])
+
+    def is_selected(self, task):
+        return task in self._selection
+
+    def select(self, tasks):
+        self._selection = set(tasks)
+        self.tree.selection_set([self._task_item[task] for task in tasks if task in self._task_item])
+
+    def forget(self, tasks):
+        """Bỏ task đã xóa khỏi selection"""
+        self._selection.difference_update(tasks)
+        if self._focus_task in tasks:
+            self._focus_task = None
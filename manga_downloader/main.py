@@ -11,6 +11,7 @@ import os
 import sys
 import json
 import threading
+import multiprocessing
 from pathlib import Path
 
 # Xác định thư mục gốc của ứng dụng
@@ -36,7 +37,7 @@ class MangaDownloaderApp:
         self.lua_loader = LuaModuleLoader()
         
         # Tạo download manager (callback sẽ được set sau khi GUI tạo xong)
-        self.download_manager = DownloadManager(self.config_manager, None)
+        self.download_manager = DownloadManager(self.config_manager, None, self.lua_loader)
         
         # Khởi tạo GUI
         self.main_window = MainWindow(
@@ -51,6 +52,8 @@ class MangaDownloaderApp:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Cần cho process pool convert ảnh khi chạy từ EXE (PyInstaller)
+    multiprocessing.freeze_support()
     app = MangaDownloaderApp()
     app.run()
 
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Cho phép `from core...` khi chạy pytest từ thư mục gốc của repo"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
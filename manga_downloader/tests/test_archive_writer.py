@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests CbzWriter - ghi streaming, tiếp tục từ journal sau crash, finalize
+"""
+
+import json
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from core.archive_writer import CbzWriter
+
+def _crash(writer):
+    """Đóng file như khi process bị kill: không ghi central directory, không dọn journal"""
+    writer._zip._didModify = False  # Process chết thì ZipFile cũng không kịp ghi gì thêm
+    writer._file.close()
+    writer._journal.close()
+
+class CbzWriterTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.archive = Path(self._tmp.name) / "Gallery.cbz"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_finalize_sorts_entries_and_removes_part_files(self):
+        writer = CbzWriter(self.archive)
+        writer.write("0002.jpg", b"page two", {'index': 2})
+        writer.write("0001.jpg", b"page one", {'index': 1})
+        self.assertEqual(writer.finalize(), self.archive)
+
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["0001.jpg", "0002.jpg"])
+            self.assertEqual(zf.read("0002.jpg"), b"page two")
+        self.assertFalse(writer.part_path.exists())
+        self.assertFalse(writer.journal_path.exists())
+
+    def test_write_existing_entry_is_skipped(self):
+        writer = CbzWriter(self.archive)
+        writer.write("0001.jpg", b"first")
+        self.assertEqual(writer.write("0001.jpg", b"second, longer"), len(b"first"))
+        writer.finalize()
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertEqual(zf.read("0001.jpg"), b"first")
+
+    def test_resume_after_crash_drops_partial_entry(self):
+        writer = CbzWriter(self.archive)
+        writer.write("0001.jpg", b"a" * 1000, {'index': 1, 'file': "0001.jpg"})
+        writer.write("0002.jpg", b"b" * 2000, {'index': 2, 'file': "0002.jpg"})
+        _crash(writer)
+        # Entry thứ ba đang ghi dở lúc crash: dữ liệu trong .part, dòng journal bị cắt
+        with open(writer.part_path, 'ab') as f:
+            f.write(b"PK\x03\x04" + b"c" * 500)
+        with open(writer.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"name": "0003.jpg", "crc"')
+
+        resumed = CbzWriter(self.archive)
+        self.assertEqual(resumed.resumed, 2)
+        self.assertEqual(resumed.entries()["0002.jpg"], {'index': 2, 'file': "0002.jpg"})
+        self.assertTrue(resumed.has("0001.jpg"))
+        self.assertFalse(resumed.has("0003.jpg"))
+        resumed.write("0003.jpg", b"c" * 3000, {'index': 3})
+        resumed.finalize()
+
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["0001.jpg", "0002.jpg", "0003.jpg"])
+            self.assertEqual(zf.read("0001.jpg"), b"a" * 1000)
+            self.assertEqual(zf.read("0003.jpg"), b"c" * 3000)
+
+    def test_close_keeps_progress_for_next_run(self):
+        writer = CbzWriter(self.archive)
+        writer.write("0001.jpg", b"x" * 100, {'index': 1})
+        writer.close()
+        self.assertFalse(self.archive.exists())
+
+        resumed = CbzWriter(self.archive)
+        self.assertEqual(resumed.resumed, 1)
+        resumed.finalize()
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertEqual(zf.read("0001.jpg"), b"x" * 100)
+
+    def test_journal_beyond_part_file_restarts(self):
+        writer = CbzWriter(self.archive)
+        writer.write("0001.jpg", b"x" * 100)
+        _crash(writer)
+        # .part bị cắt ngắn hơn những gì journal ghi nhận: không tin journal
+        with open(writer.part_path, 'r+b') as f:
+            f.truncate(10)
+
+        resumed = CbzWriter(self.archive)
+        self.assertEqual(resumed.resumed, 0)
+        self.assertEqual(resumed.entries(), {})
+        with open(resumed.journal_path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], [])
+        resumed.write("0001.jpg", b"y" * 50)
+        resumed.finalize()
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertEqual(zf.read("0001.jpg"), b"y" * 50)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests LibraryIndex - khớp gallery đã có trên đĩa theo URL chuẩn hóa và theo tiêu đề + số page
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from core.library_index import LibraryIndex
+from core.manifest import MANIFEST_NAME, build_manifest, manifest_bytes, write_manifest
+from core.url_canon import UrlCanonicalizer
+
+def _pages(count):
+    return {idx: {'file': f"{idx}.jpg", 'format': 'JPEG'} for idx in range(1, count + 1)}
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.canon = UrlCanonicalizer()
+        self.canon.set_domains({'nhentai.net': 'nhentai'})
+        self.index = LibraryIndex(self.root, self.canon.fingerprint)
+
+    def tearDown(self):
+        self.index._db.close()
+        self._tmp.cleanup()
+
+    def _folder(self, name, url=None, pages=3, manifest=True):
+        folder = self.root / name
+        folder.mkdir()
+        for idx in range(1, pages + 1):
+            (folder / f"{idx}.jpg").write_bytes(b"\xff\xd8" + bytes(100))
+        (folder / "cover.jpg").write_bytes(b"\xff\xd8")
+        if manifest:
+            write_manifest(folder, build_manifest(url, name, 'nhentai', 'JPEG', _pages(pages)))
+        return folder
+
+    def _cbz(self, name, url, pages=2):
+        archive = self.root / f"{name}.cbz"
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for idx in range(1, pages + 1):
+                zf.writestr(f"{idx:04d}.jpg", b"\xff\xd8")
+            zf.writestr("0000_cover.jpg", b"\xff\xd8")
+            zf.writestr(MANIFEST_NAME, manifest_bytes(build_manifest(url, name, 'nhentai', 'JPEG', _pages(pages))))
+        return archive
+
+    def _fp(self, url):
+        return self.canon.fingerprint(url)
+
+    def test_find_urls_matches_canonical_url(self):
+        folder = self._folder("Gallery A", "https://nhentai.net/g/1/")
+        archive = self._cbz("Gallery B", "https://nhentai.net/g/2/")
+        stats = self.index.scan()
+        self.assertEqual((stats['entries'], stats['read'], stats['removed']), (2, 2, 0))
+
+        # Trang reader và URL có tracking là cùng gallery
+        fp_a, fp_b = self._fp("http://www.nhentai.net/g/1/5?utm_source=x"), self._fp("https://nhentai.net/g/2")
+        found = self.index.find_urls([fp_a, fp_b, self._fp("https://nhentai.net/g/3/")])
+        self.assertEqual(set(found), {fp_a, fp_b})
+        self.assertEqual(found[fp_a]['location'], str(folder))
+        self.assertEqual(found[fp_a]['kind'], 'folder')
+        self.assertEqual(found[fp_a]['page_count'], 3)
+        self.assertEqual(found[fp_b]['location'], str(archive))
+        self.assertEqual(found[fp_b]['kind'], 'cbz')
+
+    def test_folder_without_manifest_never_matches(self):
+        self._folder("Legacy", pages=5, manifest=False)
+        self.index.scan()
+        self.assertEqual(len(self.index), 1)
+        self.assertIsNone(self.index.find_title("Legacy", 5))
+        self.assertEqual(self.index.get_stats()['with_manifest'], 0)
+
+    def test_incomplete_manifest_never_matches(self):
+        folder = self._folder("Partial", "https://nhentai.net/g/4/", manifest=False)
+        manifest = build_manifest("https://nhentai.net/g/4/", "Partial", 'nhentai', 'JPEG', _pages(3))
+        del manifest['completed_at']
+        write_manifest(folder, manifest)
+        self.index.scan()
+        self.assertEqual(self.index.find_urls([self._fp("https://nhentai.net/g/4/")]), {})
+        self.assertIsNone(self.index.find_title("Partial", 3))
+
+    def test_find_title_needs_exact_page_count(self):
+        self._folder("Same Title", "https://nhentai.net/g/5/", pages=4)
+        self.index.scan()
+        self.assertEqual(self.index.find_title("same title", 4)['page_count'], 4)
+        self.assertIsNone(self.index.find_title("Same Title", 3))
+        # Không biết số page thật thì không khớp
+        self.assertIsNone(self.index.find_title("Same Title", 0))
+        self.assertIsNone(self.index.find_title("Same Title", None))
+
+    def test_record_without_scan(self):
+        folder = self.root / "Fresh"
+        folder.mkdir()
+        manifest = build_manifest("https://nhentai.net/g/6/", "Fresh", 'nhentai', 'JPEG', _pages(2))
+        write_manifest(folder, manifest)
+        self.index.record(folder, manifest, 1234)
+        fp = self._fp("https://nhentai.net/g/6")
+        self.assertEqual(self.index.find_urls([fp])[fp]['bytes'], 1234)
+        # Quét lại không đọc lại gallery vừa ghi (mtime không đổi)
+        self.assertEqual(self.index.scan()['read'], 0)
+
+    def test_deleted_gallery_is_dropped(self):
+        folder = self._folder("Gone", "https://nhentai.net/g/7/")
+        kept = self._folder("Kept", "https://nhentai.net/g/8/")
+        self.index.scan()
+        fp, kept_fp = self._fp("https://nhentai.net/g/7/"), self._fp("https://nhentai.net/g/8/")
+        self.assertEqual(self.index.deleted_among([fp, kept_fp]), set())
+
+        shutil.rmtree(folder)
+        self.assertEqual(set(self.index.find_urls([fp, kept_fp])), {kept_fp})
+        self.assertEqual(self.index.deleted_among([fp, kept_fp]), {fp})
+        self.assertEqual(len(self.index), 1)
+
+        # Tải lại xong thì không còn bị coi là đã xóa
+        folder.mkdir()
+        manifest = build_manifest("https://nhentai.net/g/7/", "Gone", 'nhentai', 'JPEG', _pages(1))
+        write_manifest(folder, manifest)
+        self.index.record(folder, manifest, 10)
+        self.assertEqual(self.index.deleted_among([fp]), set())
+        self.assertTrue(kept.exists())
+
+    def test_rescan_is_incremental(self):
+        self._folder("One", "https://nhentai.net/g/9/")
+        archive = self._cbz("Two", "https://nhentai.net/g/10/")
+        (self.root / "notes.txt").write_text("không phải gallery")
+        self.assertEqual(self.index.scan()['read'], 2)
+        self.assertEqual(self.index.scan()['read'], 0)
+
+        os.remove(archive)
+        stats = self.index.scan()
+        self.assertEqual((stats['entries'], stats['read'], stats['removed']), (1, 0, 1))
+        self.assertEqual(self.index.deleted_among([self._fp("https://nhentai.net/g/10/")]),
+                         {self._fp("https://nhentai.net/g/10/")})
+
+    def test_index_files_are_skipped(self):
+        self._folder("Only", "https://nhentai.net/g/11/")
+        self.index.scan()
+        # .library_index.sqlite (và các file ẩn khác) không bị coi là gallery
+        self.assertEqual(self.index.get_stats()['galleries'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests RetryScheduler - backoff + jitter, Retry-After và hẹn giờ đưa task về hàng đợi
+"""
+
+import threading
+import time
+import unittest
+from email.utils import formatdate
+
+from core.retry_scheduler import RetryScheduler, parse_retry_after
+
+class ParseRetryAfterTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertEqual(parse_retry_after(" 5 "), 5.0)
+
+    def test_http_date(self):
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 60, usegmt=True)), 60, delta=2)
+        # Ngày đã qua: tải lại ngay
+        self.assertEqual(parse_retry_after(formatdate(time.time() - 60, usegmt=True)), 0.0)
+
+    def test_invalid(self):
+        for value in (None, "", "soon", "-5", "1.5"):
+            self.assertIsNone(parse_retry_after(value), value)
+
+class ComputeDelayTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = RetryScheduler(lambda task: None, base_delay=2.0, max_delay=60.0)
+
+    def test_exponential_backoff_with_jitter(self):
+        for attempt in range(1, 6):
+            full = 2.0 * 2 ** (attempt - 1)
+            delays = [self.scheduler.compute_delay(attempt) for _ in range(200)]
+            self.assertTrue(all(full / 2 <= delay <= full for delay in delays), attempt)
+            # Có jitter: các task không cùng retry một lúc
+            self.assertGreater(len(set(delays)), 1)
+
+    def test_capped_at_max_delay(self):
+        delays = [self.scheduler.compute_delay(50) for _ in range(100)]
+        self.assertTrue(all(30.0 <= delay <= 60.0 for delay in delays))
+
+    def test_retry_after(self):
+        self.assertGreaterEqual(self.scheduler.compute_delay(1, retry_after=30), 30)
+        # Retry-After cũng bị giới hạn bởi max_delay
+        self.assertLessEqual(self.scheduler.compute_delay(1, retry_after=3600), 60.0)
+        # Retry-After ngắn hơn backoff thì vẫn chờ theo backoff
+        self.assertGreaterEqual(self.scheduler.compute_delay(5, retry_after=0), 16.0)
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.due = []
+        self.fired = threading.Event()
+        self.expected = 0
+        self.scheduler = RetryScheduler(self._on_due)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def _on_due(self, task):
+        self.due.append(task)
+        if len(self.due) >= self.expected:
+            self.fired.set()
+
+    def test_tasks_fire_in_due_order(self):
+        self.expected = 3
+        self.scheduler.start()
+        self.scheduler.schedule_in('c', 0.15)
+        self.scheduler.schedule_in('a', 0.01)
+        self.scheduler.schedule_in('b', 0.08)
+        self.assertTrue(self.fired.wait(2))
+        self.assertEqual(self.due, ['a', 'b', 'c'])
+        self.assertEqual(self.scheduler.pending_count(), 0)
+
+    def test_not_fired_before_due(self):
+        self.expected = 1
+        self.scheduler.start()
+        started = time.monotonic()
+        self.scheduler.schedule_in('late', 0.2)
+        self.assertTrue(self.fired.wait(2))
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_cancel(self):
+        self.expected = 1
+        self.scheduler.start()
+        self.scheduler.schedule_in('cancelled', 0.05)
+        self.scheduler.schedule_in('kept', 0.1)
+        self.scheduler.cancel('cancelled')
+        self.assertEqual(self.scheduler.pending_count(), 1)
+        self.assertTrue(self.fired.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(self.due, ['kept'])
+
+    def test_schedule_returns_delay(self):
+        delay = self.scheduler.schedule('task', 1)
+        self.assertTrue(1.0 <= delay <= 2.0)
+        self.assertEqual(self.scheduler.pending_count(), 1)
+
+    def test_restart_keeps_single_thread(self):
+        self.scheduler.start()
+        thread = self.scheduler._thread
+        # stop() rồi start() trước khi thread cũ kịp thức dậy: thread cũ chạy tiếp, không có thread thứ hai
+        with self.scheduler._cond:
+            self.scheduler.stop()
+            self.scheduler.start()
+        self.assertIs(self.scheduler._thread, thread)
+        self.assertEqual(sum(1 for t in threading.enumerate() if t is thread), 1)
+
+        self.scheduler.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.scheduler._thread)
+
+        self.expected = 1
+        self.scheduler.start()
+        self.assertIsNot(self.scheduler._thread, thread)
+        self.scheduler.schedule_in('again', 0)
+        self.assertTrue(self.fired.wait(2))
+
+    def test_callback_error_does_not_stop_thread(self):
+        def on_due(task):
+            if task == 'bad':
+                raise RuntimeError("lỗi")
+            self._on_due(task)
+        self.scheduler.on_due = on_due
+        self.expected = 1
+        self.scheduler.start()
+        self.scheduler.schedule_in('bad', 0)
+        self.scheduler.schedule_in('good', 0.02)
+        self.assertTrue(self.fired.wait(2))
+        self.assertEqual(self.due, ['good'])
+
+if __name__ == "__main__":
+    unittest.main()
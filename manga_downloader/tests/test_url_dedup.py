@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests UrlCanonicalizer / UrlIndex / BloomFilter - nhận ra URL trùng gallery và index gallery đã tải
+"""
+
+import os
+import tempfile
+import unittest
+
+from core.url_canon import UrlCanonicalizer, fingerprint, parse_rules
+from core.url_index import INDEX_NAME, BloomFilter, UrlIndex
+
+class UrlCanonicalizerTest(unittest.TestCase):
+    def setUp(self):
+        self.canon = UrlCanonicalizer()
+        self.canon.set_domains({'nhentai.net': 'nhentai', 'www.hentaifox.com': 'HentaiFox'})
+
+    def test_generic_rules(self):
+        same = [
+            "https://example.com/a/b",
+            "http://www.example.com/a/b/",
+            "HTTPS://Example.COM:443/a//b#top",
+            "http://example.com:80/a/b?utm_source=x&fbclid=y",
+        ]
+        self.assertEqual({self.canon.canonicalize(url) for url in same}, {"example.com/a/b"})
+
+    def test_query_is_sorted_and_kept(self):
+        self.assertEqual(self.canon.canonicalize("https://example.com/s?b=2&a=1&utm_medium=z"),
+                         "example.com/s?a=1&b=2")
+        self.assertNotEqual(self.canon.fingerprint("https://example.com/s?page=1"),
+                            self.canon.fingerprint("https://example.com/s?page=2"))
+
+    def test_non_default_port_is_kept(self):
+        self.assertEqual(self.canon.canonicalize("http://example.com:8080/g/1"), "example.com:8080/g/1")
+
+    def test_module_rules(self):
+        self.assertEqual(self.canon.canonicalize("https://nhentai.net/g/123/4/"), "nhentai.net/g/123")
+        self.assertEqual(self.canon.canonicalize("https://cdn.nhentai.net/d/123"), "cdn.nhentai.net/g/123")
+        self.assertEqual(self.canon.canonicalize("https://hentaifox.com/g/9/1/"), "hentaifox.com/gallery/9")
+        # Host không thuộc module nào: chỉ áp luật chung
+        self.assertEqual(self.canon.canonicalize("https://other.example/g/9/1/"), "other.example/g/9/1")
+
+    def test_config_rules_replace_builtin(self):
+        rules = parse_rules("^/g/(\\d+).*$ -> /gallery/\\1\n(bad -> x\nkhông có mũi tên")
+        self.assertEqual(rules, [("^/g/(\\d+).*$", "/gallery/\\1")])
+        canon = UrlCanonicalizer({'nhentai': rules})
+        canon.set_domains({'nhentai.net': 'nhentai'})
+        self.assertEqual(canon.canonicalize("https://nhentai.net/g/5/2"), "nhentai.net/gallery/5")
+
+    def test_not_a_url_is_kept(self):
+        self.assertEqual(self.canon.canonicalize("  not a url "), "not a url")
+
+    def test_fingerprint_fits_sqlite_integer(self):
+        fp = fingerprint("example.com/a")
+        self.assertTrue(-2 ** 63 <= fp < 2 ** 63)
+        self.assertEqual(fp, self.canon.fingerprint("http://www.example.com/a/"))
+
+class BloomFilterTest(unittest.TestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(10000, 0.01)
+        added = [fingerprint(f"host/g/{n}") for n in range(10000)]
+        for fp in added:
+            bloom.add(fp)
+        self.assertTrue(all(fp in bloom for fp in added))
+        others = [fingerprint(f"host/other/{n}") for n in range(10000)]
+        false_positives = sum(fp in bloom for fp in others)
+        self.assertLess(false_positives, 300)  # ~1% dự kiến
+
+    def test_save_and_load(self):
+        bloom = BloomFilter(1000)
+        bloom.add(42)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "index.bloom")
+            bloom.save(path)
+            loaded = BloomFilter.load(path)
+            self.assertIn(42, loaded)
+            self.assertEqual(loaded.count, 1)
+            with open(path, 'wb') as f:
+                f.write(b"\x00")
+            self.assertIsNone(BloomFilter.load(path))
+        self.assertIsNone(BloomFilter.load(os.path.join(folder, "missing.bloom")))
+
+class UrlIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, INDEX_NAME)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_add_contains_remove(self):
+        index = UrlIndex(self.path, capacity=1000)
+        self.assertEqual(index.add([1, 2, 3]), 3)
+        self.assertEqual(index.add([3, 4]), 1)  # 3 đã có
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.contains_many([1, 4, 5]), {1, 4})
+        index.remove([4])
+        self.assertNotIn(4, index)
+        self.assertEqual(len(index), 3)
+        index.close()
+
+    def test_reopen_uses_saved_bloom(self):
+        canon = UrlCanonicalizer()
+        index = UrlIndex(self.path, capacity=1000)
+        index.add([canon.fingerprint("https://example.com/g/1/")])
+        index.close()
+        self.assertTrue(os.path.exists(f"{self.path}.bloom"))
+
+        reopened = UrlIndex(self.path, capacity=1000)
+        self.assertEqual(len(reopened), 1)
+        self.assertIn(canon.fingerprint("http://www.example.com/g/1?utm_source=a"), reopened)
+        self.assertNotIn(canon.fingerprint("https://example.com/g/2"), reopened)
+        reopened.close()
+
+    def test_stale_bloom_is_rebuilt(self):
+        index = UrlIndex(self.path, capacity=1000)
+        index.add([7])
+        index.close()
+        # Thêm dòng trực tiếp (như index được ghi bởi bản khác): count không khớp -> dựng lại Bloom filter
+        index = UrlIndex(self.path, capacity=1000)
+        with index._lock:
+            index._db.execute("INSERT INTO urls (fp) VALUES (8)")
+            index._db.commit()
+        index._bloom_dirty = False
+        index.close()
+
+        reopened = UrlIndex(self.path, capacity=1000)
+        self.assertEqual(reopened.contains_many([7, 8]), {7, 8})
+        reopened.close()
+
+    def test_without_bloom(self):
+        index = UrlIndex(self.path, bloom=False)
+        index.add([10])
+        self.assertEqual(index.contains_many([10, 11]), {10})
+        self.assertEqual(index.get_stats()['bloom_bytes'], 0)
+        index.close()
+
+    def test_grows_past_capacity(self):
+        index = UrlIndex(self.path, capacity=10)
+        index.add(list(range(100)))
+        self.assertEqual(index.contains_many(list(range(100))), set(range(100)))
+        index.close()
+
+if __name__ == "__main__":
+    unittest.main()